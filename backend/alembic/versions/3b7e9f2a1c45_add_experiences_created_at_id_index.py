@@ -0,0 +1,23 @@
+"""Add experiences created_at id index
+
+Revision ID: 3b7e9f2a1c45
+Revises: c8ed562f65b1
+Create Date: 2026-10-18 14:05:12.418230
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7e9f2a1c45'
+down_revision = 'c8ed562f65b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_experiences_created_at_id', 'experiences', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_experiences_created_at_id', table_name='experiences')
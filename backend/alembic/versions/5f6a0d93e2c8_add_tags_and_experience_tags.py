@@ -0,0 +1,83 @@
+"""Add tags and experience_tags
+
+Revision ID: 5f6a0d93e2c8
+Revises: 8d2c41f0b7a3
+Create Date: 2026-10-18 16:40:03.115472
+
+"""
+import json
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f6a0d93e2c8'
+down_revision = '8d2c41f0b7a3'
+branch_labels = None
+depends_on = None
+
+
+def backfill_tags(conn) -> None:
+    """把 experiences.tags 中的 JSON 标签拆分写入 tags / experience_tags"""
+    tag_ids = {}
+    counts = {}
+    links = []
+    rows = conn.execute(sa.text("SELECT id, tags FROM experiences WHERE tags IS NOT NULL AND tags <> ''"))
+    for experience_id, raw_tags in rows:
+        try:
+            names = json.loads(raw_tags)
+        except ValueError:
+            continue
+        seen = set()
+        for name in names if isinstance(names, list) else []:
+            name = str(name).strip()[:50]
+            if not name or name.lower() in seen:
+                continue
+            seen.add(name.lower())
+            key = name.lower()
+            if key not in tag_ids:
+                tag_ids[key] = len(tag_ids) + 1
+                counts[key] = [name, 0]
+            counts[key][1] += 1
+            links.append({"experience_id": experience_id, "tag_id": tag_ids[key], "position": len(seen) - 1})
+
+    if tag_ids:
+        conn.execute(
+            sa.text("INSERT INTO tags (id, name, experience_count) VALUES (:id, :name, :experience_count)"),
+            [{"id": tag_ids[key], "name": name, "experience_count": count} for key, (name, count) in counts.items()]
+        )
+    if links:
+        conn.execute(
+            sa.text("INSERT INTO experience_tags (experience_id, tag_id, position) VALUES (:experience_id, :tag_id, :position)"),
+            links
+        )
+
+
+def upgrade() -> None:
+    op.create_table('tags',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('experience_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tags_id'), 'tags', ['id'], unique=False)
+    op.create_index(op.f('ix_tags_name'), 'tags', ['name'], unique=True)
+    op.create_table('experience_tags',
+    sa.Column('experience_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['experience_id'], ['experiences.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('experience_id', 'tag_id')
+    )
+    op.create_index('ix_experience_tags_tag_id_experience_id', 'experience_tags', ['tag_id', 'experience_id'], unique=False)
+    backfill_tags(op.get_bind())
+
+
+def downgrade() -> None:
+    op.drop_index('ix_experience_tags_tag_id_experience_id', table_name='experience_tags')
+    op.drop_table('experience_tags')
+    op.drop_index(op.f('ix_tags_name'), table_name='tags')
+    op.drop_index(op.f('ix_tags_id'), table_name='tags')
+    op.drop_table('tags')
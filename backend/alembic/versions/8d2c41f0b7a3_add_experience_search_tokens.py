@@ -0,0 +1,33 @@
+"""Add experience search tokens
+
+Revision ID: 8d2c41f0b7a3
+Revises: 3b7e9f2a1c45
+Create Date: 2026-10-18 15:22:40.731904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2c41f0b7a3'
+down_revision = '3b7e9f2a1c45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('experience_search_tokens',
+    sa.Column('token', sa.String(length=32).with_variant(mysql.VARCHAR(length=32, collation='utf8mb4_bin'), 'mysql'), nullable=False),
+    sa.Column('experience_id', sa.Integer(), nullable=False),
+    sa.Column('weight', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['experience_id'], ['experiences.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('token', 'experience_id')
+    )
+    op.create_index(op.f('ix_experience_search_tokens_experience_id'), 'experience_search_tokens', ['experience_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_experience_search_tokens_experience_id'), table_name='experience_search_tokens')
+    op.drop_table('experience_search_tokens')
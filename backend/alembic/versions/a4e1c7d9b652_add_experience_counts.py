@@ -0,0 +1,33 @@
+"""Add experience counts
+
+Revision ID: a4e1c7d9b652
+Revises: 5f6a0d93e2c8
+Create Date: 2026-10-18 18:05:12.408317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4e1c7d9b652'
+down_revision = '5f6a0d93e2c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('experience_counts',
+    sa.Column('company', sa.String(length=100), nullable=False),
+    sa.Column('position', sa.String(length=100), nullable=False),
+    sa.Column('experience_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('company', 'position')
+    )
+    op.execute("""
+        INSERT INTO experience_counts (company, position, experience_count)
+        SELECT company, position, COUNT(*) FROM experiences GROUP BY company, position
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('experience_counts')
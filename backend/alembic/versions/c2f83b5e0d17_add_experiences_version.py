@@ -0,0 +1,24 @@
+"""Add experiences version
+
+Revision ID: c2f83b5e0d17
+Revises: a4e1c7d9b652
+Create Date: 2026-10-18 19:12:47.226015
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2f83b5e0d17'
+down_revision = 'a4e1c7d9b652'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('experiences', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('experiences', 'version')
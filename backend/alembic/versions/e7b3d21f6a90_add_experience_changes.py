@@ -0,0 +1,34 @@
+"""Add experience changes
+
+Revision ID: e7b3d21f6a90
+Revises: c2f83b5e0d17
+Create Date: 2026-10-18 20:02:31.518742
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b3d21f6a90'
+down_revision = 'c2f83b5e0d17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('experience_changes',
+    sa.Column('seq', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('experience_id', sa.Integer(), nullable=False),
+    sa.Column('deleted', sa.Boolean(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('seq')
+    )
+    op.execute("""
+        INSERT INTO experience_changes (experience_id, deleted, changed_at)
+        SELECT id, FALSE, COALESCE(updated_at, created_at) FROM experiences ORDER BY id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('experience_changes')
@@ -0,0 +1,26 @@
+"""Add experiences import key
+
+Revision ID: f41c8a2d7e05
+Revises: e7b3d21f6a90
+Create Date: 2026-10-19 10:12:47.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f41c8a2d7e05'
+down_revision = 'e7b3d21f6a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('experiences', sa.Column('import_key', sa.String(length=40), nullable=True))
+    op.create_index(op.f('ix_experiences_import_key'), 'experiences', ['import_key'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_experiences_import_key'), table_name='experiences')
+    op.drop_column('experiences', 'import_key')
@@ -1,18 +1,18 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import AnySession, get_session
 from app.core.security import verify_token
-from app.services.user_service import user_service
+from app.services.user_service import async_user_service
 
 security = HTTPBearer()
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_session)
 ):
-    """获取当前用户"""
+    """获取当前用户（进程内缓存命中时不访问数据库）"""
     token = credentials.credentials
     phone = verify_token(token)
     if phone is None:
@@ -22,11 +22,21 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = user_service.get_user_by_phone(db, phone)
+    user = await async_user_service.get_current_user(db, phone)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return user 
\ No newline at end of file
+    return user
+
+
+async def get_export_user(current_user=Depends(get_current_user)):
+    """批量导出只开放给配置中的数据分析账号"""
+    if current_user.phone not in settings.EXPERIENCE_EXPORT_ALLOWED_PHONES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Export not allowed"
+        )
+    return current_user
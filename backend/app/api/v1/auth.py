@@ -1,65 +1,113 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from typing import Dict, Any
-from app.core.database import get_db
+import redis.asyncio as aioredis
+from kombu.exceptions import OperationalError
+from redis.exceptions import RedisError
+from starlette.concurrency import run_in_threadpool
+from app.core.database import AnySession, get_session
+from app.core.redis import get_async_redis
 from app.schemas.user import UserLogin, DirectLogin, Token, User
-from app.services.user_service import user_service
-from app.services.sms_service import sms_service
+from app.services.user_service import async_user_service
+from app.services.sms_service import get_sms_service
 
 router = APIRouter()
 
 
-# @router.post("/send-code")
-# async def send_sms_code(phone: str) -> Dict[str, Any]:
-#     """
-#     发送短信验证码
-#     
-#     Args:
-#         phone: 手机号码
-#         
-#     Returns:
-#         Dict: 发送结果
-#     """
-#     # 验证手机号格式
-#     if not phone.isdigit() or len(phone) != 11:
-#         raise HTTPException(
-#             status_code=status.HTTP_400_BAD_REQUEST,
-#             detail="手机号格式不正确"
-#         )
-#     
-#     # 检查发送频率限制
-#     if not sms_service.check_send_frequency(phone, limit_minutes=1):
-#         raise HTTPException(
-#             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-#             detail="发送过于频繁，请稍后再试"
-#         )
-#     
-#     # 发送验证码
-#     result = sms_service.send_code(phone)
-#     
-#     if not result.get("success", False):
-#         error_msg = result.get("message", "发送失败")
-#         raise HTTPException(
-#             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-#             detail=f"短信发送失败: {error_msg}"
-#         )
-#     
-#     return {
-#         "message": "验证码发送成功",
-#         "success": True,
-#         "request_id": result.get("request_id", ""),
-#         "biz_id": result.get("biz_id", "")
-#     }
+@router.post("/send-code", status_code=status.HTTP_202_ACCEPTED)
+async def send_sms_code(
+    phone: str,
+    request: Request,
+    redis: aioredis.Redis = Depends(get_async_redis)
+) -> Dict[str, Any]:
+    """
+    发送短信验证码（异步发送，立即返回任务 id）
+    
+    Args:
+        phone: 手机号码
+        redis: Redis 客户端
+        
+    Returns:
+        Dict: 包含 task_id，可通过 GET /send-code/{task_id} 查询发送状态
+    """
+    # 验证手机号格式
+    if not phone.isdigit() or len(phone) != 11:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="手机号格式不正确"
+        )
+    
+    # 检查发送频率限制（手机号、IP、全局），Redis 不可用时拒绝发送
+    client_ip = request.client.host if request.client else ""
+    sms_service = get_sms_service()
+    limit = await sms_service.check_send_frequency(redis, phone, client_ip)
+    if not limit["allowed"]:
+        if limit["scope"] == "unavailable":
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="短信服务暂时不可用，请稍后再试",
+                headers={"Retry-After": str(limit["retry_after"])}
+            )
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="发送过于频繁，请稍后再试",
+            headers={"Retry-After": str(limit["retry_after"])}
+        )
+    
+    # 交给 Celery 任务发送，接口不等待短信服务商返回（延迟导入，应用启动时不加载 Celery）
+    from app.tasks.sms_tasks import send_sms_code_task
+    try:
+        task = await run_in_threadpool(send_sms_code_task.delay, phone)
+    except OperationalError:
+        # 任务没有投递出去，归还已记录的发送额度，消息队列故障期间不占用用户的次数
+        await sms_service.release_send_frequency(redis, phone, limit)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="短信服务暂时不可用，请稍后再试"
+        )
+    
+    return {
+        "message": "验证码发送中",
+        "success": True,
+        "task_id": task.id
+    }
+
+
+@router.get("/send-code/{task_id}")
+async def get_send_code_status(task_id: str) -> Dict[str, Any]:
+    """
+    查询验证码发送状态
+    
+    Args:
+        task_id: 发送验证码时返回的任务 id
+        
+    Returns:
+        Dict: status 为 pending / sending / retrying / delivered / failed，
+              code、message 为短信服务商的结果码和说明
+    """
+    from app.tasks.sms_tasks import get_send_result
+    try:
+        result = await run_in_threadpool(get_send_result, task_id)
+    except (OperationalError, RedisError):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="短信服务暂时不可用，请稍后再试"
+        )
+    return {"task_id": task_id, **result}
 
 
 @router.post("/login", response_model=Token)
-async def login(user_login: UserLogin, db: Session = Depends(get_db)):
+async def login(
+    user_login: UserLogin,
+    db: AnySession = Depends(get_session),
+    redis: aioredis.Redis = Depends(get_async_redis)
+):
     """
     用户登录（支持验证码登录和直接登录）
     
     Args:
         user_login: 用户登录信息
         db: 数据库会话
+        redis: Redis 客户端
         
     Returns:
         Token: 访问令牌
@@ -87,7 +135,7 @@ async def login(user_login: UserLogin, db: Session = Depends(get_db)):
     # 如果有验证码，进行验证码验证
     if user_login.code:
         # 验证验证码
-        if not sms_service.verify_code(user_login.phone, user_login.code):
+        if not await get_sms_service().verify_code(redis, user_login.phone, user_login.code):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="验证码错误或已过期"
@@ -95,10 +143,10 @@ async def login(user_login: UserLogin, db: Session = Depends(get_db)):
     
     try:
         # 获取或创建用户
-        user = user_service.get_or_create_user(db, user_login.phone, user_login.username)
+        user = await async_user_service.get_or_create_user(db, user_login.phone)
         
         # 创建访问令牌
-        access_token = user_service.create_access_token_for_user(user)
+        access_token = async_user_service.create_access_token_for_user(user)
         
         return {
             "access_token": access_token,
@@ -113,7 +161,7 @@ async def login(user_login: UserLogin, db: Session = Depends(get_db)):
 
 
 @router.post("/direct-login", response_model=Token)
-async def direct_login(direct_login: DirectLogin, db: Session = Depends(get_db)):
+async def direct_login(direct_login: DirectLogin, db: AnySession = Depends(get_session)):
     """
     直接登录（无需验证码）
     
@@ -132,10 +180,10 @@ async def direct_login(direct_login: DirectLogin, db: Session = Depends(get_db))
         )
     try:
         # 获取或创建用户
-        user = user_service.get_or_create_user(db, direct_login.phone)
+        user = await async_user_service.get_or_create_user(db, direct_login.phone)
         
         # 创建访问令牌
-        access_token = user_service.create_access_token_for_user(user)
+        access_token = async_user_service.create_access_token_for_user(user)
         
         return {
             "access_token": access_token,
@@ -166,7 +214,7 @@ async def direct_login(direct_login: DirectLogin, db: Session = Depends(get_db))
 #             detail="手机号格式不正确"
 #         )
 #     
-#     status_info = sms_service.get_send_status(phone)
+#     status_info = await get_sms_service().get_send_status(redis, phone)
 #     return {
 #         "phone": phone,
 #         "has_code": status_info["has_code"],
@@ -193,7 +241,7 @@ async def direct_login(direct_login: DirectLogin, db: Session = Depends(get_db))
 #             detail="手机号格式不正确"
 #         )
 #     
-#     code = sms_service.get_code(phone)
+#     code = await get_sms_service().get_code(redis, phone)
 #     return {
 #         "phone": phone, 
 #         "code": code,
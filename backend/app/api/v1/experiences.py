@@ -1,99 +1,491 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import asyncio
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.core.database import get_db
-from app.api.deps import get_current_user
-from app.models.user import User
-from app.schemas.experience import Experience, ExperienceCreate, ExperienceUpdate, ExperienceList
-from app.services.experience_service import experience_service
+from typing import Any, Dict, List, Optional, Tuple, Union
+from app.core.cache import response_cache
+from app.core.config import settings
+from app.core.database import AnySession, get_db, get_session
+from app.core.events import feed_broadcaster
+from app.core.http_cache import conditional, is_not_modified, not_modified, validator_headers
+from app.core.serialization import JSONBytesResponse, get_adapter, to_json
+from app.core.pagination import decode_created_at_cursor
+from app.api.deps import get_current_user, get_export_user
+from app.schemas.user import CurrentUser
+from app.schemas.experience import (
+    Experience, ExperienceCreate, ExperienceUpdate, ExperienceList, ExperienceCursorPage,
+    ExperienceSummary, ExperienceBatch, ExperienceChanges, ExperienceImportReport, TagCount
+)
+from app.services.change_service import change_service
+from app.services.experience_service import async_experience_service
+from app.services.export_service import EXPORT_MEDIA_TYPES, export_service
+from app.services.import_service import async_import_service
 
 router = APIRouter()
 
+# view -> 列表项结构
+LIST_ITEM_SCHEMAS = {
+    "full": List[Experience],
+    "summary": List[ExperienceSummary],
+}
+VIEW_QUERY = Query("full", pattern="^(full|summary)$", description="full: 完整内容; summary: 列表卡片字段，不含 content")
 
-@router.get("/", response_model=List[Experience])
+
+def dump_experiences(
+    experiences,
+    next_cursor: Optional[str] = None,
+    paginated: bool = False,
+    total: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 10,
+    view: str = "full"
+) -> bytes:
+    """
+    把经验列表序列化为 JSON，格式与 response_model 一致：游标分页返回
+    ExperienceCursorPage，带总数的偏移分页返回 ExperienceList，否则返回数组
+    """
+    adapter = get_adapter(LIST_ITEM_SCHEMAS[view])
+    items = adapter.validate_python(experiences, from_attributes=True)
+    if paginated:
+        page = ExperienceCursorPage.model_construct(experiences=items, next_cursor=next_cursor, total=total)
+        return page.model_dump_json().encode()
+    if total is not None:
+        page = ExperienceList.model_construct(
+            experiences=items, total=total, page=skip // limit + 1, size=limit
+        )
+        return page.model_dump_json().encode()
+    return adapter.dump_json(items)
+
+
+def get_cursor(
+    cursor: Optional[str] = Query(None, description="游标分页，首页传空字符串，之后传上一页返回的 next_cursor")
+) -> Optional[str]:
+    """校验游标参数"""
+    if cursor:
+        try:
+            decode_created_at_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    return cursor
+
+
+def get_search_cursor(
+    cursor: Optional[str] = Query(None, description="游标分页，首页传空字符串，之后传上一页返回的 next_cursor")
+) -> Optional[str]:
+    """校验搜索游标参数，游标格式由搜索后端决定"""
+    if cursor:
+        try:
+            async_experience_service.parse_search_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    return cursor
+
+
+def check_page_offset(skip: int, limit: int, with_total: bool, cursor: Optional[str]) -> None:
+    """带总数的偏移分页返回页码 skip // limit + 1，skip 不是 limit 的整数倍时页码无法表示，直接拒绝"""
+    if with_total and cursor is None and skip % limit:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="skip must be a multiple of limit when with_total is set"
+        )
+
+
+@router.get("/", response_model=Union[List[Experience], List[ExperienceSummary], ExperienceCursorPage, ExperienceList])
 async def get_experiences(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     company: Optional[str] = None,
     position: Optional[str] = None,
-    db: Session = Depends(get_db)
+    tags: Optional[List[str]] = Query(None, description="按标签筛选，可重复传入多个"),
+    tag_mode: str = Query("all", pattern="^(all|any)$", description="all: 包含全部标签; any: 包含任一标签"),
+    cursor: Optional[str] = Depends(get_cursor),
+    with_total: bool = Query(False, description="返回带总数的分页结构"),
+    view: str = VIEW_QUERY,
+    db: AnySession = Depends(get_session)
 ):
     """获取经验列表"""
-    experiences = experience_service.get_experiences(
-        db, skip=skip, limit=limit, company=company, position=position
+    check_page_offset(skip, limit, with_total, cursor)
+
+    async def build() -> bytes:
+        experiences = await async_experience_service.get_experiences(
+            db, skip=skip, limit=limit, company=company, position=position,
+            tags=tags, tag_mode=tag_mode,
+            author_loader=settings.EXPERIENCE_LIST_AUTHOR_LOADER, cursor=cursor, view=view
+        )
+        total = None
+        if with_total:
+            total = await async_experience_service.count_experiences(
+                db, company=company, position=position, tags=tags, tag_mode=tag_mode
+            )
+        return dump_experiences(
+            experiences,
+            async_experience_service.next_cursor(experiences, limit),
+            paginated=cursor is not None,
+            total=total, skip=skip, limit=limit, view=view
+        )
+
+    params = {
+        "skip": skip, "limit": limit, "company": company, "position": position,
+        "tags": sorted(tags) if tags else None, "tag_mode": tag_mode, "cursor": cursor,
+        "with_total": with_total, "view": view,
+    }
+    response = await response_cache.respond("list", "feed", params, settings.CACHE_FEED_TTL, build)
+    return conditional(request, response)
+
+
+@router.get("/tags/", response_model=List[TagCount])
+async def get_tags(
+    limit: int = Query(50, ge=1, le=200),
+    prefix: Optional[str] = None,
+    db: AnySession = Depends(get_session)
+):
+    """获取标签及每个标签的经验数"""
+    return await async_experience_service.get_tag_counts(db, limit=limit, prefix=prefix)
+
+
+def get_batch_ids(
+    ids: List[str] = Query(..., description="经验 id，逗号分隔或重复传入，如 ids=3,1,2")
+) -> List[int]:
+    """解析批量 id：去重并保持顺序，数量不超过 EXPERIENCE_BATCH_MAX_IDS"""
+    try:
+        parsed = [int(item) for value in ids for item in value.split(",") if item.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be integers"
+        )
+    parsed = list(dict.fromkeys(parsed))
+    if not parsed or len(parsed) > settings.EXPERIENCE_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"ids must contain 1 to {settings.EXPERIENCE_BATCH_MAX_IDS} items"
+        )
+    return parsed
+
+
+@router.get("/batch", response_model=ExperienceBatch)
+async def get_experiences_batch(
+    request: Request,
+    ids: List[int] = Depends(get_batch_ids),
+    view: str = VIEW_QUERY,
+    db: AnySession = Depends(get_session)
+):
+    """按 id 批量获取经验，结果顺序与请求一致，不存在的 id 在 missing_ids 中返回"""
+    experiences = await async_experience_service.get_experiences_by_ids(
+        db, ids, author_loader=settings.EXPERIENCE_LIST_AUTHOR_LOADER, view=view
+    )
+    found = {experience.id for experience in experiences}
+    items = get_adapter(LIST_ITEM_SCHEMAS[view]).validate_python(experiences, from_attributes=True)
+    batch = ExperienceBatch.model_construct(
+        experiences=items,
+        missing_ids=[experience_id for experience_id in ids if experience_id not in found]
     )
-    return experiences
+    return conditional(request, JSONBytesResponse(batch.model_dump_json().encode()))
 
 
-@router.get("/{experience_id}", response_model=Experience)
-async def get_experience(experience_id: int, db: Session = Depends(get_db)):
-    """获取单个经验"""
-    experience = experience_service.get_experience(db, experience_id)
-    if not experience:
+def experience_event(experience) -> dict:
+    """推送给客户端的精简事件，客户端按 id 拉取详情"""
+    return {
+        "id": experience.id,
+        "company": experience.company,
+        "position": experience.position,
+        "tags": experience.tags,
+        "created_at": experience.created_at,
+    }
+
+
+@router.get("/stream")
+async def stream_experiences():
+    """
+    新经验实时推送（Server-Sent Events）
+
+    - event: experience，data 为新经验的精简信息
+    - event: resync，连接消费过慢丢弃了事件，客户端应重新拉取列表
+    - 每 FEED_STREAM_HEARTBEAT 秒发送注释行保活
+    """
+    if feed_broadcaster.connections >= settings.FEED_STREAM_MAX_CONNECTIONS:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Experience not found"
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many stream connections"
+        )
+
+    async def events():
+        subscription = feed_broadcaster.subscribe()
+        try:
+            yield b"retry: 5000\n\n"
+            while True:
+                try:
+                    data = await asyncio.wait_for(subscription.get(), settings.FEED_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if subscription.dropped:
+                    subscription.dropped = 0
+                    yield b"event: resync\ndata: {}\n\n"
+                yield b"event: experience\ndata: " + data + b"\n\n"
+        finally:
+            feed_broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/export")
+def export_experiences(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    company: Optional[str] = None,
+    position: Optional[str] = None,
+    created_after: Optional[datetime] = Query(None, description="创建时间下限（含）"),
+    created_before: Optional[datetime] = Query(None, description="创建时间上限（不含）"),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_export_user)
+):
+    """
+    流式导出经验（NDJSON / CSV），按 id 升序；仅限 EXPERIENCE_EXPORT_ALLOWED_PHONES 中的账号
+
+    服务端游标分块读取，边读边写，内存占用与导出行数无关；
+    同步会话由线程池逐块迭代，会话在响应发送完毕后关闭
+    """
+    chunks = export_service.export(
+        db, export_format, chunk_size=settings.EXPERIENCE_EXPORT_CHUNK_SIZE,
+        company=company, position=position,
+        created_after=created_after, created_before=created_before
+    )
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="experiences.{export_format}"'}
+    )
+
+
+@router.post("/bulk", response_model=ExperienceImportReport)
+async def import_experiences(
+    rows: List[Dict[str, Any]],
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AnySession = Depends(get_session)
+):
+    """
+    批量创建经验，每行按 ExperienceCreate 校验
+
+    校验失败的行不影响其他行，在 errors 中按行号返回；成功行的 id 按输入顺序返回
+    """
+    if not rows or len(rows) > settings.EXPERIENCE_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"rows must contain 1 to {settings.EXPERIENCE_IMPORT_MAX_ROWS} items"
         )
-    return experience
+    report = await async_import_service.import_rows(
+        db, rows, current_user.id, batch_size=settings.EXPERIENCE_IMPORT_BATCH_SIZE
+    )
+    if report["created"]:
+        await response_cache.invalidate("feed")
+    return report
+
+
+def get_since(
+    since: Optional[str] = Query(None, description="上次返回的 next_token，为空表示从头同步")
+) -> int:
+    try:
+        return change_service.parse_token(since or "")
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid since token"
+        )
+
+
+@router.get("/changes", response_model=ExperienceChanges)
+async def get_experience_changes(
+    request: Request,
+    since: int = Depends(get_since),
+    limit: int = Query(100, ge=1, le=500),
+    view: str = VIEW_QUERY,
+    db: AnySession = Depends(get_session)
+):
+    """
+    增量同步：返回 since 之后新增、修改和删除的经验
+
+    has_more 为 true 时继续用 next_token 拉取；没有变化时 next_token 不变，
+    带 If-None-Match 重复请求返回 304
+    """
+    experiences, deleted_ids, watermark, has_more = await async_experience_service.get_changes(
+        db, since, limit=limit, author_loader=settings.EXPERIENCE_LIST_AUTHOR_LOADER, view=view
+    )
+    items = get_adapter(LIST_ITEM_SCHEMAS[view]).validate_python(experiences, from_attributes=True)
+    changes = ExperienceChanges.model_construct(
+        experiences=items,
+        deleted_ids=deleted_ids,
+        next_token=change_service.encode_token(watermark),
+        has_more=has_more
+    )
+    return conditional(request, JSONBytesResponse(changes.model_dump_json().encode()))
+
+
+def pack_detail(etag: str, last_modified: datetime, body: bytes) -> bytes:
+    """详情缓存内容：第一行为 ETag 和 Last-Modified，其后为响应体，三者来自同一次查询"""
+    return f"{etag}\t{last_modified.isoformat()}\n".encode() + body
+
+
+def unpack_detail(entry: bytes) -> Tuple[str, datetime, bytes]:
+    header, body = entry.split(b"\n", 1)
+    etag, last_modified = header.decode().split("\t")
+    return etag, datetime.fromisoformat(last_modified), body
+
+
+@router.get("/{experience_id}", response_model=Experience)
+async def get_experience(experience_id: int, request: Request, db: AnySession = Depends(get_session)):
+    """
+    获取单个经验
+
+    ETag / Last-Modified 与响应体一起缓存，缓存命中时不访问数据库；
+    响应缓存不可用时先只查询版本号，客户端缓存未过期时直接返回 304
+    """
+    async def load():
+        experience = await async_experience_service.get_experience(
+            db, experience_id, author_loader=settings.EXPERIENCE_DETAIL_AUTHOR_LOADER
+        )
+        if not experience:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Experience not found"
+            )
+        return experience
+
+    if not response_cache.available:
+        validators = await async_experience_service.get_experience_validators(db, experience_id)
+        if validators is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Experience not found"
+            )
+        etag, last_modified = validators
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+        body, cache_status = to_json(Experience, await load()), "BYPASS"
+    else:
+        async def build() -> bytes:
+            experience = await load()
+            return pack_detail(*async_experience_service.experience_validators(experience), to_json(Experience, experience))
+
+        entry, cache_status = await response_cache.fetch(
+            "detail", f"experience:{experience_id}", {"id": experience_id},
+            settings.CACHE_DETAIL_TTL, build
+        )
+        etag, last_modified, body = unpack_detail(entry)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+
+    return JSONBytesResponse(
+        content=body, headers={"X-Cache": cache_status, **validator_headers(etag, last_modified)}
+    )
 
 
 @router.post("/", response_model=Experience)
 async def create_experience(
     experience: ExperienceCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AnySession = Depends(get_session)
 ):
     """创建经验"""
-    db_experience = experience_service.create_experience(
-        db, experience, current_user.phone
+    db_experience = await async_experience_service.create_experience(
+        db, experience, current_user.id
     )
-    return db_experience
+    await response_cache.invalidate_experience(db_experience.id)
+    await feed_broadcaster.publish(experience_event(db_experience))
+    return JSONBytesResponse(to_json(Experience, db_experience))
 
 
 @router.put("/{experience_id}", response_model=Experience)
 async def update_experience(
     experience_id: int,
     experience_update: ExperienceUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AnySession = Depends(get_session)
 ):
     """更新经验"""
-    db_experience = experience_service.update_experience(
-        db, experience_id, experience_update, current_user.phone
+    db_experience = await async_experience_service.update_experience(
+        db, experience_id, experience_update, current_user.id
     )
     if not db_experience:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Experience not found or not authorized"
         )
-    return db_experience
+    await response_cache.invalidate_experience(experience_id)
+    return JSONBytesResponse(to_json(Experience, db_experience))
 
 
 @router.delete("/{experience_id}")
 async def delete_experience(
     experience_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AnySession = Depends(get_session)
 ):
     """删除经验"""
-    success = experience_service.delete_experience(
-        db, experience_id, current_user.phone
+    success = await async_experience_service.delete_experience(
+        db, experience_id, current_user.id
     )
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Experience not found or not authorized"
         )
+    await response_cache.invalidate_experience(experience_id)
     return {"message": "Experience deleted successfully"}
 
 
-@router.get("/search/", response_model=List[Experience])
+@router.get("/search/", response_model=Union[List[Experience], List[ExperienceSummary], ExperienceCursorPage, ExperienceList])
 async def search_experiences(
+    request: Request,
     q: str = Query(..., min_length=1),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Depends(get_search_cursor),
+    with_total: bool = Query(False, description="返回带总数的分页结构"),
+    view: str = VIEW_QUERY,
+    db: AnySession = Depends(get_session)
 ):
     """搜索经验"""
-    experiences = experience_service.search_experiences(db, q, skip, limit)
-    return experiences 
\ No newline at end of file
+    # 缓存键和查询使用同一个规范化后的查询词；不转小写，LIKE 后端的大小写
+    # 敏感性取决于数据库排序规则，转小写后不同结果会共用一个缓存条目
+    q = q.strip()
+    if not q:
+        # 只有空白的查询词去掉空白后为空，LIKE 会匹配全部经验
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query must not be blank"
+        )
+    check_page_offset(skip, limit, with_total, cursor)
+
+    async def build() -> bytes:
+        experiences = await async_experience_service.search_experiences(
+            db, q, skip, limit, author_loader=settings.EXPERIENCE_SEARCH_AUTHOR_LOADER,
+            cursor=cursor, view=view
+        )
+        total = None
+        if with_total:
+            total = await async_experience_service.count_search_results(db, q)
+        return dump_experiences(
+            experiences,
+            async_experience_service.next_search_cursor(experiences, limit),
+            paginated=cursor is not None,
+            total=total, skip=skip, limit=limit, view=view
+        )
+
+    params = {
+        "q": q, "skip": skip, "limit": limit, "cursor": cursor,
+        "with_total": with_total, "view": view,
+    }
+    response = await response_cache.respond("search", "feed", params, settings.CACHE_SEARCH_TTL, build)
+    return conditional(request, response) 
\ No newline at end of file
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from starlette.responses import Response
+from app.core.config import settings
+from app.core.serialization import JSONBytesResponse
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "cache:experiences"
+
+
+class ResponseCache:
+    """
+    接口响应的 Redis 读穿缓存
+
+    缓存键带版本号：写入时只需递增版本号，旧版本的键不再被读取，随 TTL
+    自然过期，不会出现"删缓存后又被并发读回填旧数据"的问题。
+    - 列表/搜索共用一个 feed 版本号，任意经验的增删改都会使其失效
+    - 详情按经验 id 单独维护版本号
+
+    Redis 不可用时直接回源数据库（fail open），并在 CACHE_RETRY_SECONDS
+    内不再尝试读取。失效不受这段时间限制，每次写入都会尝试递增版本号；
+    递增失败的范围记录下来，Redis 恢复后先补上递增再读缓存，避免恢复后
+    返回写入前缓存的内容。
+    """
+
+    def __init__(self, enabled: bool = settings.CACHE_ENABLED):
+        self.enabled = enabled
+        self.stats: Counter = Counter()
+        self._client = None
+        self._retry_at = 0.0
+        self._pending: Set[str] = set()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = aioredis.from_url(
+                settings.redis_url,
+                socket_connect_timeout=settings.CACHE_SOCKET_TIMEOUT,
+                socket_timeout=settings.CACHE_SOCKET_TIMEOUT
+            )
+        return self._client
+
+    @property
+    def available(self) -> bool:
+        return self.enabled and time.monotonic() >= self._retry_at
+
+    def _on_error(self, action: str, error: Exception) -> None:
+        self.stats["errors"] += 1
+        self._retry_at = time.monotonic() + settings.CACHE_RETRY_SECONDS
+        logger.warning(f"缓存{action}失败，{settings.CACHE_RETRY_SECONDS}秒内直接访问数据库: {error}")
+
+    @staticmethod
+    def _version_key(scope: str) -> str:
+        return f"{KEY_PREFIX}:version:{scope}"
+
+    async def _version(self, scope: str) -> int:
+        value = await self.client.get(self._version_key(scope))
+        return int(value or 0)
+
+    async def build_key(self, namespace: str, scope: str, params: Dict[str, Any]) -> str:
+        """根据命名空间、版本号和规范化后的参数生成缓存键"""
+        normalized = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+        digest = hashlib.sha1(normalized.encode()).hexdigest()
+        return f"{KEY_PREFIX}:{namespace}:v{await self._version(scope)}:{digest}"
+
+    async def respond(
+        self,
+        namespace: str,
+        scope: str,
+        params: Dict[str, Any],
+        ttl: int,
+        build: Callable[[], Awaitable[bytes]]
+    ) -> Response:
+        """
+        命中缓存时直接返回缓存的 JSON，否则调用 build 生成响应体并写入缓存
+
+        响应头 X-Cache 标明 HIT / MISS，缓存不可用时为 BYPASS
+        """
+        body, status = await self.fetch(namespace, scope, params, ttl, build)
+        return self._response(body, status)
+
+    async def fetch(
+        self,
+        namespace: str,
+        scope: str,
+        params: Dict[str, Any],
+        ttl: int,
+        build: Callable[[], Awaitable[bytes]]
+    ) -> Tuple[bytes, str]:
+        """读取或生成缓存内容，返回 (内容, HIT / MISS / BYPASS)"""
+        key = None
+        if self.available and (not self._pending or await self._bump(())):
+            try:
+                key = await self.build_key(namespace, scope, params)
+                body = await self.client.get(key)
+            except RedisError as e:
+                self._on_error("读取", e)
+                key = None
+            else:
+                if body is not None:
+                    self.stats[f"{namespace}_hits"] += 1
+                    return body, "HIT"
+                self.stats[f"{namespace}_misses"] += 1
+
+        body = await build()
+        if key is None:
+            return body, "BYPASS"
+        try:
+            await self.client.set(key, body, ex=ttl)
+        except RedisError as e:
+            self._on_error("写入", e)
+        return body, "MISS"
+
+    async def _bump(self, scopes: Iterable[str]) -> bool:
+        """递增给定范围和之前递增失败的范围的版本号，失败时全部留待下次补上"""
+        pending = self._pending | set(scopes)
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for scope in pending:
+                    pipe.incr(self._version_key(scope))
+                await pipe.execute()
+        except RedisError as e:
+            self._pending = pending
+            self._on_error("失效", e)
+            return False
+        self._pending -= pending
+        self._retry_at = 0.0
+        return True
+
+    async def invalidate(self, *scopes: str) -> None:
+        """递增版本号，使对应范围内的缓存全部失效；缓存处于重试等待期间也会尝试"""
+        if self.enabled:
+            await self._bump(scopes)
+
+    async def invalidate_experience(self, experience_id: int) -> None:
+        """经验增删改后调用：失效列表/搜索缓存和该经验的详情缓存"""
+        await self.invalidate("feed", f"experience:{experience_id}")
+
+    @staticmethod
+    def _response(body: bytes, status: str) -> Response:
+        return JSONBytesResponse(content=body, headers={"X-Cache": status})
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, **self.stats}
+
+
+response_cache = ResponseCache()
+
+
+class LocalTTLCache:
+    """
+    进程内的 TTL + LRU 缓存，用于热点小对象（如登录用户、列表总数）
+
+    只在当前进程内生效，多进程部署时其他进程的数据最多滞后 ttl 秒；
+    同步路由在线程池中执行，读写加锁
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
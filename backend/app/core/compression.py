@@ -0,0 +1,284 @@
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只使用 gzip
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/csv",
+)
+
+
+# 压缩后的表示使用不同的强 ETag（RFC 9110 §8.8.3）：在引号内追加 "-编码"
+ETAG_SUFFIXES = ("-gzip", "-br")
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """给 ETag 加上编码后缀，W/ 前缀保持不变"""
+    if not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def strip_etag_suffixes(value: str) -> Tuple[str, Optional[str]]:
+    """
+    去掉 If-None-Match 中各 ETag 的编码后缀，交给应用按未压缩的 ETag 比较；
+    同时返回客户端缓存的表示所用的编码（没有后缀时为 None）
+    """
+    tags, encoding = [], None
+    for tag in value.split(","):
+        tag = tag.strip()
+        for suffix in ETAG_SUFFIXES:
+            if tag.endswith(f'{suffix}"'):
+                tag = tag[:-len(suffix) - 1] + '"'
+                encoding = suffix[1:]
+                break
+        tags.append(tag)
+    return ", ".join(tags), encoding
+
+
+def parse_accept_encoding(value: str) -> Dict[str, float]:
+    """解析 Accept-Encoding，返回 编码 -> q 值"""
+    encodings = {}
+    for item in value.split(","):
+        parts = item.strip().split(";")
+        name = parts[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            key, _, number = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        encodings[name] = q
+    return encodings
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """按客户端 q 值选择编码，q 相同时优先 br"""
+    accepted = parse_accept_encoding(accept_encoding)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for name in candidates:
+        q = accepted.get(name, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class CompressedBodyCache:
+    """
+    压缩结果的 LRU 缓存，按 (编码, 响应体摘要) 存储
+
+    已发布经验的详情等热点响应内容不变，命中时跳过压缩，只需计算一次摘要；
+    总字节数超过 max_bytes 时淘汰最久未使用的条目
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Tuple[str, bytes], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, bytes]) -> Optional[bytes]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Tuple[str, bytes], value: bytes) -> None:
+        if len(value) > self.max_bytes // 8:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._data[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class StreamCompressor:
+    """分块压缩，每块后 flush，客户端可以边收边解压"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+            self._process = self._compressor.process
+            self._flush = self._compressor.flush
+            self._finish = self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._process = self._compressor.compress
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._process(chunk) + self._flush()
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+class CompressionMiddleware:
+    """
+    按 Accept-Encoding 协商 br / gzip 压缩响应
+
+    - 小于 minimum_size 的响应不压缩，压缩收益抵不上 CPU 开销
+    - 一次性返回的响应整体压缩，结果进入 CompressedBodyCache
+    - 分块返回的响应（StreamingResponse）逐块压缩，不等待完整响应体
+    - 已带 Content-Encoding、非文本类型和 text/event-stream 原样返回
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+        cache_bytes: int = 32 * 1024 * 1024
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = CompressedBodyCache(cache_bytes) if cache_bytes > 0 else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        cached_encoding = None
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        if if_none_match is not None:
+            if_none_match, cached_encoding = strip_etag_suffixes(if_none_match)
+            scope = dict(scope, headers=[
+                (name, if_none_match.encode("latin-1") if name == b"if-none-match" else value)
+                for name, value in scope["headers"]
+            ])
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None and cached_encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await CompressionResponder(self, encoding, cached_encoding)(self.app, scope, receive, send)
+
+    def compress(self, encoding: str, body: bytes) -> bytes:
+        """整体压缩，优先读取缓存"""
+        key = None
+        if self.cache is not None:
+            key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+        if key is not None:
+            self.cache.set(key, compressed)
+        return compressed
+
+
+class CompressionResponder:
+    """单个请求的压缩状态"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], cached_encoding: Optional[str] = None):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.cached_encoding = cached_encoding
+        self.send = None
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.stream: Optional[StreamCompressor] = None
+
+    async def __call__(self, app: ASGIApp, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await app(scope, receive, self.send_wrapper)
+
+    def _compressible(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return content_type in COMPRESSIBLE_TYPES
+
+    def _mark_encoded(self, headers: MutableHeaders, encoding: Optional[str] = None) -> None:
+        if "etag" in headers:
+            headers["ETag"] = encoded_etag(headers["etag"], encoding or self.encoding)
+
+    async def send_wrapper(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            status = message["status"]
+            self.passthrough = (
+                self.encoding is None or status < 200 or status in (204, 304)
+                or not self._compressible(Headers(raw=message["headers"]))
+            )
+            if status == 304 and self.cached_encoding is not None:
+                # 304 确认的是客户端缓存的那个表示，ETag 带上它的编码后缀
+                self._mark_encoded(MutableHeaders(raw=message["headers"]), self.cached_encoding)
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.stream is None and not more_body:
+            # 完整响应体：小响应原样返回，否则整体压缩
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            if len(body) >= self.middleware.minimum_size:
+                body = self.middleware.compress(self.encoding, body)
+                headers["Content-Encoding"] = self.encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                self._mark_encoded(headers)
+            await self.send(self.start_message)
+            await self.send({"type": "http.response.body", "body": body})
+            return
+
+        if self.stream is None:
+            # 分块响应：长度未知，改为逐块压缩
+            self.stream = StreamCompressor(
+                self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality
+            )
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            del headers["Content-Length"]
+            self._mark_encoded(headers)
+            await self.send(self.start_message)
+
+        chunk = self.stream.compress(body) if body else b""
+        if not more_body:
+            chunk += self.stream.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -1,8 +1,17 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
 from typing import List, Optional
+from sqlalchemy.engine import make_url
 import os
 
+# 同步驱动 -> 异步驱动
+ASYNC_DRIVERS = {
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
 
 class Settings(BaseSettings):
     # Database Configuration
@@ -13,6 +22,9 @@ class Settings(BaseSettings):
     DATABASE_NAME: str = Field("interview_express", env="DATABASE_NAME")
     DATABASE_TEST_NAME: str = Field("interview_express_test", env="DATABASE_TEST_NAME")
     DATABASE_URL_DIRECT: Optional[str] = Field(None, env="DATABASE_URL_DIRECT")
+    DATABASE_ASYNC: bool = Field(False, env="DATABASE_ASYNC")
+    DATABASE_POOL_SIZE: int = Field(10, env="DATABASE_POOL_SIZE")
+    DATABASE_MAX_OVERFLOW: int = Field(20, env="DATABASE_MAX_OVERFLOW")
     
     # Constructed database URLs
     @property
@@ -21,16 +33,56 @@ class Settings(BaseSettings):
             return self.DATABASE_URL_DIRECT
         return f"mysql+pymysql://{self.DATABASE_USER}:{self.DATABASE_PASSWORD}@{self.DATABASE_HOST}:{self.DATABASE_PORT}/{self.DATABASE_NAME}"
     
+    @property
+    def async_database_url(self) -> str:
+        url = make_url(self.database_url)
+        drivername = ASYNC_DRIVERS.get(url.drivername, url.drivername)
+        return url.set(drivername=drivername).render_as_string(hide_password=False)
+    
     @property
     def database_test_url(self) -> str:
         return f"mysql+pymysql://{self.DATABASE_USER}:{self.DATABASE_PASSWORD}@{self.DATABASE_HOST}:{self.DATABASE_PORT}/{self.DATABASE_TEST_NAME}"
     
+    # 各接口作者关系的加载策略: selectin / joined / lazy
+    EXPERIENCE_LIST_AUTHOR_LOADER: str = Field("selectin", env="EXPERIENCE_LIST_AUTHOR_LOADER")
+    EXPERIENCE_SEARCH_AUTHOR_LOADER: str = Field("selectin", env="EXPERIENCE_SEARCH_AUTHOR_LOADER")
+    EXPERIENCE_DETAIL_AUTHOR_LOADER: str = Field("joined", env="EXPERIENCE_DETAIL_AUTHOR_LOADER")
+    
+    # 批量获取接口单次最多的 id 数
+    EXPERIENCE_BATCH_MAX_IDS: int = Field(100, env="EXPERIENCE_BATCH_MAX_IDS")
+    
+    # 批量导入接口单次最多的行数，以及每个事务写入的行数
+    EXPERIENCE_IMPORT_MAX_ROWS: int = Field(1000, env="EXPERIENCE_IMPORT_MAX_ROWS")
+    EXPERIENCE_IMPORT_BATCH_SIZE: int = Field(500, env="EXPERIENCE_IMPORT_BATCH_SIZE")
+    
+    # 导出接口服务端游标每次读取的行数
+    EXPERIENCE_EXPORT_CHUNK_SIZE: int = Field(1000, env="EXPERIENCE_EXPORT_CHUNK_SIZE")
+    # 允许通过接口导出的用户手机号（数据分析账号），为空时只能使用 export_experiences.py 脚本导出
+    EXPERIENCE_EXPORT_ALLOWED_PHONES: List[str] = Field([], env="EXPERIENCE_EXPORT_ALLOWED_PHONES")
+    
+    # 增量同步只返回该秒数之前的变更，避免跳过提交较慢的事务
+    EXPERIENCE_CHANGES_SETTLE_SECONDS: int = Field(2, env="EXPERIENCE_CHANGES_SETTLE_SECONDS")
+    
+    # 搜索后端: like（LIKE 全表扫描）/ ngram（倒排索引，切换后需运行 rebuild_search_index.py）
+    SEARCH_BACKEND: str = Field("like", env="SEARCH_BACKEND")
+    
     # Redis Configuration
     REDIS_HOST: str = Field("localhost", env="REDIS_HOST")
     REDIS_PORT: int = Field(6379, env="REDIS_PORT")
     REDIS_DB: int = Field(0, env="REDIS_DB")
     REDIS_PASSWORD: Optional[str] = Field(None, env="REDIS_PASSWORD")
     REDIS_URL: Optional[str] = Field(None, env="REDIS_URL")
+    # 共享连接池（app/core/redis.py），每个进程的同步池和 asyncio 池各自的上限
+    REDIS_MAX_CONNECTIONS: int = Field(50, env="REDIS_MAX_CONNECTIONS")
+    REDIS_SOCKET_TIMEOUT: float = Field(1.0, env="REDIS_SOCKET_TIMEOUT")
+    REDIS_CONNECT_TIMEOUT: float = Field(1.0, env="REDIS_CONNECT_TIMEOUT")
+    REDIS_HEALTH_CHECK_INTERVAL: int = Field(30, env="REDIS_HEALTH_CHECK_INTERVAL")
+    REDIS_RETRY_ATTEMPTS: int = Field(2, env="REDIS_RETRY_ATTEMPTS")
+    REDIS_RETRY_BACKOFF_CAP: float = Field(0.1, env="REDIS_RETRY_BACKOFF_CAP")
+    
+    @property
+    def server_workers(self) -> int:
+        return self.SERVER_WORKERS or os.cpu_count() or 1
     
     @property
     def redis_url(self) -> str:
@@ -40,10 +92,30 @@ class Settings(BaseSettings):
             return f"redis://:{self.REDIS_PASSWORD}@{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
         return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
     
+    # 接口响应缓存（Redis），TTL 单位为秒
+    CACHE_ENABLED: bool = Field(True, env="CACHE_ENABLED")
+    CACHE_FEED_TTL: int = Field(30, env="CACHE_FEED_TTL")
+    CACHE_SEARCH_TTL: int = Field(60, env="CACHE_SEARCH_TTL")
+    CACHE_DETAIL_TTL: int = Field(300, env="CACHE_DETAIL_TTL")
+    CACHE_SOCKET_TIMEOUT: float = Field(0.2, env="CACHE_SOCKET_TIMEOUT")
+    CACHE_RETRY_SECONDS: int = Field(30, env="CACHE_RETRY_SECONDS")
+    # 无法由计数表得到的列表/搜索总数（组合筛选、搜索），精确 COUNT 结果的缓存时间
+    EXPERIENCE_COUNT_CACHE_TTL: int = Field(60, env="EXPERIENCE_COUNT_CACHE_TTL")
+    
+    # 新经验实时推送（SSE）：多 worker 通过 Redis pub/sub 广播，每个连接的事件队列有上限
+    FEED_STREAM_REDIS: bool = Field(True, env="FEED_STREAM_REDIS")
+    FEED_STREAM_QUEUE_SIZE: int = Field(100, env="FEED_STREAM_QUEUE_SIZE")
+    FEED_STREAM_HEARTBEAT: int = Field(15, env="FEED_STREAM_HEARTBEAT")
+    FEED_STREAM_MAX_CONNECTIONS: int = Field(1000, env="FEED_STREAM_MAX_CONNECTIONS")
+    
     # JWT Configuration
     SECRET_KEY: str = Field("your-secret-key", env="SECRET_KEY")
     ALGORITHM: str = Field("HS256", env="ALGORITHM")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(30, env="ACCESS_TOKEN_EXPIRE_MINUTES")
+    # 登录用户的进程内缓存时间（秒），0 表示每次请求都查询数据库；资料更新通过
+    # Redis pub/sub（FEED_STREAM_REDIS）通知所有 worker，未启用或 Redis 不可用时
+    # 其他 worker 最多滞后这么久
+    AUTH_USER_CACHE_TTL: int = Field(60, env="AUTH_USER_CACHE_TTL")
     
     # 阿里云短信服务配置
     ALIYUN_ACCESS_KEY_ID: str = Field("", env="ALIYUN_ACCESS_KEY_ID")
@@ -52,15 +124,51 @@ class Settings(BaseSettings):
     ALIYUN_SMS_TEMPLATE_CODE: str = Field("", env="ALIYUN_SMS_TEMPLATE_CODE")
     ALIYUN_SMS_REGION_ID: str = Field("cn-hangzhou", env="ALIYUN_SMS_REGION_ID")
     
+    # 短信发送限流：按手机号、客户端 IP 和全局分别限制滑动窗口内和每日的发送次数，0 表示不限制
+    SMS_PHONE_WINDOW_SECONDS: int = Field(60, env="SMS_PHONE_WINDOW_SECONDS")
+    SMS_PHONE_WINDOW_LIMIT: int = Field(1, env="SMS_PHONE_WINDOW_LIMIT")
+    SMS_PHONE_DAILY_LIMIT: int = Field(10, env="SMS_PHONE_DAILY_LIMIT")
+    SMS_IP_WINDOW_SECONDS: int = Field(3600, env="SMS_IP_WINDOW_SECONDS")
+    SMS_IP_WINDOW_LIMIT: int = Field(20, env="SMS_IP_WINDOW_LIMIT")
+    SMS_IP_DAILY_LIMIT: int = Field(50, env="SMS_IP_DAILY_LIMIT")
+    SMS_GLOBAL_WINDOW_SECONDS: int = Field(60, env="SMS_GLOBAL_WINDOW_SECONDS")
+    SMS_GLOBAL_WINDOW_LIMIT: int = Field(300, env="SMS_GLOBAL_WINDOW_LIMIT")
+    SMS_GLOBAL_DAILY_LIMIT: int = Field(20000, env="SMS_GLOBAL_DAILY_LIMIT")
+    
+    # 验证码连续输错该次数后作废，需要重新获取
+    SMS_CODE_MAX_ATTEMPTS: int = Field(5, env="SMS_CODE_MAX_ATTEMPTS")
+    
+    # 短信由 Celery 任务发送，服务商返回可重试的结果码时按 退避秒数 * 2^重试次数 重试
+    SMS_TASK_MAX_RETRIES: int = Field(3, env="SMS_TASK_MAX_RETRIES")
+    SMS_TASK_RETRY_BACKOFF: int = Field(2, env="SMS_TASK_RETRY_BACKOFF")
+    
     # SMS Service Configuration (保留兼容性)
     SMS_API_KEY: str = Field("mock-sms-api-key", env="SMS_API_KEY")
     SMS_SECRET: str = Field("mock-sms-secret", env="SMS_SECRET")
     
+    # 响应压缩（br / gzip）
+    COMPRESSION_ENABLED: bool = Field(True, env="COMPRESSION_ENABLED")
+    COMPRESSION_MINIMUM_SIZE: int = Field(1024, env="COMPRESSION_MINIMUM_SIZE")
+    COMPRESSION_GZIP_LEVEL: int = Field(6, env="COMPRESSION_GZIP_LEVEL")
+    COMPRESSION_BROTLI_QUALITY: int = Field(5, env="COMPRESSION_BROTLI_QUALITY")
+    COMPRESSION_CACHE_BYTES: int = Field(32 * 1024 * 1024, env="COMPRESSION_CACHE_BYTES")
+    
     # Server Configuration
     HOST: str = Field("0.0.0.0", env="HOST")
     PORT: int = Field(8000, env="PORT")
     DEBUG: bool = Field(True, env="DEBUG")
     
+    # 生产模式（gunicorn + uvicorn worker，见 gunicorn.conf.py）
+    SERVER_WORKERS: int = Field(0, env="SERVER_WORKERS")  # 0 表示按 CPU 核数
+    SERVER_PRELOAD: bool = Field(True, env="SERVER_PRELOAD")
+    SERVER_MAX_REQUESTS: int = Field(10000, env="SERVER_MAX_REQUESTS")  # worker 处理多少请求后重启，0 表示不重启
+    SERVER_MAX_REQUESTS_JITTER: int = Field(1000, env="SERVER_MAX_REQUESTS_JITTER")
+    SERVER_TIMEOUT: int = Field(60, env="SERVER_TIMEOUT")
+    SERVER_GRACEFUL_TIMEOUT: int = Field(30, env="SERVER_GRACEFUL_TIMEOUT")
+    SERVER_KEEPALIVE: int = Field(5, env="SERVER_KEEPALIVE")
+    SERVER_LOOP: str = Field("auto", env="SERVER_LOOP")  # auto / uvloop / asyncio
+    SERVER_HTTP: str = Field("auto", env="SERVER_HTTP")  # auto / httptools / h11
+    
     # CORS Configuration
     ALLOWED_ORIGINS: List[str] = Field(["http://localhost:3000", "http://localhost:8081"], env="ALLOWED_ORIGINS")
     
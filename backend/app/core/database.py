@@ -1,6 +1,9 @@
+from typing import Union
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
 
 # Get database URL (prefer direct URL if provided, otherwise construct from components)
@@ -17,6 +20,31 @@ engine = create_engine(
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine/session, only built when DATABASE_ASYNC is enabled so the
+# async driver (aiomysql) stays optional for scripts and sync deployments
+async_engine = None
+AsyncSessionLocal = None
+if settings.DATABASE_ASYNC:
+    pool_kwargs = {}
+    if not settings.async_database_url.startswith("sqlite"):
+        pool_kwargs = {
+            "pool_size": settings.DATABASE_POOL_SIZE,
+            "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+        }
+    async_engine = create_async_engine(
+        settings.async_database_url,
+        pool_pre_ping=True,
+        pool_recycle=300,
+        echo=settings.DEBUG,
+        **pool_kwargs
+    )
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
 # Create Base class
 Base = declarative_base()
 
@@ -27,4 +55,28 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    """Dependency to get async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Session dependency used by the API routes, selected by DATABASE_ASYNC
+get_session = get_async_db if settings.DATABASE_ASYNC else get_db
+AnySession = Union[Session, AsyncSession]
+
+
+async def run_db(db: AnySession, fn, *args, **kwargs):
+    """
+    Run a sync database function without blocking the event loop.
+
+    AsyncSession runs it through ``run_sync`` on the async driver; a plain
+    Session runs it in the threadpool. ``fn`` receives the sync session as
+    its first argument.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
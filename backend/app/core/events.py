@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Set
+import orjson
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "events:experiences"
+# 登录用户缓存的失效通知，内容为手机号
+USER_CHANNEL = "events:users"
+
+
+class Subscription:
+    """
+    单个推送连接的事件队列
+
+    队列有上限：客户端消费过慢时丢弃最旧的事件并记录丢弃数，推送时先发 resync
+    事件，由客户端重新拉取列表，慢连接不会拖慢其他连接或占用无限内存
+    """
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def put(self, data: bytes) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(data)
+
+    async def get(self) -> bytes:
+        return await self.queue.get()
+
+
+class FeedBroadcaster:
+    """
+    新经验事件的广播
+
+    多个 worker 通过 Redis pub/sub 互通：发布时写入频道，每个 worker 只保持一条
+    订阅连接，收到事件后分发给本进程的所有推送连接。Redis 不可用时只分发给本进程
+    （fail open），并在 CACHE_RETRY_SECONDS 后重试。
+
+    同一条订阅连接也承载其他频道的进程间通知（如登录用户缓存失效），
+    用 on 注册处理函数，应用启动时调用 start 让每个 worker 都保持订阅。
+    """
+
+    def __init__(self, use_redis: bool = settings.FEED_STREAM_REDIS):
+        self.use_redis = use_redis
+        self.stats: Counter = Counter()
+        self._subscribers: Set[Subscription] = set()
+        self._client = None
+        self._publisher = None
+        self._listener: Optional[asyncio.Task] = None
+        self._retry_at = 0.0
+        self._handlers: Dict[str, Callable[[bytes], None]] = {CHANNEL: self._deliver}
+
+    @property
+    def client(self):
+        if self._client is None:
+            # 只用于订阅：订阅连接需要长时间阻塞读取，不设置 socket_timeout
+            self._client = aioredis.from_url(
+                settings.redis_url,
+                socket_connect_timeout=settings.CACHE_SOCKET_TIMEOUT
+            )
+        return self._client
+
+    @property
+    def publisher(self):
+        if self._publisher is None:
+            # 发布在写接口的请求内执行，与响应缓存一样使用短超时，Redis 卡住时改为只推送本进程
+            self._publisher = aioredis.from_url(
+                settings.redis_url,
+                socket_connect_timeout=settings.CACHE_SOCKET_TIMEOUT,
+                socket_timeout=settings.CACHE_SOCKET_TIMEOUT
+            )
+        return self._publisher
+
+    @property
+    def available(self) -> bool:
+        return self.use_redis and time.monotonic() >= self._retry_at
+
+    @property
+    def connections(self) -> int:
+        return len(self._subscribers)
+
+    def _on_error(self, action: str, error: Exception) -> None:
+        self.stats["errors"] += 1
+        self._retry_at = time.monotonic() + settings.CACHE_RETRY_SECONDS
+        logger.warning(f"事件{action}失败，{settings.CACHE_RETRY_SECONDS}秒内只推送本进程连接: {error}")
+
+    def on(self, channel: str, handler: Callable[[bytes], None]) -> None:
+        """注册频道的处理函数，需在 start 之前调用"""
+        self._handlers[channel] = handler
+
+    def start(self) -> None:
+        """启动本进程的订阅连接（已启动时不重复启动）"""
+        if self.use_redis and (self._listener is None or self._listener.done()):
+            self._listener = asyncio.create_task(self._listen())
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(settings.FEED_STREAM_QUEUE_SIZE)
+        self._subscribers.add(subscription)
+        self.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def _deliver(self, data: bytes) -> None:
+        self.stats["delivered"] += len(self._subscribers)
+        for subscription in self._subscribers:
+            subscription.put(data)
+
+    async def publish(self, event: Dict[str, Any]) -> None:
+        """发布事件；通过 Redis 发布时由各 worker 的订阅连接（包括本进程）分发"""
+        self.stats["published"] += 1
+        await self.notify(CHANNEL, orjson.dumps(event))
+
+    async def notify(self, channel: str, data: bytes) -> None:
+        """向频道发送消息；Redis 不可用时只交给本进程的处理函数"""
+        if self.available:
+            try:
+                await self.publisher.publish(channel, data)
+                return
+            except RedisError as e:
+                self._on_error("发布", e)
+        self._handlers[channel](data)
+
+    async def _listen(self) -> None:
+        """每个 worker 一条订阅连接，断开后等待重试"""
+        while True:
+            if not self.available:
+                await asyncio.sleep(max(self._retry_at - time.monotonic(), 0.1))
+                continue
+            pubsub = self.client.pubsub()
+            try:
+                await pubsub.subscribe(*self._handlers)
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        self._handlers[message["channel"].decode()](message["data"])
+            except RedisError as e:
+                self._on_error("订阅", e)
+            finally:
+                await pubsub.aclose()
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        for client in (self._client, self._publisher):
+            if client is not None:
+                await client.aclose()
+        self._client = self._publisher = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"connections": self.connections, **self.stats}
+
+
+feed_broadcaster = FeedBroadcaster()
@@ -0,0 +1,67 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from starlette.requests import Request
+from starlette.responses import Response
+
+# 客户端每次使用前都要带 ETag 重新验证，未变化时只返回 304
+REVALIDATE = "no-cache"
+
+
+def body_etag(body: bytes) -> str:
+    """按响应体内容生成强 ETag"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def http_date(value: datetime) -> str:
+    """数据库中无时区的时间按 UTC 处理"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    按 RFC 9110 判断是否可以返回 304：有 If-None-Match 时只比较 ETag，
+    否则比较 If-Modified-Since（精确到秒）
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return int(last_modified.timestamp()) <= int(since.timestamp())
+    return False
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
+
+
+def conditional(request: Request, response: Response) -> Response:
+    """给已生成的 JSON 响应加上内容 ETag，与 If-None-Match 一致时改为 304"""
+    etag = body_etag(response.body)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    response.headers.update(validator_headers(etag))
+    return response
@@ -0,0 +1,38 @@
+import os
+import threading
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LazySingleton(Generic[T]):
+    """
+    首次使用时才创建的进程内单例
+
+    多线程同时首次访问时只创建一次（线程池中的同步调用也会访问）；fork 后子进程
+    丢弃父进程创建的实例并重建锁，gunicorn preload 下每个 worker 各自创建，不共享
+    父进程的网络连接。
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self.factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def created(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> T:
+        instance = self._instance
+        if instance is not None:
+            return instance
+        with self._lock:
+            if self._instance is None:
+                self._instance = self.factory()
+            return self._instance
@@ -0,0 +1,68 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from sqlalchemy import and_, desc, or_
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """把排序键编码为不透明的游标字符串"""
+    payload = json.dumps(values, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """解码游标字符串，格式非法时抛出 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def encode_created_at_cursor(created_at: datetime, item_id: int) -> str:
+    """按 (created_at, id) 排序的游标"""
+    return encode_cursor([created_at.isoformat(), item_id])
+
+
+def decode_created_at_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    """解码 (created_at, id) 游标，空字符串表示第一页"""
+    if not cursor:
+        return None
+    values = decode_cursor(cursor)
+    try:
+        created_at, item_id = values
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def paginate_by_created_at(query, model, skip: int, limit: int, cursor: Optional[str]):
+    """
+    按 (created_at, id) 倒序分页
+
+    cursor 不为 None 时使用键集分页（空字符串表示第一页），翻到第 N 页与
+    第一页代价相同；否则退回到 skip/limit 偏移分页以兼容旧客户端
+    """
+    query = query.order_by(desc(model.created_at), desc(model.id))
+    if cursor is None:
+        return query.offset(skip).limit(limit)
+    position = decode_created_at_cursor(cursor)
+    if position:
+        created_at, item_id = position
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < item_id)
+        ))
+    return query.limit(limit)
+
+
+def next_created_at_cursor(items: List[Any], limit: int) -> Optional[str]:
+    """根据当前页最后一条记录生成下一页游标，没有更多数据时返回 None"""
+    if len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_created_at_cursor(last.created_at, last.id)
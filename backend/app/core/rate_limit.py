@@ -0,0 +1,121 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 所有规则的检查和记录在同一个脚本里完成，Redis 单线程执行脚本，并发请求不会同时通过。
+# 先检查全部规则，都未超限时才记录，被拒绝的请求不占用额度。
+# KEYS: 每条规则一个键；ARGV: 请求唯一标识，之后每条规则依次为 类型、上限、时长（毫秒）
+#   w: 滑动窗口，ZSET 记录窗口内每次请求的时间戳
+#   d: 固定周期计数（每日上限），时长为键的剩余有效期
+# 返回 {0, 0} 表示通过，否则返回 {超限规则序号（从 1 开始）, 需要等待的毫秒数}
+SLIDING_WINDOW_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+for i, key in ipairs(KEYS) do
+    local kind = ARGV[i * 3 - 1]
+    local limit = tonumber(ARGV[i * 3])
+    local span = tonumber(ARGV[i * 3 + 1])
+    if kind == 'w' then
+        redis.call('ZREMRANGEBYSCORE', key, '-inf', now - span)
+        local count = redis.call('ZCARD', key)
+        if count >= limit then
+            local oldest = redis.call('ZRANGE', key, count - limit, count - limit, 'WITHSCORES')
+            return {i, tonumber(oldest[2]) + span - now}
+        end
+    else
+        local count = tonumber(redis.call('GET', key) or '0')
+        if count >= limit then
+            return {i, redis.call('PTTL', key)}
+        end
+    end
+end
+for i, key in ipairs(KEYS) do
+    local kind = ARGV[i * 3 - 1]
+    local span = tonumber(ARGV[i * 3 + 1])
+    if kind == 'w' then
+        redis.call('ZADD', key, now, ARGV[1])
+        redis.call('PEXPIRE', key, span)
+    elseif redis.call('INCR', key) == 1 then
+        redis.call('PEXPIRE', key, span)
+    end
+end
+return {0, 0}
+"""
+
+# 归还一次已记录的请求，KEYS/ARGV 与 SLIDING_WINDOW_SCRIPT 相同：
+# 滑动窗口删除本次请求的成员，每日计数减一（不会减到 0 以下）
+RELEASE_SCRIPT = """
+for i, key in ipairs(KEYS) do
+    if ARGV[i * 3 - 1] == 'w' then
+        redis.call('ZREM', key, ARGV[1])
+    elseif tonumber(redis.call('GET', key) or '0') > 0 then
+        redis.call('DECR', key)
+    end
+end
+return 0
+"""
+
+# 每日上限按北京时间的自然日计算
+DAY_TIMEZONE = timezone(timedelta(hours=8))
+
+
+class SlidingWindowLimiter:
+    """
+    基于 Redis Lua 脚本的原子限流器，一次往返检查并记录多个维度的滑动窗口和每日上限
+
+    规则为 (维度名, 标识, 窗口秒数, 窗口内上限, 每日上限)，上限为 0 表示不限制该项。
+    时间取 Redis 服务器时间，多个 worker 之间没有时钟偏差。
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+
+    def build(self, rules: Sequence[Tuple[str, str, int, int, int]]) -> Tuple[List[str], List[Any], List[str]]:
+        """生成脚本的 KEYS、ARGV，以及每个键对应的维度名（用于说明超限原因）"""
+        now = datetime.now(DAY_TIMEZONE)
+        tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        day_ms = int((tomorrow - now).total_seconds() * 1000) + 1
+        keys, args, scopes = [], [uuid.uuid4().hex], []
+        for scope, identity, window, window_limit, daily_limit in rules:
+            key = f"{self.prefix}:{scope}:{identity}" if identity else f"{self.prefix}:{scope}"
+            if window > 0 and window_limit > 0:
+                keys.append(key)
+                args.extend(["w", window_limit, window * 1000])
+                scopes.append(scope)
+            if daily_limit > 0:
+                keys.append(f"{key}:{now:%Y%m%d}")
+                args.extend(["d", daily_limit, day_ms])
+                scopes.append(f"{scope}_daily")
+        return keys, args, scopes
+
+    @staticmethod
+    def parse(result: Sequence[int], scopes: List[str]) -> Dict[str, Any]:
+        index, wait_ms = int(result[0]), int(result[1])
+        if index == 0:
+            return {"allowed": True, "scope": "", "retry_after": 0}
+        return {"allowed": False, "scope": scopes[index - 1], "retry_after": max((wait_ms + 999) // 1000, 1)}
+
+    async def hit(self, client, rules: Sequence[Tuple[str, str, int, int, int]]) -> Dict[str, Any]:
+        """
+        检查并记录一次请求
+
+        Returns:
+            Dict: allowed 是否通过，scope 超限的维度，retry_after 建议等待秒数，
+                  reservation 本次记录的键和参数（用于 release 归还）；
+                  Redis 异常直接抛出，由调用方决定如何处理
+        """
+        keys, args, scopes = self.build(rules)
+        if not keys:
+            return {**self.parse((0, 0), scopes), "reservation": None}
+        script = client.register_script(SLIDING_WINDOW_SCRIPT)
+        result = self.parse(await script(keys=keys, args=args), scopes)
+        result["reservation"] = (keys, args) if result["allowed"] else None
+        return result
+
+    async def release(self, client, reservation: Optional[Tuple[List[str], List[Any]]]) -> None:
+        """归还 hit 记录的一次请求（请求最终没有执行时调用），Redis 异常直接抛出"""
+        if not reservation:
+            return
+        keys, args = reservation
+        script = client.register_script(RELEASE_SCRIPT)
+        await script(keys=keys, args=args)
@@ -0,0 +1,84 @@
+from typing import Any, Dict, Optional
+import redis
+import redis.asyncio as aioredis
+from redis.asyncio.retry import Retry as AsyncRetry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, TimeoutError
+from redis.retry import Retry
+from app.core.config import settings
+
+# 每个进程一个同步连接池和一个 asyncio 连接池，首次使用时创建。
+# 同步连接池在 fork 后会自动重建（redis-py 检查 pid），gunicorn preload 下也不会共享连接。
+_sync_pool: Optional[redis.ConnectionPool] = None
+_async_pool: Optional[aioredis.ConnectionPool] = None
+
+
+def _pool_options() -> Dict[str, Any]:
+    return {
+        "max_connections": settings.REDIS_MAX_CONNECTIONS,
+        "socket_timeout": settings.REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": settings.REDIS_CONNECT_TIMEOUT,
+        "socket_keepalive": True,
+        # 连接空闲超过该秒数后，取出时先 PING 一次，剔除被服务端或中间设备断开的连接
+        "health_check_interval": settings.REDIS_HEALTH_CHECK_INTERVAL,
+        "retry_on_timeout": True,
+    }
+
+
+def _backoff() -> ExponentialBackoff:
+    return ExponentialBackoff(cap=settings.REDIS_RETRY_BACKOFF_CAP, base=0.01)
+
+
+def create_sync_pool() -> redis.ConnectionPool:
+    return redis.ConnectionPool.from_url(
+        settings.redis_url,
+        retry=Retry(_backoff(), settings.REDIS_RETRY_ATTEMPTS, supported_errors=(ConnectionError, TimeoutError)),
+        **_pool_options()
+    )
+
+
+def create_async_pool() -> aioredis.ConnectionPool:
+    return aioredis.ConnectionPool.from_url(
+        settings.redis_url,
+        retry=AsyncRetry(_backoff(), settings.REDIS_RETRY_ATTEMPTS, supported_errors=(ConnectionError, TimeoutError)),
+        **_pool_options()
+    )
+
+
+def get_redis() -> redis.Redis:
+    """同步客户端（Celery 任务、脚本等非 asyncio 代码使用），可作为 FastAPI 依赖"""
+    global _sync_pool
+    if _sync_pool is None:
+        _sync_pool = create_sync_pool()
+    return redis.Redis(connection_pool=_sync_pool)
+
+
+def get_async_redis() -> aioredis.Redis:
+    """asyncio 客户端（async 接口使用，不阻塞事件循环），可作为 FastAPI 依赖"""
+    global _async_pool
+    if _async_pool is None:
+        _async_pool = create_async_pool()
+    return aioredis.Redis(connection_pool=_async_pool)
+
+
+async def close_redis() -> None:
+    """关闭连接池（应用关闭时调用）"""
+    global _sync_pool, _async_pool
+    if _async_pool is not None:
+        await _async_pool.disconnect()
+        _async_pool = None
+    if _sync_pool is not None:
+        _sync_pool.disconnect()
+        _sync_pool = None
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    stats = {}
+    for name, pool in (("sync", _sync_pool), ("async", _async_pool)):
+        if pool is not None:
+            stats[name] = {
+                "max_connections": pool.max_connections,
+                "in_use": len(pool._in_use_connections),
+                "idle": len(pool._available_connections),
+            }
+    return stats
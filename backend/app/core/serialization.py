@@ -0,0 +1,26 @@
+from functools import lru_cache
+from typing import Any
+from pydantic import TypeAdapter
+from starlette.responses import Response
+
+
+@lru_cache(maxsize=None)
+def get_adapter(schema: Any) -> TypeAdapter:
+    """按类型缓存 TypeAdapter，校验器和序列化器只编译一次"""
+    return TypeAdapter(schema)
+
+
+def to_json(schema: Any, data: Any) -> bytes:
+    """
+    ORM 对象 -> pydantic 模型 -> JSON bytes
+
+    只做一次 from_attributes 校验，由 pydantic-core 直接编码为 bytes，
+    不再经过 response_model 的二次校验、jsonable_encoder 和标准库 json
+    """
+    adapter = get_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+
+class JSONBytesResponse(Response):
+    """内容已经是编码好的 JSON bytes，直接发送"""
+    media_type = "application/json"
@@ -0,0 +1,17 @@
+from uvicorn.workers import UvicornWorker
+from app.core.config import settings
+
+
+class AppUvicornWorker(UvicornWorker):
+    """
+    gunicorn 使用的 uvicorn worker
+
+    事件循环和 HTTP 解析器由 SERVER_LOOP / SERVER_HTTP 决定，auto 时安装了
+    uvloop / httptools（uvicorn[standard]）就使用它们
+    """
+
+    CONFIG_KWARGS = {
+        "loop": settings.SERVER_LOOP,
+        "http": settings.SERVER_HTTP,
+        "lifespan": "on",
+    }
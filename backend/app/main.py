@@ -1,6 +1,11 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.cache import response_cache
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.events import feed_broadcaster
+from app.core.redis import close_redis, get_pool_stats
 from app.api.v1 import api_router
 
 app = FastAPI(
@@ -8,7 +13,9 @@ app = FastAPI(
     description="面试经验分享平台后端API",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # 其余接口返回的 dict 用 orjson 编码；经验接口直接返回编码好的 bytes
+    default_response_class=ORJSONResponse
 )
 
 # 配置CORS
@@ -20,10 +27,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应压缩，放在最外层
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        cache_bytes=settings.COMPRESSION_CACHE_BYTES
+    )
+
 # 包含API路由
 app.include_router(api_router, prefix="/api/v1")
 
 
+@app.on_event("startup")
+async def startup():
+    # 每个 worker 启动订阅连接，接收新经验事件和登录用户缓存的失效通知
+    feed_broadcaster.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await feed_broadcaster.close()
+    await close_redis()
+
+
 @app.get("/")
 async def root():
     return {"message": "Interview Express API is running!"}
@@ -31,4 +60,9 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {
+        "status": "healthy",
+        "cache": response_cache.get_stats(),
+        "stream": feed_broadcaster.get_stats(),
+        "redis": get_pool_stats()
+    } 
\ No newline at end of file
@@ -1,10 +1,14 @@
 from app.core.database import Base
 from app.models.user import User
 from app.models.experience import Experience
+from app.models.experience_change import ExperienceChange
+from app.models.experience_count import ExperienceCount
+from app.models.search_index import ExperienceSearchToken
+from app.models.tag import Tag, experience_tags
 from sqlalchemy.orm import relationship
 
 # 添加反向关系
 User.experiences = relationship("Experience", back_populates="user")
 
 # 导出所有模型
-__all__ = ["Base", "User", "Experience"] 
\ No newline at end of file
+__all__ = ["Base", "User", "Experience", "ExperienceChange", "ExperienceCount", "ExperienceSearchToken", "Tag", "experience_tags"] 
\ No newline at end of file
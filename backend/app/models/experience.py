@@ -1,11 +1,16 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, Index
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from app.core.database import Base
+from app.models.tag import experience_tags
 
 
 class Experience(Base):
     __tablename__ = "experiences"
+    __table_args__ = (
+        # 键集分页: ORDER BY created_at DESC, id DESC
+        Index("ix_experiences_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     company = Column(String(100), nullable=False, index=True)
@@ -13,13 +18,31 @@ class Experience(Base):
     summary = Column(Text, nullable=False)
     content = Column(Text, nullable=False)
     difficulty = Column(Float, default=0.0)  # 难度评分 0-5
-    tags = Column(Text, nullable=True)  # JSON格式存储标签
+    # 旧版 JSON 格式标签，已迁移到 tags / experience_tags 表，不再写入，查询时也不加载
+    tags_json = deferred(Column("tags", Text, nullable=True))
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # 每次更新加一，用于生成详情的 ETag（updated_at 只精确到秒）
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # 批量导入时的临时行标记，id 不连续分配时用它查回新行的 id，查回后清空
+    import_key = deferred(Column(String(40), nullable=True, index=True))
     
     # 关系
     user = relationship("User", back_populates="experiences")
+    # 标签通过关联表读取，每页固定一条 IN 查询；写入由 ExperienceService 维护
+    tag_objects = relationship(
+        "Tag",
+        secondary=experience_tags,
+        order_by=experience_tags.c.position,
+        lazy="selectin",
+        viewonly=True
+    )
+    
+    @property
+    def tags(self):
+        """标签名称列表"""
+        return [tag.name for tag in self.tag_objects]
     
     def __repr__(self):
         return f"<Experience(id={self.id}, company={self.company}, position={self.position})>" 
\ No newline at end of file
@@ -0,0 +1,21 @@
+from sqlalchemy import Boolean, Column, DateTime, Integer
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class ExperienceChange(Base):
+    """
+    经验变更日志（只追加），供客户端增量同步
+
+    每次新建、修改、删除经验时在同一事务中追加一行；seq 单调递增，作为同步水位。
+    删除的经验记为 deleted 墓碑，经验本身已物理删除，客户端据此移除本地数据
+    """
+    __tablename__ = "experience_changes"
+    
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    experience_id = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<ExperienceChange(seq={self.seq}, experience_id={self.experience_id}, deleted={self.deleted})>"
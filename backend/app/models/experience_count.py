@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String
+from app.core.database import Base
+
+
+class ExperienceCount(Base):
+    """
+    按 (公司, 职位) 汇总的经验数，写入经验时维护
+
+    行数只与公司/职位组合数相关，列表总数可由 SUM(experience_count) 配合与
+    经验表相同的 company/position 过滤条件精确得到，无需扫描经验表
+    """
+    __tablename__ = "experience_counts"
+    
+    company = Column(String(100), primary_key=True)
+    position = Column(String(100), primary_key=True)
+    experience_count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<ExperienceCount(company={self.company}, position={self.position}, experience_count={self.experience_count})>"
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy.dialects import mysql
+from app.core.database import Base
+
+
+class ExperienceSearchToken(Base):
+    """经验搜索倒排索引：每个 (token, experience) 一行，weight 为字段加权后的词频得分"""
+    __tablename__ = "experience_search_tokens"
+    
+    # 词元按二进制比较，避免 utf8mb4_unicode_ci 把不同的假名/全半角字符视为同一主键
+    token = Column(
+        String(32).with_variant(mysql.VARCHAR(32, collation="utf8mb4_bin"), "mysql"),
+        primary_key=True
+    )
+    experience_id = Column(
+        Integer,
+        ForeignKey("experiences.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True
+    )
+    weight = Column(Integer, nullable=False, default=1)
+    
+    def __repr__(self):
+        return f"<ExperienceSearchToken(token={self.token}, experience_id={self.experience_id}, weight={self.weight})>"
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Table, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+# 经验-标签关联表，position 保留用户填写标签的顺序
+experience_tags = Table(
+    "experience_tags",
+    Base.metadata,
+    Column("experience_id", Integer, ForeignKey("experiences.id", ondelete="CASCADE"), primary_key=True),
+    Column("tag_id", Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+    Column("position", Integer, nullable=False, default=0),
+    # 按标签筛选经验: WHERE tag_id IN (...) -> experience_id
+    Index("ix_experience_tags_tag_id_experience_id", "tag_id", "experience_id"),
+)
+
+
+class Tag(Base):
+    __tablename__ = "tags"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(50), unique=True, index=True, nullable=False)
+    experience_count = Column(Integer, nullable=False, default=0)  # 使用该标签的经验数，写入时维护
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<Tag(id={self.id}, name={self.name}, experience_count={self.experience_count})>"
@@ -1,2 +1,2 @@
-from app.schemas.user import User, UserCreate, UserUpdate, UserLogin, Token, TokenData
-from app.schemas.experience import Experience, ExperienceCreate, ExperienceUpdate, ExperienceList 
\ No newline at end of file
+from app.schemas.user import User, UserCreate, UserUpdate, UserLogin, Token, TokenData, CurrentUser
+from app.schemas.experience import Experience, ExperienceCreate, ExperienceUpdate, ExperienceList, ExperienceCursorPage, ExperienceSummary, ExperienceBatch, ExperienceChanges, ExperienceImportReport, TagCount 
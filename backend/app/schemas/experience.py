@@ -1,5 +1,6 @@
+import json
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List
+from typing import Optional, List, Union
 from datetime import datetime
 from app.schemas.user import User
 
@@ -36,7 +37,6 @@ class ExperienceInDB(ExperienceBase):
     @field_validator('tags', mode='before')
     @classmethod
     def parse_tags(cls, v):
-        import json
         if v is None:
             return []
         if isinstance(v, list):
@@ -54,8 +54,62 @@ class Experience(ExperienceInDB):
     user: Optional[User] = None  # 用户信息
 
 
+class ExperienceSummary(BaseModel):
+    """列表卡片使用的精简结构（view=summary），不包含 content"""
+    id: int
+    company: str
+    position: str
+    summary: str
+    difficulty: float = 0.0
+    tags: List[str] = []
+    user_id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    user: Optional[User] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ExperienceCursorPage(BaseModel):
+    experiences: List[Union[Experience, ExperienceSummary]]
+    next_cursor: Optional[str] = None  # 为空表示没有更多数据
+    total: Optional[int] = None  # 仅在 with_total=true 时返回
+
+
+class ExperienceBatch(BaseModel):
+    experiences: List[Union[Experience, ExperienceSummary]]  # 按请求的 id 顺序
+    missing_ids: List[int] = []  # 不存在的 id
+
+
+class ExperienceChanges(BaseModel):
+    experiences: List[Union[Experience, ExperienceSummary]]  # 新增或修改的经验
+    deleted_ids: List[int] = []  # 已删除的经验 id
+    next_token: str  # 下次请求的 since
+    has_more: bool = False  # 为 true 时应立即用 next_token 继续拉取
+
+
+class ImportRowError(BaseModel):
+    index: int  # 行号，从 0 开始
+    errors: List[str]
+
+
+class ExperienceImportReport(BaseModel):
+    created: int
+    ids: List[int] = []  # 按输入顺序
+    errors: List[ImportRowError] = []
+
+
+class TagCount(BaseModel):
+    name: str
+    experience_count: int = Field(..., description="使用该标签的经验数")
+
+    class Config:
+        from_attributes = True
+
+
 class ExperienceList(BaseModel):
-    experiences: List[Experience]
+    experiences: List[Union[Experience, ExperienceSummary]]
     total: int
     page: int
     size: int 
\ No newline at end of file
@@ -39,6 +39,17 @@ class User(UserInDB):
         from_attributes = True
 
 
+class CurrentUser(BaseModel):
+    """已登录用户的身份信息，按手机号缓存在进程内"""
+    id: int
+    phone: str
+    username: str
+    is_active: bool = True
+
+    class Config:
+        from_attributes = True
+
+
 class UserLogin(BaseModel):
     phone: str = Field(..., description="手机号码", min_length=11, max_length=11)
     username: str = Field(..., description="用户名", min_length=1, max_length=50)
@@ -7,6 +7,7 @@ from alibabacloud_dysmsapi20170525 import models as dysmsapi_models
 from alibabacloud_tea_util import models as util_models
 from alibabacloud_tea_util.client import Client as UtilClient
 from app.core.config import settings
+from app.core.lazy import LazySingleton
 
 logger = logging.getLogger(__name__)
 
@@ -139,5 +140,16 @@ class AliyunSMSService:
             }
 
 
-# 创建全局实例
-aliyun_sms_service = AliyunSMSService() 
\ No newline at end of file
+# 全局实例，首次使用时创建客户端
+_aliyun_sms_service = LazySingleton(AliyunSMSService)
+
+
+def get_aliyun_sms_service() -> AliyunSMSService:
+    return _aliyun_sms_service.get()
+
+
+def __getattr__(name: str):
+    # 兼容 from app.services.aliyun_sms_service import aliyun_sms_service
+    if name == "aliyun_sms_service":
+        return get_aliyun_sms_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,55 @@
+from datetime import timedelta
+from typing import Iterable, List, Tuple
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.experience_change import ExperienceChange
+
+
+class ChangeService:
+    """
+    维护经验变更日志，按 seq 水位返回增量
+
+    自增 seq 按插入顺序分配，但事务提交顺序可能不同：seq 较大的变更先提交时，
+    如果客户端立即把水位推进到它，之后提交的较小 seq 就永远不会被读到。
+    因此只返回 EXPERIENCE_CHANGES_SETTLE_SECONDS 之前的变更，写事务都很短，
+    这段时间内未提交的较小 seq 不会再出现。
+    """
+
+    def record(self, db: Session, experience_ids: Iterable[int], deleted: bool = False) -> None:
+        """在当前事务中追加变更记录"""
+        rows = [{"experience_id": experience_id, "deleted": deleted} for experience_id in experience_ids]
+        if rows:
+            db.execute(insert(ExperienceChange), rows)
+
+    def parse_token(self, token: str) -> int:
+        """解码同步水位，空字符串表示从头开始；格式非法时抛出 ValueError"""
+        if not token:
+            return 0
+        values = decode_cursor(token)
+        if len(values) != 1 or not isinstance(values[0], int) or values[0] < 0:
+            raise ValueError("Invalid token")
+        return values[0]
+
+    def encode_token(self, seq: int) -> str:
+        return encode_cursor([seq])
+
+    def get_changes(self, db: Session, since: int, limit: int) -> Tuple[List[Tuple[int, int, bool]], bool]:
+        """
+        返回 seq > since 的变更 (seq, 经验 id, 是否删除)，按 seq 升序，最多 limit 条，
+        以及是否还有更多
+        """
+        query = select(
+            ExperienceChange.seq, ExperienceChange.experience_id, ExperienceChange.deleted
+        ).where(ExperienceChange.seq > since)
+        if settings.EXPERIENCE_CHANGES_SETTLE_SECONDS > 0:
+            now = db.execute(select(func.now())).scalar()
+            query = query.where(
+                ExperienceChange.changed_at <= now - timedelta(seconds=settings.EXPERIENCE_CHANGES_SETTLE_SECONDS)
+            )
+        rows = db.execute(query.order_by(ExperienceChange.seq).limit(limit + 1)).all()
+        return [tuple(row) for row in rows[:limit]], len(rows) > limit
+
+
+change_service = ChangeService()
@@ -0,0 +1,73 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, literal, select, tuple_, update
+from app.core.cache import LocalTTLCache
+from app.core.config import settings
+from app.models.experience import Experience
+from app.models.experience_count import ExperienceCount
+from typing import Callable, Hashable, Optional
+
+
+class CountService:
+    """
+    经验总数：优先使用写入时维护的计数，其余情况使用带 TTL 缓存的精确 COUNT
+
+    - 无筛选 / 公司、职位筛选：experience_counts 汇总表
+    - 单个标签筛选：tags.experience_count
+    - 其他组合筛选和搜索：COUNT 结果在进程内缓存 EXPERIENCE_COUNT_CACHE_TTL 秒，
+      期间的写入不会立即反映到总数上
+    """
+
+    def __init__(self):
+        self.cache = LocalTTLCache(ttl=settings.EXPERIENCE_COUNT_CACHE_TTL)
+
+    def _group_of(self, experience_condition):
+        return select(Experience.company, Experience.position).where(experience_condition)
+
+    def adjust(self, db: Session, experience_condition, delta: int) -> None:
+        """
+        按经验的 (公司, 职位) 增减汇总计数，经验由条件子查询给出，
+        不满足条件（如经验不属于当前用户）时不产生任何影响
+        """
+        group = tuple_(ExperienceCount.company, ExperienceCount.position)
+        if delta > 0:
+            # 先确保汇总行存在，并发创建同一行时忽略冲突
+            db.execute(
+                insert(ExperienceCount)
+                .from_select(
+                    ["company", "position", "experience_count"],
+                    select(Experience.company, Experience.position, literal(0)).where(experience_condition)
+                )
+                .prefix_with("IGNORE", dialect="mysql")
+                .prefix_with("OR IGNORE", dialect="sqlite")
+            )
+        db.execute(
+            update(ExperienceCount)
+            .where(group.in_(self._group_of(experience_condition)))
+            .values(experience_count=ExperienceCount.experience_count + delta)
+            .execution_options(synchronize_session=False)
+        )
+
+    def count_by_company_position(
+        self,
+        db: Session,
+        company: Optional[str] = None,
+        position: Optional[str] = None
+    ) -> int:
+        """与列表接口相同的 contains 条件作用于汇总表，结果与 COUNT(*) 一致"""
+        query = select(func.coalesce(func.sum(ExperienceCount.experience_count), 0))
+        if company:
+            query = query.where(ExperienceCount.company.contains(company))
+        if position:
+            query = query.where(ExperienceCount.position.contains(position))
+        return int(db.execute(query).scalar())
+
+    def cached_count(self, key: Hashable, count: Callable[[], int]) -> int:
+        """读取缓存的精确计数，未命中时执行 count 并缓存"""
+        total = self.cache.get(key)
+        if total is None:
+            total = count()
+            self.cache.set(key, total)
+        return total
+
+
+count_service = CountService()
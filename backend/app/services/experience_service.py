@@ -1,16 +1,90 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import and_, delete, func, select, update
+from sqlalchemy.orm import Session, defer, joinedload, lazyload, selectinload
+from app.core.database import AnySession, run_db
+from app.core.pagination import next_created_at_cursor, paginate_by_created_at
 from app.models.experience import Experience
 from app.models.user import User
 from app.schemas.experience import ExperienceCreate, ExperienceUpdate
-from typing import List, Optional
-import json
+from app.services.change_service import change_service
+from app.services.count_service import count_service
+from app.services.search_service import SEARCHABLE_FIELDS, search_backend
+from app.services.tag_service import tag_service
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+# 作者关系的加载策略：selectin 每页固定一条 IN 查询，joined 与主查询合并为一条，
+# lazy 为逐行懒加载（N+1，仅用于同步会话且不需要作者信息的场景）
+AUTHOR_LOADERS = {
+    "selectin": selectinload,
+    "joined": joinedload,
+    "lazy": lazyload,
+}
+
+
+def author_loader_option(strategy: str):
+    """根据策略名称构造作者关系的加载选项"""
+    loader = AUTHOR_LOADERS.get(strategy)
+    if loader is None:
+        raise ValueError(f"Unknown author loader strategy: {strategy}")
+    return loader(Experience.user)
+
+
+def list_options(author_loader: str, view: str = "full") -> tuple:
+    """
+    列表/搜索查询的加载选项；view=summary 时不读取 content 列，
+    误访问 content 会直接报错而不是再发一条查询
+    """
+    options = (author_loader_option(author_loader),)
+    if view == "summary":
+        options += (defer(Experience.content, raiseload=True),)
+    return options
 
 
 class ExperienceService:
-    def get_experience(self, db: Session, experience_id: int) -> Optional[Experience]:
+    def __init__(self, backend=search_backend):
+        self.search_backend = backend
+    
+    def get_experience(
+        self, 
+        db: Session, 
+        experience_id: int,
+        author_loader: str = "joined"
+    ) -> Optional[Experience]:
         """获取单个经验"""
-        return db.query(Experience).filter(Experience.id == experience_id).first()
+        return db.query(Experience).options(
+            author_loader_option(author_loader)
+        ).filter(Experience.id == experience_id).first()
+    
+    def get_experience_validators(self, db: Session, experience_id: int) -> Optional[Tuple[str, datetime]]:
+        """
+        详情的 ETag 和 Last-Modified，只按主键读取版本号和时间列，不加载正文
+
+        详情包含作者信息，作者资料更新也会改变 ETag
+        """
+        row = db.execute(
+            select(
+                Experience.version, Experience.created_at, Experience.updated_at,
+                User.created_at, User.updated_at
+            ).join(User, User.id == Experience.user_id).where(Experience.id == experience_id)
+        ).first()
+        if row is None:
+            return None
+        return self._validators(experience_id, *row)
+    
+    def experience_validators(self, experience: Experience) -> Tuple[str, datetime]:
+        """由已加载的经验（含作者）计算 ETag 和 Last-Modified，与 get_experience_validators 一致"""
+        user = experience.user
+        return self._validators(
+            experience.id, experience.version, experience.created_at, experience.updated_at,
+            user.created_at, user.updated_at
+        )
+    
+    @staticmethod
+    def _validators(experience_id, version, created_at, updated_at, user_created_at, user_updated_at):
+        user_modified = user_updated_at or user_created_at
+        last_modified = max(filter(None, (created_at, updated_at, user_modified)))
+        user_stamp = int(user_modified.timestamp()) if user_modified else 0
+        return f'"{experience_id}.{version}.{user_stamp}"', last_modified
     
     def get_experiences(
         self, 
@@ -19,95 +93,334 @@ class ExperienceService:
         limit: int = 10,
         company: Optional[str] = None,
         position: Optional[str] = None,
-        tags: Optional[List[str]] = None
+        tags: Optional[List[str]] = None,
+        author_loader: str = "selectin",
+        cursor: Optional[str] = None,
+        tag_mode: str = "all",
+        view: str = "full"
     ) -> List[Experience]:
         """获取经验列表"""
-        query = db.query(Experience)
-        
+        query = db.query(Experience).options(*list_options(author_loader, view))
+        query = self._apply_filters(query, company, position, tags, tag_mode)
+        return paginate_by_created_at(query, Experience, skip, limit, cursor).all()
+    
+    def get_experiences_by_ids(
+        self,
+        db: Session,
+        ids: List[int],
+        author_loader: str = "selectin",
+        view: str = "full"
+    ) -> List[Experience]:
+        """一条 IN 查询批量获取经验，返回顺序与 ids 一致，不存在的 id 被跳过"""
+        if not ids:
+            return []
+        found = {
+            experience.id: experience
+            for experience in db.query(Experience).options(
+                *list_options(author_loader, view)
+            ).filter(Experience.id.in_(ids))
+        }
+        return [found[experience_id] for experience_id in ids if experience_id in found]
+    
+    def _apply_filters(self, query, company, position, tags, tag_mode):
         if company:
             query = query.filter(Experience.company.contains(company))
         if position:
             query = query.filter(Experience.position.contains(position))
         if tags:
-            # 简单的标签匹配，实际项目中可能需要更复杂的搜索
-            for tag in tags:
-                query = query.filter(Experience.tags.contains(tag))
+            query = query.filter(Experience.id.in_(tag_service.experience_ids_with_tags(tags, tag_mode)))
+        return query
+    
+    def count_experiences(
+        self,
+        db: Session,
+        company: Optional[str] = None,
+        position: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        tag_mode: str = "all"
+    ) -> int:
+        """
+        列表总数：无标签筛选时读 (公司, 职位) 计数表，单个标签读标签计数，
+        其余组合使用缓存的精确 COUNT
+        """
+        tags = tag_service.normalize(tags)
+        if not tags:
+            return count_service.count_by_company_position(db, company, position)
+        if len(tags) == 1 and not company and not position:
+            return tag_service.get_experience_count(db, tags[0])
         
-        return query.order_by(desc(Experience.created_at)).offset(skip).limit(limit).all()
+        def count() -> int:
+            query = self._apply_filters(db.query(func.count(Experience.id)), company, position, tags, tag_mode)
+            return query.scalar()
+        
+        key = ("list", company, position, tuple(sorted(tags)), tag_mode)
+        return count_service.cached_count(key, count)
     
-    def create_experience(self, db: Session, experience: ExperienceCreate, user_phone: str) -> Experience:
+    def create_experience(self, db: Session, experience: ExperienceCreate, user_id: int) -> Experience:
         """创建经验"""
-        # 根据手机号获取用户ID
-        user = db.query(User).filter(User.phone == user_phone).first()
-        if not user:
-            raise ValueError(f"User with phone {user_phone} not found")
         experience_data = experience.dict()
-        # 这行必须无条件执行，不能加if
-        experience_data["tags"] = json.dumps(experience_data.get("tags", []))
-        db_experience = Experience(**experience_data, user_id=user.id)
+        tags = experience_data.pop("tags", None)
+        db_experience = Experience(**experience_data, user_id=user_id)
         db.add(db_experience)
+        db.flush()
+        count_service.adjust(db, Experience.id == db_experience.id, 1)
+        tag_service.set_experience_tags(db, db_experience.id, tags)
+        db.expire(db_experience, ["tag_objects"])
+        self.search_backend.index_experience(db, db_experience)
+        change_service.record(db, [db_experience.id])
         db.commit()
-        db.refresh(db_experience)
-        return db_experience
+        # 重新读取并同时加载作者，异步路由序列化时不会再触发懒加载
+        return self.get_experience(db, db_experience.id)
     
     def update_experience(
         self, 
         db: Session, 
         experience_id: int, 
         experience_update: ExperienceUpdate,
-        user_phone: str
+        user_id: int
     ) -> Optional[Experience]:
-        """更新经验"""
-        # 根据手机号获取用户ID
-        user = db.query(User).filter(User.phone == user_phone).first()
-        if not user:
-            return None
-        
-        db_experience = self.get_experience(db, experience_id)
-        if not db_experience or db_experience.user_id != user.id:
-            return None
-        
+        """
+        更新经验，UPDATE ... WHERE id = ? AND user_id = ? 一条语句完成归属校验和
+        更新，影响行数为 0 表示经验不存在或不属于该用户
+        """
         update_data = experience_update.dict(exclude_unset=True)
-        if update_data.get("tags"):
-            update_data["tags"] = json.dumps(update_data["tags"])
-        
-        for field, value in update_data.items():
-            setattr(db_experience, field, value)
+        tags = update_data.pop("tags", None)
+        owned = and_(Experience.id == experience_id, Experience.user_id == user_id)
+        regroup = bool(update_data.keys() & {"company", "position"})
+        if regroup:
+            count_service.adjust(db, owned, -1)
+        result = db.execute(
+            update(Experience)
+            .where(owned)
+            .values(**update_data, updated_at=func.now(), version=Experience.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.rollback()
+            return None
         
+        if regroup:
+            count_service.adjust(db, Experience.id == experience_id, 1)
+        if tags is not None:
+            tag_service.set_experience_tags(db, experience_id, tags)
+        if tags is not None or update_data.keys() & SEARCHABLE_FIELDS:
+            db_experience = db.get(Experience, experience_id, populate_existing=True)
+            self.search_backend.index_experience(db, db_experience)
+        change_service.record(db, [experience_id])
         db.commit()
-        db.refresh(db_experience)
-        return db_experience
-    
-    def delete_experience(self, db: Session, experience_id: int, user_phone: str) -> bool:
-        """删除经验"""
-        # 根据手机号获取用户ID
-        user = db.query(User).filter(User.phone == user_phone).first()
-        if not user:
-            return False
-        
-        db_experience = self.get_experience(db, experience_id)
-        if not db_experience or db_experience.user_id != user.id:
+        return self.get_experience(db, experience_id)
+    
+    def delete_experience(self, db: Session, experience_id: int, user_id: int) -> bool:
+        """
+        删除经验，DELETE ... WHERE id = ? AND user_id = ?，不需要先查询经验
+
+        标签计数和关联在删除前按同样的归属条件处理，非本人的经验不受影响
+        """
+        owned = and_(Experience.id == experience_id, Experience.user_id == user_id)
+        count_service.adjust(db, owned, -1)
+        tag_service.remove_experience_tags(
+            db, experience_id, owned_by=select(Experience.id).where(owned)
+        )
+        result = db.execute(
+            delete(Experience).where(owned).execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.rollback()
             return False
         
-        db.delete(db_experience)
+        self.search_backend.remove_experience(db, experience_id)
+        change_service.record(db, [experience_id], deleted=True)
         db.commit()
         return True
     
+    def get_changes(
+        self,
+        db: Session,
+        since: int,
+        limit: int = 100,
+        author_loader: str = "selectin",
+        view: str = "full"
+    ) -> Tuple[List[Experience], List[int], int, bool]:
+        """
+        增量同步：读取 seq > since 的变更，同一经验只保留最后一次
+
+        返回 (新增或修改的经验, 已删除的 id, 新水位, 是否还有更多)；
+        变更后又被删除、已不存在的经验也计入已删除
+        """
+        changes, has_more = change_service.get_changes(db, since, limit)
+        latest = {}
+        for _, experience_id, deleted in changes:
+            latest.pop(experience_id, None)
+            latest[experience_id] = deleted
+        experiences = self.get_experiences_by_ids(
+            db, [experience_id for experience_id, deleted in latest.items() if not deleted],
+            author_loader=author_loader, view=view
+        )
+        found = {experience.id for experience in experiences}
+        deleted_ids = [experience_id for experience_id in latest if experience_id not in found]
+        watermark = changes[-1][0] if changes else since
+        return experiences, deleted_ids, watermark, has_more
+    
     def search_experiences(
         self, 
         db: Session, 
         query: str, 
         skip: int = 0, 
-        limit: int = 10
+        limit: int = 10,
+        author_loader: str = "selectin",
+        cursor: Optional[str] = None,
+        view: str = "full"
     ) -> List[Experience]:
         """搜索经验"""
-        return db.query(Experience).filter(
-            (Experience.company.contains(query)) |
-            (Experience.position.contains(query)) |
-            (Experience.summary.contains(query)) |
-            (Experience.content.contains(query)) |
-            (Experience.tags.contains(query))
-        ).order_by(desc(Experience.created_at)).offset(skip).limit(limit).all()
+        return self.search_backend.search(
+            db, query, skip, limit, cursor=cursor,
+            options=list_options(author_loader, view)
+        )
+    
+    def count_search_results(self, db: Session, query: str) -> int:
+        """搜索结果总数，精确 COUNT 结果按查询词缓存"""
+        key = ("search", self.search_backend.name, query)
+        return count_service.cached_count(key, lambda: self.search_backend.count(db, query))
+    
+    def next_cursor(self, experiences: List[Experience], limit: int) -> Optional[str]:
+        """列表接口的下一页游标"""
+        return next_created_at_cursor(experiences, limit)
+    
+    def get_tag_counts(self, db: Session, limit: int = 50, prefix: Optional[str] = None):
+        """获取标签及其经验数"""
+        return tag_service.get_tag_counts(db, limit=limit, prefix=prefix)
+    
+    def parse_search_cursor(self, cursor: str):
+        """解码搜索游标，格式由搜索后端决定，非法时抛出 ValueError"""
+        return self.search_backend.parse_cursor(cursor)
+    
+    def next_search_cursor(self, experiences: List[Experience], limit: int) -> Optional[str]:
+        """搜索接口的下一页游标"""
+        return self.search_backend.next_cursor(experiences, limit)
+
+
+class AsyncExperienceService:
+    """ExperienceService 的异步版本，供 async 路由使用，数据库操作不阻塞事件循环"""
+
+    def __init__(self, service: ExperienceService):
+        self.service = service
+
+    async def get_experience(
+        self,
+        db: AnySession,
+        experience_id: int,
+        author_loader: str = "joined"
+    ) -> Optional[Experience]:
+        return await run_db(db, self.service.get_experience, experience_id, author_loader=author_loader)
+
+    async def get_experience_validators(self, db: AnySession, experience_id: int) -> Optional[Tuple[str, datetime]]:
+        return await run_db(db, self.service.get_experience_validators, experience_id)
+
+    def experience_validators(self, experience: Experience) -> Tuple[str, datetime]:
+        return self.service.experience_validators(experience)
+
+    async def get_experiences(
+        self,
+        db: AnySession,
+        skip: int = 0,
+        limit: int = 10,
+        company: Optional[str] = None,
+        position: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        author_loader: str = "selectin",
+        cursor: Optional[str] = None,
+        tag_mode: str = "all",
+        view: str = "full"
+    ) -> List[Experience]:
+        return await run_db(
+            db, self.service.get_experiences,
+            skip=skip, limit=limit, company=company, position=position, tags=tags,
+            author_loader=author_loader, cursor=cursor, tag_mode=tag_mode, view=view
+        )
+
+    async def get_experiences_by_ids(
+        self,
+        db: AnySession,
+        ids: List[int],
+        author_loader: str = "selectin",
+        view: str = "full"
+    ) -> List[Experience]:
+        return await run_db(
+            db, self.service.get_experiences_by_ids, ids, author_loader=author_loader, view=view
+        )
+
+    async def get_changes(
+        self,
+        db: AnySession,
+        since: int,
+        limit: int = 100,
+        author_loader: str = "selectin",
+        view: str = "full"
+    ) -> Tuple[List[Experience], List[int], int, bool]:
+        return await run_db(
+            db, self.service.get_changes, since, limit=limit, author_loader=author_loader, view=view
+        )
+
+    async def create_experience(self, db: AnySession, experience: ExperienceCreate, user_id: int) -> Experience:
+        return await run_db(db, self.service.create_experience, experience, user_id)
+
+    async def update_experience(
+        self,
+        db: AnySession,
+        experience_id: int,
+        experience_update: ExperienceUpdate,
+        user_id: int
+    ) -> Optional[Experience]:
+        return await run_db(
+            db, self.service.update_experience, experience_id, experience_update, user_id
+        )
+
+    async def delete_experience(self, db: AnySession, experience_id: int, user_id: int) -> bool:
+        return await run_db(db, self.service.delete_experience, experience_id, user_id)
+
+    async def search_experiences(
+        self,
+        db: AnySession,
+        query: str,
+        skip: int = 0,
+        limit: int = 10,
+        author_loader: str = "selectin",
+        cursor: Optional[str] = None,
+        view: str = "full"
+    ) -> List[Experience]:
+        return await run_db(
+            db, self.service.search_experiences, query, skip, limit,
+            author_loader=author_loader, cursor=cursor, view=view
+        )
+
+    async def count_experiences(
+        self,
+        db: AnySession,
+        company: Optional[str] = None,
+        position: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        tag_mode: str = "all"
+    ) -> int:
+        return await run_db(
+            db, self.service.count_experiences,
+            company=company, position=position, tags=tags, tag_mode=tag_mode
+        )
+
+    async def count_search_results(self, db: AnySession, query: str) -> int:
+        return await run_db(db, self.service.count_search_results, query)
+
+    def next_cursor(self, experiences: List[Experience], limit: int) -> Optional[str]:
+        return self.service.next_cursor(experiences, limit)
+
+    async def get_tag_counts(self, db: AnySession, limit: int = 50, prefix: Optional[str] = None):
+        return await run_db(db, self.service.get_tag_counts, limit=limit, prefix=prefix)
+
+    def parse_search_cursor(self, cursor: str):
+        return self.service.parse_search_cursor(cursor)
+
+    def next_search_cursor(self, experiences: List[Experience], limit: int) -> Optional[str]:
+        return self.service.next_search_cursor(experiences, limit)
 
 
-experience_service = ExperienceService() 
\ No newline at end of file
+experience_service = ExperienceService()
+async_experience_service = AsyncExperienceService(experience_service) 
\ No newline at end of file
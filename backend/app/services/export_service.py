@@ -0,0 +1,110 @@
+import csv
+import io
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models.experience import Experience
+from app.models.tag import Tag, experience_tags
+from app.models.user import User
+
+# 导出的字段及顺序（CSV 表头）
+EXPORT_FIELDS = [
+    "id", "company", "position", "summary", "content", "difficulty",
+    "tags", "author", "created_at", "updated_at",
+]
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+class ExportService:
+    """
+    经验全量导出
+
+    使用服务端游标（yield_per / stream_results）按 id 顺序分块读取，每块查询一次标签，
+    逐块编码输出；内存占用只与块大小有关，与表的行数无关
+    """
+
+    def _query(
+        self,
+        company: Optional[str] = None,
+        position: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None
+    ):
+        query = select(
+            Experience.id, Experience.company, Experience.position, Experience.summary,
+            Experience.content, Experience.difficulty, User.username.label("author"),
+            Experience.created_at, Experience.updated_at
+        ).join(User, Experience.user_id == User.id)
+        if company:
+            query = query.where(Experience.company.contains(company))
+        if position:
+            query = query.where(Experience.position.contains(position))
+        if created_after:
+            query = query.where(Experience.created_at >= created_after)
+        if created_before:
+            query = query.where(Experience.created_at < created_before)
+        return query.order_by(Experience.id)
+
+    def _tags(self, db: Session, experience_ids: List[int]) -> Dict[int, List[str]]:
+        tags = defaultdict(list)
+        rows = db.execute(
+            select(experience_tags.c.experience_id, Tag.name)
+            .join(Tag, Tag.id == experience_tags.c.tag_id)
+            .where(experience_tags.c.experience_id.in_(experience_ids))
+            .order_by(experience_tags.c.experience_id, experience_tags.c.position)
+        )
+        for experience_id, name in rows:
+            tags[experience_id].append(name)
+        return tags
+
+    def iter_chunks(self, db: Session, chunk_size: int = 1000, **filters) -> Iterator[List[Dict[str, Any]]]:
+        """按块产出导出行（字典列表）"""
+        result = db.execute(self._query(**filters).execution_options(yield_per=chunk_size))
+        # 服务端游标未读完前，MySQL 不允许同一连接执行其他查询，标签用另一个连接查询
+        with Session(bind=db.get_bind()) as lookup:
+            for partition in result.partitions():
+                tags = self._tags(lookup, [row.id for row in partition])
+                yield [{**row._asdict(), "tags": tags.get(row.id, [])} for row in partition]
+
+    def iter_ndjson(self, db: Session, chunk_size: int = 1000, **filters) -> Iterator[bytes]:
+        for chunk in self.iter_chunks(db, chunk_size, **filters):
+            yield b"".join(orjson.dumps(row) + b"\n" for row in chunk)
+
+    def iter_csv(self, db: Session, chunk_size: int = 1000, **filters) -> Iterator[bytes]:
+        """CSV 带 UTF-8 BOM，Excel 可直接打开中文；标签以逗号连接"""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+        buffer.write("\ufeff")
+        writer.writeheader()
+        for chunk in self.iter_chunks(db, chunk_size, **filters):
+            for row in chunk:
+                writer.writerow({
+                    **row,
+                    "tags": ",".join(row["tags"]),
+                    "created_at": row["created_at"].isoformat() if row["created_at"] else "",
+                    "updated_at": row["updated_at"].isoformat() if row["updated_at"] else "",
+                })
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        # 没有数据时仍输出表头
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    def export(self, db: Session, format: str = "ndjson", chunk_size: int = 1000, **filters) -> Iterator[bytes]:
+        """按格式产出导出内容的字节块"""
+        if format == "csv":
+            return self.iter_csv(db, chunk_size, **filters)
+        if format == "ndjson":
+            return self.iter_ndjson(db, chunk_size, **filters)
+        raise ValueError(f"Unknown export format: {format}")
+
+
+export_service = ExportService()
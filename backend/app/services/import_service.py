@@ -0,0 +1,285 @@
+import logging
+import uuid
+from collections import Counter
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import bindparam, func, insert, select, text, update
+from sqlalchemy.orm import Session
+from app.core.database import AnySession, run_db
+from app.models.experience import Experience
+from app.models.experience_count import ExperienceCount
+from app.models.tag import Tag, experience_tags
+from app.models.user import User
+from app.schemas.experience import ExperienceCreate
+from app.services.change_service import change_service
+from app.services.search_service import search_backend
+from app.services.tag_service import tag_service
+from app.services.user_service import user_service
+
+logger = logging.getLogger(__name__)
+
+
+class ImportService:
+    """
+    经验批量导入：逐行校验，按批次多行 INSERT，每批一个事务
+
+    新经验的 id 按数据库能力获取，都只用一条多行 INSERT：
+    - SQLite，以及 innodb_autoinc_lock_mode 为 0/1 的 MySQL：按 auto_increment_increment
+      步长分配，由 lastrowid 推算
+    - 支持 INSERT ... RETURNING 按参数顺序返回的数据库（PostgreSQL 等）批量 RETURNING
+    - 其他情况（包括 lock_mode 为 2 的 MySQL）每行写入 import_key 标记，再按标记查回 id
+    """
+
+    def __init__(self, backend=search_backend):
+        self.search_backend = backend
+        self._allocation = None
+
+    def validate_rows(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        start_index: int = 0
+    ) -> Tuple[List[Tuple[int, ExperienceCreate, Dict[str, Any]]], List[Dict[str, Any]]]:
+        """
+        用 ExperienceCreate 校验每一行，返回 (有效行, 错误列表)
+
+        有效行为 (行号, 经验数据, 原始行)，原始行中的 author_phone / created_at
+        等导入专用字段由调用方使用
+        """
+        valid, errors = [], []
+        for index, row in enumerate(rows, start=start_index):
+            if not isinstance(row, dict):
+                errors.append({"index": index, "errors": ["row must be an object"]})
+                continue
+            try:
+                valid.append((index, ExperienceCreate.model_validate(row), row))
+            except ValidationError as e:
+                errors.append({
+                    "index": index,
+                    "errors": [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()]
+                })
+        return valid, errors
+
+    def resolve_authors(self, db: Session, phones: Iterable[str]) -> Dict[str, int]:
+        """按手机号批量获取作者 id，不存在的用户一次性创建"""
+        phones = list(dict.fromkeys(phones))
+        if not phones:
+            return {}
+        users = dict(db.execute(select(User.phone, User.id).where(User.phone.in_(phones))).all())
+        missing = [phone for phone in phones if phone not in users]
+        if missing:
+            db.execute(
+                insert(User).prefix_with("IGNORE", dialect="mysql").prefix_with("OR IGNORE", dialect="sqlite"),
+                [{"phone": phone, "username": user_service.mask_phone(phone)} for phone in missing]
+            )
+            users.update(db.execute(select(User.phone, User.id).where(User.phone.in_(missing))).all())
+        return users
+
+    def _id_allocation(self, db: Session) -> Tuple[str, int]:
+        """
+        单条多行 INSERT 的 id 分配方式，返回 (方式, 步长)
+
+        consecutive: 按 VALUES 顺序以固定步长分配（步长为 auto_increment_increment）
+        returning: 支持按参数顺序返回的 INSERT ... RETURNING
+        tagged: id 可能与其他事务交错，写入时带上行标记再查回
+        """
+        if self._allocation is None:
+            dialect = db.get_bind().dialect
+            if dialect.name == "sqlite":
+                # 写入时持有库级写锁，rowid 按 VALUES 顺序递增
+                self._allocation = ("consecutive", 1)
+            elif dialect.name == "mysql":
+                mode, increment = db.execute(
+                    text("SELECT @@innodb_autoinc_lock_mode, @@auto_increment_increment")
+                ).one()
+                # 0/1 模式下多行 INSERT 一次性分配连续的自增值；2（MySQL 8 默认）可能交错
+                self._allocation = ("consecutive" if int(mode) in (0, 1) else "tagged", int(increment))
+            elif dialect.insert_executemany_returning_sort_by_parameter_order:
+                self._allocation = ("returning", 1)
+            else:
+                self._allocation = ("tagged", 1)
+        return self._allocation
+
+    @staticmethod
+    def consecutive_ids(lastrowid: int, count: int, step: int, dialect: str) -> List[int]:
+        """由 lastrowid 推算多行 INSERT 的 id：SQLite 返回最后一行的 rowid，MySQL 返回第一行的 LAST_INSERT_ID()"""
+        first_id = lastrowid - (count - 1) * step if dialect == "sqlite" else lastrowid
+        return list(range(first_id, first_id + count * step, step))
+
+    def insert_experiences(self, db: Session, rows: List[Dict[str, Any]]) -> List[int]:
+        """多行插入经验，返回与 rows 顺序一致的 id"""
+        table = Experience.__table__
+        allocation, step = self._id_allocation(db)
+        if allocation == "consecutive":
+            result = db.execute(insert(table).values(rows))
+            return self.consecutive_ids(result.lastrowid, len(rows), step, db.get_bind().dialect.name)
+        if allocation == "returning":
+            result = db.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows)
+            return list(result.scalars())
+
+        # 每行带上 "批次标记:序号"，仍是一条多行 INSERT，再用一条查询按标记取回 id 并清空标记
+        batch = uuid.uuid4().hex
+        db.execute(insert(table).values([
+            {**row, "import_key": f"{batch}:{position}"} for position, row in enumerate(rows)
+        ]))
+        keyed = dict(db.execute(
+            select(table.c.import_key, table.c.id).where(table.c.import_key.like(f"{batch}:%"))
+        ).all())
+        ids = [keyed[f"{batch}:{position}"] for position in range(len(rows))]
+        db.execute(update(table).where(table.c.id.in_(ids)).values(import_key=None))
+        return ids
+
+    def _insert_tags(self, db: Session, experience_tag_names: List[Tuple[int, List[str]]]) -> None:
+        """批量写入标签关联，并按标签汇总增加计数"""
+        names = tag_service.normalize([name for _, tags in experience_tag_names for name in tags])
+        tag_ids = {name.lower(): tag_id for name, tag_id in tag_service.get_or_create_tag_ids(db, names).items()}
+        links = []
+        per_tag = Counter()
+        for experience_id, tags in experience_tag_names:
+            for position, name in enumerate(tags):
+                tag_id = tag_ids[name.lower()]
+                links.append({"experience_id": experience_id, "tag_id": tag_id, "position": position})
+                per_tag[tag_id] += 1
+        if not links:
+            return
+        db.execute(insert(experience_tags), links)
+        # 使用 Core 表做 executemany，ORM 实体上的 executemany UPDATE 要求按主键逐行更新
+        tags = Tag.__table__
+        db.execute(
+            update(tags)
+            .where(tags.c.id == bindparam("tag_id"))
+            .values(experience_count=tags.c.experience_count + bindparam("delta")),
+            [{"tag_id": tag_id, "delta": delta} for tag_id, delta in per_tag.items()]
+        )
+
+    def _increment_counts(self, db: Session, rows: List[Dict[str, Any]]) -> None:
+        """按 (公司, 职位) 汇总后更新计数表"""
+        groups = Counter((row["company"], row["position"]) for row in rows)
+        db.execute(
+            insert(ExperienceCount).prefix_with("IGNORE", dialect="mysql").prefix_with("OR IGNORE", dialect="sqlite"),
+            [{"company": company, "position": position, "experience_count": 0} for company, position in groups]
+        )
+        counts = ExperienceCount.__table__
+        db.execute(
+            update(counts)
+            .where(
+                counts.c.company == bindparam("group_company"),
+                counts.c.position == bindparam("group_position")
+            )
+            .values(experience_count=counts.c.experience_count + bindparam("delta")),
+            [
+                {"group_company": company, "group_position": position, "delta": delta}
+                for (company, position), delta in groups.items()
+            ]
+        )
+
+    def insert_batch(self, db: Session, entries: List[Tuple[ExperienceCreate, int, Optional[datetime]]]) -> List[int]:
+        """
+        在当前事务中写入一批经验（经验、标签、计数、搜索索引、变更日志），不提交
+
+        entries 为 (经验数据, 作者 id, 创建时间)，创建时间为空时使用数据库当前时间
+        """
+        now = db.execute(select(func.now())).scalar()
+        rows, tags = [], []
+        for experience, user_id, created_at in entries:
+            data = experience.model_dump()
+            tags.append(tag_service.normalize(data.pop("tags")))
+            rows.append({**data, "user_id": user_id, "created_at": created_at or now})
+
+        ids = self.insert_experiences(db, rows)
+        self._insert_tags(db, list(zip(ids, tags)))
+        self._increment_counts(db, rows)
+        self.search_backend.index_new_experiences(db, [
+            SimpleNamespace(id=experience_id, tags=row_tags, **row)
+            for experience_id, row, row_tags in zip(ids, rows, tags)
+        ])
+        change_service.record(db, ids)
+        return ids
+
+    def import_experiences(
+        self,
+        db: Session,
+        entries: List[Tuple[int, ExperienceCreate, int, Optional[datetime]]],
+        batch_size: int = 500
+    ) -> Dict[str, Any]:
+        """
+        分批导入已校验的经验，每批一个事务；某一批失败时回滚该批，
+        其中每一行都记入错误报告，其他批次不受影响
+
+        entries 为 (行号, 经验数据, 作者 id, 创建时间)
+        """
+        ids, errors = [], []
+        for start in range(0, len(entries), batch_size):
+            batch = entries[start:start + batch_size]
+            try:
+                ids.extend(self.insert_batch(db, [entry[1:] for entry in batch]))
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"第{start // batch_size + 1}批导入失败: {e}")
+                errors.extend({"index": entry[0], "errors": [f"database: {e.__class__.__name__}"]} for entry in batch)
+        return {"created": len(ids), "ids": ids, "errors": errors}
+
+    def import_rows(
+        self,
+        db: Session,
+        rows: List[Dict[str, Any]],
+        user_id: Optional[int] = None,
+        batch_size: int = 500,
+        start_index: int = 0
+    ) -> Dict[str, Any]:
+        """
+        校验并导入原始行，返回 {created, ids, errors}
+
+        指定 user_id 时所有行都归属该用户（API 导入）；否则按每行的 author_phone
+        批量解析作者，并保留行中的 created_at（离线迁移历史数据）
+        """
+        valid, errors = self.validate_rows(rows, start_index)
+        entries = []
+        if user_id is not None:
+            entries = [(index, experience, user_id, None) for index, experience, _ in valid]
+        else:
+            authors = self.resolve_authors(db, (
+                str(row["author_phone"]) for _, _, row in valid if row.get("author_phone")
+            ))
+            for index, experience, row in valid:
+                row_errors = []
+                author_id = authors.get(str(row.get("author_phone") or ""))
+                if author_id is None:
+                    row_errors.append("author_phone: Field required")
+                created_at = row.get("created_at")
+                if created_at is not None:
+                    try:
+                        created_at = datetime.fromisoformat(str(created_at))
+                    except ValueError:
+                        row_errors.append("created_at: Invalid datetime")
+                if row_errors:
+                    errors.append({"index": index, "errors": row_errors})
+                else:
+                    entries.append((index, experience, author_id, created_at))
+            db.commit()
+
+        report = self.import_experiences(db, entries, batch_size)
+        report["errors"] = sorted(errors + report["errors"], key=lambda error: error["index"])
+        return report
+
+
+class AsyncImportService:
+    """ImportService 的异步版本，供 async 路由使用"""
+
+    def __init__(self, service: ImportService):
+        self.service = service
+
+    async def import_rows(
+        self,
+        db: AnySession,
+        rows: List[Dict[str, Any]],
+        user_id: int,
+        batch_size: int = 500
+    ) -> Dict[str, Any]:
+        return await run_db(db, self.service.import_rows, rows, user_id=user_id, batch_size=batch_size)
+
+
+import_service = ImportService()
+async_import_service = AsyncImportService(import_service)
@@ -0,0 +1,303 @@
+import logging
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.pagination import (
+    decode_created_at_cursor, decode_cursor, encode_cursor,
+    next_created_at_cursor, paginate_by_created_at
+)
+from app.models.experience import Experience
+from app.models.search_index import ExperienceSearchToken
+from app.models.tag import Tag
+
+logger = logging.getLogger(__name__)
+
+# 中日韩字符：假名、CJK 统一汉字（含扩展 A）、谚文、兼容汉字
+_CJK_CHARS = r"\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+# 连续的中日韩字符，或连续的字母数字
+_TOKEN_RE = re.compile(rf"[{_CJK_CHARS}]+|[a-z0-9]+")
+_CJK_RE = re.compile(rf"[{_CJK_CHARS}]")
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+# 英文单词按前缀建索引，支持输入过程中的前缀匹配
+MIN_PREFIX_LENGTH = 2
+MAX_TOKEN_LENGTH = 20
+
+# 字段权重：公司、职位命中比正文命中更相关
+FIELD_BOOSTS = {
+    "company": 10,
+    "position": 8,
+    "tags": 6,
+    "summary": 3,
+    "content": 1,
+}
+SEARCHABLE_FIELDS = set(FIELD_BOOSTS)
+
+
+def _is_cjk(run: str) -> bool:
+    return bool(_CJK_RE.match(run))
+
+
+def index_tokens(text: str) -> List[str]:
+    """
+    文档分词：中日韩文本生成单字和二元组，英文单词生成长度不小于
+    MIN_PREFIX_LENGTH 的全部前缀
+    """
+    tokens = []
+    for run in _TOKEN_RE.findall(text.lower()):
+        if _is_cjk(run):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            word = run[:MAX_TOKEN_LENGTH]
+            if len(word) < MIN_PREFIX_LENGTH:
+                tokens.append(word)
+            else:
+                tokens.extend(word[:i] for i in range(MIN_PREFIX_LENGTH, len(word) + 1))
+    return tokens
+
+
+def query_tokens(text: str) -> List[str]:
+    """
+    查询分词：中日韩文本拆成相邻二元组（单字查询保留单字），英文单词整体
+    作为一个词元，与文档中的前缀词元匹配
+    """
+    tokens = []
+    for run in _TOKEN_RE.findall(text.lower()):
+        if _is_cjk(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run[:MAX_TOKEN_LENGTH])
+    return list(dict.fromkeys(tokens))
+
+
+def document_weights(experience: Experience) -> Dict[str, int]:
+    """计算经验中每个词元的得分：各字段权重 * (1 + log(词频)) 之和，取整便于精确排序"""
+    fields = {
+        "company": experience.company or "",
+        "position": experience.position or "",
+        "tags": " ".join(experience.tags),
+        "summary": experience.summary or "",
+        "content": _HTML_TAG_RE.sub(" ", experience.content or ""),
+    }
+    weights: Counter = Counter()
+    for field, text in fields.items():
+        for token, tf in Counter(index_tokens(text)).items():
+            weights[token] += FIELD_BOOSTS[field] * (1 + math.log(tf))
+    return {token: max(1, round(weight)) for token, weight in weights.items()}
+
+
+class LikeSearchBackend:
+    """基于 LIKE '%q%' 的全表扫描搜索，无需维护索引"""
+
+    name = "like"
+
+    def search(
+        self,
+        db: Session,
+        query: str,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        options: Tuple = ()
+    ) -> List[Experience]:
+        search_query = db.query(Experience).options(*options).filter(self._condition(query))
+        return paginate_by_created_at(search_query, Experience, skip, limit, cursor).all()
+
+    def _condition(self, query: str):
+        return (
+            (Experience.company.contains(query)) |
+            (Experience.position.contains(query)) |
+            (Experience.summary.contains(query)) |
+            (Experience.content.contains(query)) |
+            (Experience.tag_objects.any(Tag.name.contains(query)))
+        )
+
+    def count(self, db: Session, query: str) -> int:
+        return db.query(func.count(Experience.id)).filter(self._condition(query)).scalar()
+
+    def parse_cursor(self, cursor: str):
+        return decode_created_at_cursor(cursor)
+
+    def next_cursor(self, experiences: List[Experience], limit: int) -> Optional[str]:
+        return next_created_at_cursor(experiences, limit)
+
+    def index_experience(self, db: Session, experience: Experience) -> None:
+        pass
+
+    def remove_experience(self, db: Session, experience_id: int) -> None:
+        pass
+
+    def index_new_experiences(self, db: Session, experiences) -> None:
+        pass
+
+    def rebuild(self, db: Session, batch_size: int = 500) -> int:
+        return 0
+
+
+class NgramSearchBackend:
+    """
+    基于 experience_search_tokens 倒排索引的搜索
+
+    查询只按词元主键查找倒排表，要求命中全部查询词元，并按字段加权得分
+    倒序、id 倒序排列；游标为 (score, id)
+    """
+
+    name = "ngram"
+
+    def search(
+        self,
+        db: Session,
+        query: str,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        options: Tuple = ()
+    ) -> List[Experience]:
+        tokens = query_tokens(query)
+        if not tokens:
+            return []
+
+        score = func.sum(ExperienceSearchToken.weight)
+        ranked = self._matches(tokens).add_columns(score.label("score"))
+
+        if cursor is None:
+            ranked = ranked.offset(skip)
+        else:
+            position = self.parse_cursor(cursor)
+            if position:
+                last_score, last_id = position
+                ranked = ranked.having(or_(
+                    score < last_score,
+                    and_(score == last_score, ExperienceSearchToken.experience_id < last_id)
+                ))
+        ranked = ranked.order_by(
+            score.desc(), ExperienceSearchToken.experience_id.desc()
+        ).limit(limit)
+
+        scores = {row.experience_id: row.score for row in db.execute(ranked)}
+        if not scores:
+            return []
+
+        experiences = db.query(Experience).options(*options).filter(
+            Experience.id.in_(scores.keys())
+        ).all()
+        for experience in experiences:
+            experience.search_score = scores[experience.id]
+        return sorted(experiences, key=lambda e: (e.search_score, e.id), reverse=True)
+
+    def _matches(self, tokens: List[str]):
+        """命中全部查询词元的经验 id"""
+        return select(
+            ExperienceSearchToken.experience_id
+        ).where(
+            ExperienceSearchToken.token.in_(tokens)
+        ).group_by(
+            ExperienceSearchToken.experience_id
+        ).having(
+            func.count() == len(tokens)
+        )
+
+    def count(self, db: Session, query: str) -> int:
+        tokens = query_tokens(query)
+        if not tokens:
+            return 0
+        return db.scalar(select(func.count()).select_from(self._matches(tokens).subquery()))
+
+    def parse_cursor(self, cursor: str) -> Optional[Tuple[int, int]]:
+        if not cursor:
+            return None
+        try:
+            last_score, last_id = decode_cursor(cursor)
+            return int(last_score), int(last_id)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+
+    def next_cursor(self, experiences: List[Experience], limit: int) -> Optional[str]:
+        if len(experiences) < limit:
+            return None
+        last = experiences[-1]
+        return encode_cursor([last.search_score, last.id])
+
+    def index_experience(self, db: Session, experience: Experience) -> None:
+        """增量更新单条经验的倒排索引，与经验的写入在同一事务中提交"""
+        self.remove_experience(db, experience.id)
+        rows = [
+            {"token": token, "experience_id": experience.id, "weight": weight}
+            for token, weight in document_weights(experience).items()
+        ]
+        if rows:
+            db.execute(insert(ExperienceSearchToken), rows)
+
+    def remove_experience(self, db: Session, experience_id: int) -> None:
+        db.execute(
+            delete(ExperienceSearchToken).where(ExperienceSearchToken.experience_id == experience_id)
+        )
+
+    def _token_rows(self, experiences) -> List[Dict]:
+        return [
+            {"token": token, "experience_id": experience.id, "weight": weight}
+            for experience in experiences
+            for token, weight in document_weights(experience).items()
+        ]
+
+    def index_new_experiences(self, db: Session, experiences) -> None:
+        """批量索引新插入的经验（尚无旧索引），所有词元一次 executemany 写入"""
+        rows = self._token_rows(experiences)
+        if rows:
+            db.execute(insert(ExperienceSearchToken), rows)
+
+    def rebuild(self, db: Session, batch_size: int = 500) -> int:
+        """
+        重建全部索引，按 id 分批读取，返回索引的经验数
+
+        每批在同一个事务中删除该 id 区间的旧词元（包括已删除经验残留的词元）
+        并写入新词元，提交后才处理下一批，重建期间搜索不会看到空索引。
+        """
+        total = 0
+        last_id = 0
+        while True:
+            batch = db.query(Experience).filter(
+                Experience.id > last_id
+            ).order_by(Experience.id).limit(batch_size).all()
+            if not batch:
+                break
+            db.execute(delete(ExperienceSearchToken).where(
+                ExperienceSearchToken.experience_id > last_id,
+                ExperienceSearchToken.experience_id <= batch[-1].id
+            ))
+            self.index_new_experiences(db, batch)
+            total += len(batch)
+            last_id = batch[-1].id
+            db.commit()
+            db.expunge_all()
+            logger.info(f"搜索索引重建进度: {total}")
+
+        # 最后一批之后的词元只属于已删除的经验
+        db.execute(delete(ExperienceSearchToken).where(ExperienceSearchToken.experience_id > last_id))
+        db.commit()
+        return total
+
+
+SEARCH_BACKENDS = {
+    LikeSearchBackend.name: LikeSearchBackend,
+    NgramSearchBackend.name: NgramSearchBackend,
+}
+
+
+def get_search_backend(name: str):
+    """根据名称创建搜索后端"""
+    backend_class = SEARCH_BACKENDS.get(name)
+    if backend_class is None:
+        raise ValueError(f"Unknown search backend: {name}")
+    return backend_class()
+
+
+search_backend = get_search_backend(settings.SEARCH_BACKEND)
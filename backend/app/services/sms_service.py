@@ -1,26 +1,45 @@
-import redis
 import json
 import logging
 from typing import Dict, Any, Optional
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
+from app.core.lazy import LazySingleton
+from app.core.rate_limit import SlidingWindowLimiter
 from app.core.security import generate_sms_code
 
-# 尝试导入阿里云短信服务
-try:
-    from .aliyun_sms_service import aliyun_sms_service
-    ALIYUN_AVAILABLE = True
-except ImportError:
-    ALIYUN_AVAILABLE = False
-    logging.warning("阿里云短信SDK未安装，将使用模拟模式")
-
 logger = logging.getLogger(__name__)
 
+# 校验验证码并记录失败次数，一次往返、原子执行，同一个验证码并发提交时只有一个能通过。
+# KEYS: 验证码键、失败次数键；ARGV: 输入的验证码、最多失败次数
+# 返回 1 通过（删除验证码和失败次数），0 错误或已过期，-1 失败次数达到上限（验证码作废）
+VERIFY_SCRIPT = """
+local stored = redis.call('GET', KEYS[1])
+if not stored then
+    return 0
+end
+if stored == ARGV[1] then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return 1
+end
+local attempts = redis.call('INCR', KEYS[2])
+if attempts == 1 then
+    redis.call('PEXPIRE', KEYS[2], math.max(redis.call('PTTL', KEYS[1]), 1))
+end
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return -1
+end
+return 0
+"""
+
 
 class SMSService:
     def __init__(self):
-        self.redis_client = redis.from_url(settings.redis_url)
         self.code_expire = 300  # 验证码5分钟过期
-        self.use_aliyun = ALIYUN_AVAILABLE and self._check_aliyun_config()
+        self.limiter = SlidingWindowLimiter("sms_limit")
+        self.use_aliyun = self._check_aliyun_config() and self._check_aliyun_sdk()
         
         if self.use_aliyun:
             logger.info("使用阿里云短信服务")
@@ -37,27 +56,46 @@ class SMSService:
         ]
         return all(field for field in required_fields)
     
-    def send_code(self, phone: str) -> Dict[str, Any]:
+    def _check_aliyun_sdk(self) -> bool:
+        """配置完整时才导入阿里云 SDK，客户端在首次发送时创建"""
+        try:
+            from . import aliyun_sms_service  # noqa: F401
+            return True
+        except ImportError:
+            logger.warning("阿里云短信SDK未安装，将使用模拟模式")
+            return False
+    
+    async def send_code(self, client: aioredis.Redis, phone: str, reuse_code: bool = False) -> Dict[str, Any]:
         """
         发送验证码
         
         Args:
+            client: Redis 客户端
             phone: 手机号码
+            reuse_code: 重试发送时沿用尚未过期的验证码，避免用户先后收到不同的验证码
             
         Returns:
             Dict: 包含发送结果的字典
         """
         try:
+            key = f"sms_code:{phone}"
+            stored_code = await client.get(key) if reuse_code else None
+            
             # 生成验证码
-            code = generate_sms_code()
+            code = stored_code.decode() if stored_code else generate_sms_code()
             
-            # 存储到Redis，5分钟过期
-            key = f"sms_code:{phone}"
-            self.redis_client.setex(key, self.code_expire, code)
+            # 新验证码存储到Redis，5分钟过期，并清零失败次数；重试沿用旧验证码时
+            # 不改动过期时间和失败次数，否则每次重试都会让猜测次数重新计算
+            if not stored_code:
+                async with client.pipeline(transaction=True) as pipe:
+                    await pipe.setex(key, self.code_expire, code).delete(f"sms_attempts:{phone}").execute()
             
-            # 发送短信
+            # 发送短信（阿里云 SDK 是同步调用，放到线程池执行）
             if self.use_aliyun:
-                result = aliyun_sms_service.send_verification_code(phone, code)
+                from .aliyun_sms_service import get_aliyun_sms_service
+                result = await run_in_threadpool(
+                    lambda: get_aliyun_sms_service().send_verification_code(phone, code)
+                )
             else:
                 # 模拟发送
                 result = self._mock_send_sms(phone, code)
@@ -85,39 +123,43 @@ class SMSService:
             "biz_id": f"mock_biz_{phone}_{code}"
         }
     
-    def verify_code(self, phone: str, code: str) -> bool:
+    async def verify_code(self, client: aioredis.Redis, phone: str, code: str) -> bool:
         """
         验证验证码
         
         Args:
+            client: Redis 客户端
             phone: 手机号码
             code: 验证码
             
         Returns:
-            bool: 验证是否成功
+            bool: 验证是否成功；连续失败 SMS_CODE_MAX_ATTEMPTS 次后验证码作废
         """
         try:
-            key = f"sms_code:{phone}"
-            stored_code = self.redis_client.get(key)
+            keys = [f"sms_code:{phone}", f"sms_attempts:{phone}"]
+            script = client.register_script(VERIFY_SCRIPT)
+            result = await script(keys=keys, args=[code, settings.SMS_CODE_MAX_ATTEMPTS])
             
-            if stored_code and stored_code.decode() == code:
-                # 验证成功后删除验证码
-                self.redis_client.delete(key)
+            if result == 1:
                 logger.info(f"验证码验证成功: {phone}")
                 return True
             
-            logger.warning(f"验证码验证失败: {phone}, 输入: {code}")
+            if result == -1:
+                logger.warning(f"验证码失败次数过多，已作废: {phone}")
+            else:
+                logger.warning(f"验证码验证失败: {phone}")
             return False
             
         except Exception as e:
             logger.error(f"验证码验证异常: {phone}, error: {str(e)}")
             return False
     
-    def get_code(self, phone: str) -> str:
+    async def get_code(self, client: aioredis.Redis, phone: str) -> str:
         """
         获取验证码（仅用于测试）
         
         Args:
+            client: Redis 客户端
             phone: 手机号码
             
         Returns:
@@ -125,66 +167,85 @@ class SMSService:
         """
         try:
             key = f"sms_code:{phone}"
-            code = self.redis_client.get(key)
+            code = await client.get(key)
             return code.decode() if code else ""
         except Exception as e:
             logger.error(f"获取验证码异常: {phone}, error: {str(e)}")
             return ""
     
-    def check_send_frequency(self, phone: str, limit_minutes: int = 1) -> bool:
+    async def check_send_frequency(self, client: aioredis.Redis, phone: str, client_ip: str) -> Dict[str, Any]:
         """
-        检查发送频率限制
+        检查并记录一次发送（手机号、客户端 IP、全局的滑动窗口和每日上限），一次 Redis 往返
         
         Args:
+            client: Redis 客户端
             phone: 手机号码
-            limit_minutes: 限制时间（分钟）
+            client_ip: 客户端 IP
             
         Returns:
-            bool: 是否可以发送
+            Dict: allowed 是否可以发送，scope 超限的维度（Redis 不可用时为 unavailable），
+                  retry_after 建议等待秒数
         """
+        rules = [
+            ("phone", phone, settings.SMS_PHONE_WINDOW_SECONDS,
+             settings.SMS_PHONE_WINDOW_LIMIT, settings.SMS_PHONE_DAILY_LIMIT),
+            ("ip", client_ip, settings.SMS_IP_WINDOW_SECONDS,
+             settings.SMS_IP_WINDOW_LIMIT, settings.SMS_IP_DAILY_LIMIT),
+            ("global", "", settings.SMS_GLOBAL_WINDOW_SECONDS,
+             settings.SMS_GLOBAL_WINDOW_LIMIT, settings.SMS_GLOBAL_DAILY_LIMIT),
+        ]
         try:
-            key = f"sms_frequency:{phone}"
-            last_send_time = self.redis_client.get(key)
-            
-            if last_send_time:
-                # 检查是否在限制时间内
-                import time
-                current_time = int(time.time())
-                last_time = int(last_send_time.decode())
-                
-                if current_time - last_time < limit_minutes * 60:
-                    return False
-            
-            # 记录发送时间
-            self.redis_client.setex(key, limit_minutes * 60, str(int(time.time())))
-            return True
-            
-        except Exception as e:
+            result = await self.limiter.hit(client, rules)
+        except RedisError as e:
+            # 无法限流时拒绝发送（fail closed），避免 Redis 故障期间被刷短信
             logger.error(f"检查发送频率异常: {phone}, error: {str(e)}")
-            return True  # 异常时允许发送
+            return {"allowed": False, "scope": "unavailable", "retry_after": settings.CACHE_RETRY_SECONDS}
+        
+        if not result["allowed"]:
+            logger.warning(f"短信发送超限: {phone}, ip: {client_ip}, scope: {result['scope']}")
+        return result
     
-    def get_send_status(self, phone: str) -> Dict[str, Any]:
+    async def release_send_frequency(self, client: aioredis.Redis, phone: str, limit: Dict[str, Any]) -> None:
+        """
+        归还 check_send_frequency 记录的一次发送（发送任务没能投递时调用）
+        
+        Args:
+            client: Redis 客户端
+            phone: 手机号码
+            limit: check_send_frequency 的返回值
+        """
+        try:
+            await self.limiter.release(client, limit.get("reservation"))
+        except RedisError as e:
+            logger.error(f"归还发送额度异常: {phone}, error: {str(e)}")
+    
+    async def get_send_status(self, client: aioredis.Redis, phone: str) -> Dict[str, Any]:
         """
         获取发送状态
         
         Args:
+            client: Redis 客户端
             phone: 手机号码
             
         Returns:
             Dict: 发送状态信息
         """
         try:
-            code_key = f"sms_code:{phone}"
-            frequency_key = f"sms_frequency:{phone}"
-            
-            code_exists = self.redis_client.exists(code_key)
-            frequency_exists = self.redis_client.exists(frequency_key)
+            # 一次往返取回全部信息；键不存在时 TTL 返回负数
+            async with client.pipeline(transaction=False) as pipe:
+                code_ttl, frequency_ttl, attempts = await (
+                    pipe.ttl(f"sms_code:{phone}")
+                    .ttl(f"sms_limit:phone:{phone}")
+                    .get(f"sms_attempts:{phone}")
+                    .execute()
+                )
             
             return {
-                "has_code": bool(code_exists),
-                "has_frequency_limit": bool(frequency_exists),
-                "code_ttl": self.redis_client.ttl(code_key) if code_exists else 0,
-                "frequency_ttl": self.redis_client.ttl(frequency_key) if frequency_exists else 0
+                "has_code": code_ttl > 0,
+                "has_frequency_limit": frequency_ttl > 0,
+                "code_ttl": max(code_ttl, 0),
+                "frequency_ttl": max(frequency_ttl, 0),
+                "failed_attempts": int(attempts or 0)
             }
             
         except Exception as e:
@@ -193,9 +254,21 @@ class SMSService:
                 "has_code": False,
                 "has_frequency_limit": False,
                 "code_ttl": 0,
-                "frequency_ttl": 0
+                "frequency_ttl": 0,
+                "failed_attempts": 0
             }
 
 
-# 创建全局实例
-sms_service = SMSService() 
\ No newline at end of file
+# 全局实例，首次使用时创建（导入本模块不会加载阿里云 SDK）
+_sms_service = LazySingleton(SMSService)
+
+
+def get_sms_service() -> SMSService:
+    return _sms_service.get()
+
+
+def __getattr__(name: str):
+    # 兼容 from app.services.sms_service import sms_service
+    if name == "sms_service":
+        return get_sms_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,111 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, delete, func, insert, select, update
+from app.models.tag import Tag, experience_tags
+from typing import Dict, List, Optional
+
+MAX_TAG_LENGTH = 50
+
+
+class TagService:
+    def normalize(self, names: Optional[List[str]]) -> List[str]:
+        """去掉首尾空白、空标签和重复标签，保留原有顺序"""
+        result = []
+        seen = set()
+        for name in names or []:
+            name = name.strip()[:MAX_TAG_LENGTH]
+            if name and name.lower() not in seen:
+                seen.add(name.lower())
+                result.append(name)
+        return result
+
+    def get_or_create_tag_ids(self, db: Session, names: List[str]) -> Dict[str, int]:
+        """批量获取标签 id，不存在的标签一次性插入（并发插入同名标签时忽略冲突）"""
+        if not names:
+            return {}
+        existing = {
+            name.lower(): tag_id
+            for tag_id, name in db.execute(select(Tag.id, Tag.name).where(Tag.name.in_(names)))
+        }
+        missing = [name for name in names if name.lower() not in existing]
+        if missing:
+            db.execute(
+                insert(Tag).prefix_with("IGNORE", dialect="mysql").prefix_with("OR IGNORE", dialect="sqlite"),
+                [{"name": name, "experience_count": 0} for name in missing]
+            )
+            existing.update(
+                (name.lower(), tag_id)
+                for tag_id, name in db.execute(select(Tag.id, Tag.name).where(Tag.name.in_(missing)))
+            )
+        return {name: existing[name.lower()] for name in names}
+
+    def _adjust_counts(self, db: Session, tag_ids, delta: int) -> None:
+        if tag_ids:
+            db.execute(
+                update(Tag)
+                .where(Tag.id.in_(tag_ids))
+                .values(experience_count=Tag.experience_count + delta)
+            )
+
+    def set_experience_tags(self, db: Session, experience_id: int, names: Optional[List[str]]) -> None:
+        """替换经验的标签，并按差集增减各标签的经验计数"""
+        tag_ids = self.get_or_create_tag_ids(db, self.normalize(names))
+        new_ids = list(tag_ids.values())
+        old_ids = set(db.scalars(
+            select(experience_tags.c.tag_id).where(experience_tags.c.experience_id == experience_id)
+        ))
+
+        db.execute(delete(experience_tags).where(experience_tags.c.experience_id == experience_id))
+        if new_ids:
+            db.execute(insert(experience_tags), [
+                {"experience_id": experience_id, "tag_id": tag_id, "position": position}
+                for position, tag_id in enumerate(new_ids)
+            ])
+
+        self._adjust_counts(db, set(new_ids) - old_ids, 1)
+        self._adjust_counts(db, old_ids - set(new_ids), -1)
+
+    def remove_experience_tags(self, db: Session, experience_id: int, owned_by=None) -> None:
+        """
+        删除经验前调用，减少标签计数并移除关联，不需要先读出标签
+
+        owned_by 为返回经验 id 的子查询（如按作者过滤），不满足时两条语句都不生效
+        """
+        condition = experience_tags.c.experience_id == experience_id
+        if owned_by is not None:
+            condition = and_(condition, experience_tags.c.experience_id.in_(owned_by))
+        db.execute(
+            update(Tag)
+            .where(Tag.id.in_(select(experience_tags.c.tag_id).where(condition)))
+            .values(experience_count=Tag.experience_count - 1)
+        )
+        db.execute(delete(experience_tags).where(condition))
+
+    def experience_ids_with_tags(self, names: List[str], mode: str = "all"):
+        """
+        按标签筛选经验 id 的子查询，走 (tag_id, experience_id) 索引
+
+        mode=all 要求包含全部标签，mode=any 包含任一标签即可
+        """
+        names = self.normalize(names)
+        subquery = select(experience_tags.c.experience_id).join(
+            Tag, Tag.id == experience_tags.c.tag_id
+        ).where(Tag.name.in_(names))
+        if mode == "all":
+            subquery = subquery.group_by(
+                experience_tags.c.experience_id
+            ).having(func.count() == len(names))
+        return subquery
+
+    def get_experience_count(self, db: Session, name: str) -> int:
+        """单个标签的经验数"""
+        return db.scalar(select(Tag.experience_count).where(Tag.name == name)) or 0
+
+    def get_tag_counts(self, db: Session, limit: int = 50, prefix: Optional[str] = None) -> List[Tag]:
+        """按经验数倒序返回标签及计数"""
+        query = db.query(Tag).filter(Tag.experience_count > 0)
+        if prefix:
+            query = query.filter(Tag.name.startswith(prefix))
+        return query.order_by(Tag.experience_count.desc(), Tag.id).limit(limit).all()
+
+
+tag_service = TagService()
@@ -1,8 +1,19 @@
 from sqlalchemy.orm import Session
+from app.models.experience import Experience
 from app.models.user import User
-from app.schemas.user import UserCreate, UserUpdate
+from app.schemas.user import CurrentUser, UserCreate, UserUpdate
+from app.core.cache import LocalTTLCache, response_cache
+from app.core.config import settings
+from app.core.events import USER_CHANNEL, feed_broadcaster
 from app.core.security import create_access_token
-from typing import Optional
+from app.core.database import AnySession, run_db
+from typing import List, Optional
+
+# 已登录用户缓存：手机号 -> CurrentUser，认证时命中则不查询数据库。
+# 资料更新后通过 Redis 频道通知所有 worker 删除缓存，Redis 不可用时其他 worker
+# 最多滞后 AUTH_USER_CACHE_TTL 秒
+current_user_cache = LocalTTLCache(ttl=settings.AUTH_USER_CACHE_TTL)
+feed_broadcaster.on(USER_CHANNEL, lambda phone: current_user_cache.pop(phone.decode()))
 
 
 class UserService:
@@ -37,8 +48,13 @@ class UserService:
         
         db.commit()
         db.refresh(db_user)
+        current_user_cache.pop(phone)
         return db_user
     
+    def get_experience_ids(self, db: Session, user_id: int) -> List[int]:
+        """用户发布的经验 id（详情缓存包含作者资料，资料更新后需要失效）"""
+        return [row.id for row in db.query(Experience.id).filter(Experience.user_id == user_id)]
+    
     def get_or_create_user(self, db: Session, phone: str) -> User:
         user = self.get_user_by_phone(db, phone)
         if not user:
@@ -49,4 +65,52 @@ class UserService:
         return create_access_token(data={"sub": user.phone})
 
 
-user_service = UserService() 
\ No newline at end of file
+class AsyncUserService:
+    """UserService 的异步版本，供 async 路由使用，数据库操作不阻塞事件循环"""
+
+    def __init__(self, service: UserService):
+        self.service = service
+
+    async def get_user_by_phone(self, db: AnySession, phone: str) -> Optional[User]:
+        return await run_db(db, self.service.get_user_by_phone, phone)
+
+    async def get_current_user(self, db: AnySession, phone: str) -> Optional[CurrentUser]:
+        """根据令牌中的手机号获取登录用户，优先读取进程内缓存"""
+        current_user = current_user_cache.get(phone)
+        if current_user is None:
+            user = await self.get_user_by_phone(db, phone)
+            if user is None:
+                return None
+            current_user = CurrentUser.model_validate(user)
+            current_user_cache.set(phone, current_user)
+        return current_user
+
+    async def get_user_by_username(self, db: AnySession, username: str) -> Optional[User]:
+        return await run_db(db, self.service.get_user_by_username, username)
+
+    async def create_user(self, db: AnySession, phone: str) -> User:
+        return await run_db(db, self.service.create_user, phone)
+
+    async def update_user(self, db: AnySession, phone: str, user_update: UserUpdate) -> Optional[User]:
+        """
+        更新用户信息，并通知其他 worker 删除该用户的登录缓存
+
+        列表和详情的响应缓存里嵌入了作者资料，同时失效列表/搜索缓存和该用户
+        所有经验的详情缓存
+        """
+        user = await run_db(db, self.service.update_user, phone, user_update)
+        if user is not None:
+            await feed_broadcaster.notify(USER_CHANNEL, phone.encode())
+            experience_ids = await run_db(db, self.service.get_experience_ids, user.id)
+            await response_cache.invalidate("feed", *(f"experience:{i}" for i in experience_ids))
+        return user
+
+    async def get_or_create_user(self, db: AnySession, phone: str) -> User:
+        return await run_db(db, self.service.get_or_create_user, phone)
+
+    def create_access_token_for_user(self, user: User) -> str:
+        return self.service.create_access_token_for_user(user)
+
+
+user_service = UserService()
+async_user_service = AsyncUserService(user_service) 
\ No newline at end of file
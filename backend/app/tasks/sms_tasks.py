@@ -1,30 +1,80 @@
 from app.core.celery_app import celery_app
-from app.services.sms_service import sms_service
+from app.core.config import settings
+from app.core.lazy import LazySingleton
+from app.core.redis import create_async_pool
+from app.services.sms_service import get_sms_service
+from celery.result import AsyncResult
+from typing import Any, Dict
+import asyncio
 import logging
+import random
+import threading
+import redis.asyncio as aioredis
 
 logger = logging.getLogger(__name__)
 
+# 服务商返回这些结果码时重试：本地网络/SDK 异常、服务商系统错误、接口限流。
+# 其余失败（号码非法、签名或模板错误、余额不足、单号码业务限流等）重试也不会成功
+RETRYABLE_CODES = {"EXCEPTION", "isp.SYSTEM_ERROR", "Throttling.User", "SignatureNonceUsed"}
 
-@celery_app.task(bind=True, max_retries=3)
+# Celery 任务状态 -> 对外的发送状态
+TASK_STATES = {
+    "PENDING": "pending",
+    "RECEIVED": "pending",
+    "STARTED": "sending",
+    "RETRY": "retrying",
+    "FAILURE": "failed",
+    "REVOKED": "failed",
+}
+
+
+# asyncio 连接不能跨事件循环复用：每个 worker 线程保持一个常驻事件循环和绑定在它上面的
+# Redis 客户端，任务之间复用连接池，不再每次发送都新建连接池；fork 后子进程重新创建
+_task_state = LazySingleton(threading.local)
+
+
+def _run(coro_fn, *args, **kwargs):
+    """在当前线程的常驻事件循环中运行 coro_fn(client, ...)"""
+    state = _task_state.get()
+    if not hasattr(state, "loop"):
+        state.loop = asyncio.new_event_loop()
+        state.client = aioredis.Redis(connection_pool=create_async_pool())
+    return state.loop.run_until_complete(coro_fn(state.client, *args, **kwargs))
+
+
+def _send_code(phone: str, reuse_code: bool):
+    return _run(get_sms_service().send_code, phone, reuse_code=reuse_code)
+
+
+@celery_app.task(bind=True, max_retries=settings.SMS_TASK_MAX_RETRIES)
 def send_sms_code_task(self, phone: str):
-    """异步发送短信验证码任务"""
-    try:
-        success = sms_service.send_code(phone)
-        if not success:
-            raise Exception("Failed to send SMS code")
-        
+    """异步发送短信验证码任务，按服务商结果码决定是否重试"""
+    result = _send_code(phone, reuse_code=self.request.retries > 0)
+    code = result.get("code", "")
+    message = result.get("message", "")
+
+    if result.get("success", False):
         logger.info(f"SMS code sent successfully to {phone}")
-        return {"status": "success", "phone": phone}
-    
-    except Exception as exc:
-        logger.error(f"Failed to send SMS code to {phone}: {exc}")
-        
-        # 重试机制
-        if self.request.retries < self.max_retries:
-            countdown = 2 ** self.request.retries  # 指数退避
-            raise self.retry(exc=exc, countdown=countdown)
-        
-        return {"status": "failed", "phone": phone, "error": str(exc)}
+        return {"status": "delivered", "code": code, "message": message}
+
+    if code in RETRYABLE_CODES and self.request.retries < self.max_retries:
+        # 指数退避，加少量抖动避免服务商恢复时集中重试
+        countdown = settings.SMS_TASK_RETRY_BACKOFF * 2 ** self.request.retries + random.uniform(0, 1)
+        logger.warning(f"Failed to send SMS code to {phone}: {code} {message}, retry in {countdown:.1f}s")
+        raise self.retry(countdown=countdown)
+
+    logger.error(f"Failed to send SMS code to {phone}: {code} {message}")
+    return {"status": "failed", "code": code, "message": message}
+
+
+def get_send_result(task_id: str) -> Dict[str, Any]:
+    """查询发送任务的状态（读取 Celery 结果后端）；未知的任务 id 也返回 pending"""
+    task = AsyncResult(task_id, app=celery_app)
+    state = task.state
+    if state == "SUCCESS":
+        result = task.result or {}
+        return {"status": result.get("status", "failed"), "code": result.get("code", ""), "message": result.get("message", "")}
+    return {"status": TASK_STATES.get(state, "pending"), "code": "", "message": ""}
 
 
 @celery_app.task
@@ -36,4 +86,4 @@ def cleanup_expired_codes():
         return {"status": "success"}
     except Exception as exc:
         logger.error(f"Cleanup failed: {exc}")
-        return {"status": "failed", "error": str(exc)} 
\ No newline at end of file
+        return {"status": "failed", "error": str(exc)}
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+经验列表序列化基准测试
+对比 response_model 路径（FastAPI 二次校验 + 标准库 json）与
+app/core/serialization.py 的 bytes 直出路径，每页 CPU 耗时
+"""
+import sys
+import os
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import orjson
+from fastapi.utils import create_response_field
+from app.core.serialization import get_adapter, to_json
+from app.models import Experience, Tag, User
+from app.schemas.experience import Experience as ExperienceSchema
+
+
+def build_page(size: int) -> List[Experience]:
+    """构造一页内存中的经验（不访问数据库）"""
+    base_time = datetime(2025, 1, 1, 12, 0, 0)
+    content = "<p>" + "面试过程和题目详情。" * 200 + "</p>"
+    tags = [Tag(id=1, name="算法"), Tag(id=2, name="系统设计"), Tag(id=3, name="后端")]
+    page = []
+    for i in range(size):
+        user = User(
+            id=i, phone=f"138{i:08d}", username=f"user{i}", avatar=None, bio=None,
+            is_active=True, created_at=base_time, updated_at=None
+        )
+        experience = Experience(
+            id=i, company=f"公司{i}", position="后端开发", summary="三轮技术面，一轮HR面",
+            content=content, difficulty=3.5, user_id=i,
+            created_at=base_time + timedelta(minutes=i), updated_at=None
+        )
+        experience.user = user
+        experience.tag_objects = tags
+        page.append(experience)
+    return page
+
+
+def response_model_path(field, page) -> bytes:
+    """原路径：路由返回 ORM 列表，由 FastAPI 按 response_model 校验、序列化，再用标准库 json 编码"""
+    value, errors = field.validate(page, {}, loc=("response",))
+    content = field.serialize(value, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def orjson_path(page) -> bytes:
+    """参考：校验后 model_dump，再用 orjson 编码"""
+    adapter = get_adapter(List[ExperienceSchema])
+    return orjson.dumps(adapter.dump_python(adapter.validate_python(page, from_attributes=True), mode="json"))
+
+
+def bytes_path(page) -> bytes:
+    """新路径：一次校验，由 pydantic-core 直接编码为 bytes"""
+    return to_json(List[ExperienceSchema], page)
+
+
+def measure(name: str, fn, rounds: int) -> float:
+    fn()  # 预热
+    start = time.process_time()
+    for _ in range(rounds):
+        fn()
+    per_page = (time.process_time() - start) / rounds * 1000
+    print(f"  {name:<24} {per_page:8.3f} ms/页")
+    return per_page
+
+
+def main(page_size: int = 100, rounds: int = 200):
+    print(f"📊 经验列表序列化基准：每页 {page_size} 条，{rounds} 轮")
+    page = build_page(page_size)
+    field = create_response_field(name="Response_get_experiences", type_=List[ExperienceSchema])
+
+    # 三条路径输出的数据必须一致
+    expected = json.loads(response_model_path(field, page))
+    assert json.loads(orjson_path(page)) == expected
+    assert json.loads(bytes_path(page)) == expected
+
+    baseline = measure("response_model + json", lambda: response_model_path(field, page), rounds)
+    orjson_cost = measure("dump_python + orjson", lambda: orjson_path(page), rounds)
+    optimized = measure("dump_json (bytes)", lambda: bytes_path(page), rounds)
+
+    print(f"✅ bytes 直出相对原路径提速 {baseline / optimized:.1f}x，"
+          f"相对 orjson 路径 {orjson_cost / optimized:.1f}x")
+
+
+if __name__ == "__main__":
+    page_size = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    main(page_size, rounds)
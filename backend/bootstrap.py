@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+启动前的配置检查和数据库初始化（在同一进程内完成，不再逐个启动子进程）
+先检查 .env 和 Redis（原 check_config.py 的启动检查），数据库连接在读取指纹时检查；
+根据模型 DDL 和迁移脚本计算 schema 指纹，与数据库中记录的指纹一致时跳过建表和迁移；
+不一致时依次建表、迁移用户表、迁移经验表，成功后记录新指纹。最后输出各步骤耗时
+"""
+import sys
+import os
+import hashlib
+import time
+from contextlib import contextmanager
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, delete, func, insert, inspect, select, text
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+# 内容变化后需要重新执行的迁移脚本
+MIGRATION_SCRIPTS = ["migrate_users_table.py", "migrate_experiences_table.py"]
+# 修改引导流程本身时递增，强制重新执行一次
+BOOTSTRAP_VERSION = 1
+
+
+class StepTimer:
+    """记录每个步骤的耗时"""
+
+    def __init__(self):
+        self.steps = []
+
+    @contextmanager
+    def step(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, time.perf_counter() - start))
+
+    def report(self):
+        print("\n⏱️  启动耗时:")
+        for name, seconds in self.steps:
+            print(f"   {name:<12} {seconds * 1000:8.1f} ms")
+        print(f"   {'合计':<12} {sum(seconds for _, seconds in self.steps) * 1000:8.1f} ms")
+
+
+def schema_fingerprint(engine, metadata) -> str:
+    """模型在当前数据库方言下的 DDL + 迁移脚本内容的摘要"""
+    digest = hashlib.sha256(f"bootstrap:{BOOTSTRAP_VERSION}\n".encode())
+    for table in metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=engine.dialect)).encode())
+        for index in sorted(table.indexes, key=lambda index: index.name or ""):
+            digest.update(str(CreateIndex(index).compile(dialect=engine.dialect)).encode())
+    for script in MIGRATION_SCRIPTS:
+        path = os.path.join(PROJECT_ROOT, script)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+# 已应用的 schema 指纹，只有一行；不属于应用模型，不参与指纹计算
+schema_bootstrap = Table(
+    "schema_bootstrap", MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("fingerprint", String(64), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+def read_fingerprint(conn):
+    if not inspect(conn).has_table(schema_bootstrap.name):
+        return None
+    return conn.execute(select(schema_bootstrap.c.fingerprint).where(schema_bootstrap.c.id == 1)).scalar()
+
+
+def write_fingerprint(engine, fingerprint: str):
+    schema_bootstrap.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(delete(schema_bootstrap))
+        conn.execute(insert(schema_bootstrap).values(id=1, fingerprint=fingerprint))
+
+
+def check_redis():
+    """Redis 不可用时缓存和推送会降级，这里只提示不阻止启动"""
+    import redis
+    from app.core.config import settings
+    try:
+        redis.from_url(settings.redis_url, socket_connect_timeout=1).ping()
+        print("✅ Redis 连接成功")
+    except Exception as e:
+        print(f"⚠️ Redis 连接失败: {e}")
+
+
+def check_env_file() -> bool:
+    """缺少 .env 时不启动，与 check_config.py 一致"""
+    if os.path.exists(os.path.join(PROJECT_ROOT, ".env")):
+        return True
+    print("❌ .env 文件不存在，请复制 env.example 为 .env 并配置相关参数")
+    return False
+
+
+def bootstrap(force: bool = False) -> bool:
+    """检查配置并初始化数据库，返回是否成功"""
+    timer = StepTimer()
+    try:
+        with timer.step("检查配置"):
+            if not check_env_file():
+                return False
+            check_redis()
+
+        with timer.step("导入应用"):
+            from app.core.database import engine
+            from app.models import Base
+
+        try:
+            with timer.step("连接数据库"):
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                    stored = read_fingerprint(conn)
+        except Exception as e:
+            print(f"❌ 数据库连接失败: {e}")
+            print("请检查 .env 中的数据库配置，并确保 MySQL 服务已启动")
+            return False
+
+        with timer.step("计算指纹"):
+            fingerprint = schema_fingerprint(engine, Base.metadata)
+
+        if stored == fingerprint and not force:
+            print("✅ 数据库结构未变化，跳过建表和迁移")
+            return True
+
+        print("🔧 数据库结构有变化，执行建表和迁移...")
+        try:
+            with timer.step("创建表"):
+                Base.metadata.create_all(bind=engine)
+            if engine.dialect.name == "mysql":
+                # 迁移脚本使用 MySQL 语法（SHOW TABLES / DESCRIBE）
+                with timer.step("迁移用户表"):
+                    from migrate_users_table import migrate_users_table
+                    migrate_users_table()
+                with timer.step("迁移经验表"):
+                    from migrate_experiences_table import migrate_experiences_table
+                    migrate_experiences_table()
+            with timer.step("记录指纹"):
+                write_fingerprint(engine, fingerprint)
+        except Exception as e:
+            print(f"❌ 数据库初始化失败: {e}")
+            return False
+
+        print("✅ 数据库初始化完成")
+        return True
+    finally:
+        timer.report()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if bootstrap(force="--force" in sys.argv) else 1)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+流式导出面试经验的脚本
+按输出文件扩展名选择格式（.csv 为 CSV，其他为 NDJSON），可按公司、职位、创建时间筛选，
+与导出接口的筛选参数一致
+服务端游标分块读取，内存占用与表大小无关
+
+用法: python export_experiences.py 输出文件.csv --company 字节 --created-after 2024-01-01
+"""
+import argparse
+import sys
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.export_service import export_service
+
+
+def export_experiences(
+    path: str,
+    company: Optional[str] = None,
+    position: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None
+):
+    """导出经验到文件"""
+    export_format = "csv" if path.endswith(".csv") else "ndjson"
+    print(f"正在导出经验到 {path}（{export_format}）...")
+
+    start = time.time()
+    size = 0
+    db = SessionLocal()
+    try:
+        with open(path, "wb") as f:
+            for chunk in export_service.export(
+                db, export_format, chunk_size=settings.EXPERIENCE_EXPORT_CHUNK_SIZE,
+                company=company, position=position,
+                created_after=created_after, created_before=created_before
+            ):
+                f.write(chunk)
+                size += len(chunk)
+    finally:
+        db.close()
+
+    print(f"✅ 导出完成，{size / 1024 / 1024:.1f} MB，耗时 {time.time() - start:.1f} 秒")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="流式导出面试经验")
+    parser.add_argument("path", help="输出文件，.csv 为 CSV，其他为 NDJSON")
+    parser.add_argument("--company", help="公司名包含")
+    parser.add_argument("--position", help="职位包含")
+    parser.add_argument("--created-after", type=datetime.fromisoformat, help="创建时间下限（含），如 2024-01-01")
+    parser.add_argument("--created-before", type=datetime.fromisoformat, help="创建时间上限（不含）")
+    args = parser.parse_args()
+    export_experiences(args.path, args.company, args.position, args.created_after, args.created_before)
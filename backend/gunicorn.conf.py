@@ -0,0 +1,32 @@
+"""
+生产模式的 gunicorn 配置：gunicorn -c gunicorn.conf.py app.main:app
+
+- worker 数由 SERVER_WORKERS 决定（0 为 CPU 核数），每个 worker 是一个 uvicorn 事件循环
+- SERVER_PRELOAD 时主进程先导入应用再 fork，worker 启动快且共享只读内存
+- worker 处理 SERVER_MAX_REQUESTS（加随机抖动）个请求后由主进程替换，避免内存缓慢增长，
+  抖动使各 worker 错开重启
+- kill -HUP <主进程> 逐个替换 worker（滚动重启）；开启 preload 时代码在主进程中，
+  发布新代码需 kill -USR2 启动新主进程后再 kill -TERM 旧主进程，或直接重启容器
+"""
+from app.core.config import settings
+
+bind = f"{settings.HOST}:{settings.PORT}"
+workers = settings.server_workers
+worker_class = "app.core.workers.AppUvicornWorker"
+preload_app = settings.SERVER_PRELOAD
+max_requests = settings.SERVER_MAX_REQUESTS
+max_requests_jitter = settings.SERVER_MAX_REQUESTS_JITTER
+timeout = settings.SERVER_TIMEOUT
+graceful_timeout = settings.SERVER_GRACEFUL_TIMEOUT
+keepalive = settings.SERVER_KEEPALIVE
+accesslog = "-"
+errorlog = "-"
+loglevel = "debug" if settings.DEBUG else "info"
+
+
+def post_fork(server, worker):
+    """preload 时连接池在主进程中创建，子进程丢弃继承的连接（不关闭，主进程仍持有）"""
+    from app.core.database import async_engine, engine
+    engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+批量导入面试经验的脚本
+输入为 JSON Lines（每行一条经验）或 JSON 数组，字段同 ExperienceCreate，另外需要
+author_phone（作者手机号，不存在时自动创建用户），可选 created_at（ISO 格式）
+校验失败或写入失败的行写入 <输入文件>.errors.jsonl
+"""
+import sys
+import os
+import json
+import time
+from itertools import islice
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal
+from app.services.import_service import import_service
+
+
+def read_rows(path: str):
+    """逐行读取 JSON Lines；.json 文件整体读取为数组。无法解析的行以 None 占位"""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            yield from json.load(f)
+            return
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                yield None
+
+
+def import_experiences(path: str, batch_size: int = 500):
+    """按块读取文件并导入，每块内按 batch_size 行一个事务"""
+    print(f"正在导入 {path} ...")
+
+    rows = read_rows(path)
+    chunk_size = batch_size * 10
+    created, errors, index = 0, [], 0
+    start = time.time()
+    db = SessionLocal()
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            report = import_service.import_rows(db, chunk, batch_size=batch_size, start_index=index)
+            created += report["created"]
+            errors.extend(report["errors"])
+            index += len(chunk)
+            print(f"  已处理 {index} 行，成功 {created} 行")
+    finally:
+        db.close()
+
+    elapsed = time.time() - start
+    print(f"✅ 导入完成：{created}/{index} 行，耗时 {elapsed:.1f} 秒（{created / max(elapsed, 1e-6):.0f} 行/秒）")
+    if errors:
+        error_path = f"{path}.errors.jsonl"
+        with open(error_path, "w", encoding="utf-8") as f:
+            for error in errors:
+                f.write(json.dumps(error, ensure_ascii=False) + "\n")
+        print(f"❌ {len(errors)} 行导入失败，详情见 {error_path}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("用法: python import_experiences.py <文件.jsonl|文件.json> [batch_size]")
+        sys.exit(1)
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    import_experiences(sys.argv[1], batch_size)
@@ -4,11 +4,13 @@
 """
 import sys
 import os
+import json
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from sqlalchemy import text
+from sqlalchemy.orm import Session
 from app.core.database import engine
 from app.core.config import settings
 
@@ -100,9 +102,105 @@ def migrate_experiences_table():
         else:
             print("✅ user_id字段已存在")
         
+        # 添加ETag使用的版本号字段（如果不存在）
+        if 'version' not in exp_columns:
+            print("添加version字段...")
+            conn.execute(text("""
+                ALTER TABLE experiences 
+                ADD COLUMN version INT NOT NULL DEFAULT 1
+            """))
+            print("✅ version字段添加成功")
+        else:
+            print("✅ version字段已存在")
+        
+        # 添加批量导入查回 id 使用的 import_key 字段（如果不存在）
+        if 'import_key' not in exp_columns:
+            print("添加import_key字段...")
+            conn.execute(text("""
+                ALTER TABLE experiences 
+                ADD COLUMN import_key VARCHAR(40) NULL,
+                ADD INDEX ix_experiences_import_key (import_key)
+            """))
+            print("✅ import_key字段添加成功")
+        else:
+            print("✅ import_key字段已存在")
+        
+        # 添加键集分页使用的 (created_at, id) 复合索引（如果不存在）
+        result = conn.execute(text("""
+            SHOW INDEX FROM experiences WHERE Key_name = 'ix_experiences_created_at_id'
+        """))
+        if not result.fetchone():
+            print("添加(created_at, id)复合索引...")
+            conn.execute(text("""
+                ALTER TABLE experiences 
+                ADD INDEX ix_experiences_created_at_id (created_at, id)
+            """))
+            print("✅ (created_at, id)复合索引添加成功")
+        else:
+            print("✅ (created_at, id)复合索引已存在")
+        
         conn.commit()
     
+    backfill_experience_tags()
+    backfill_experience_counts()
+    backfill_experience_changes()
+    
     print("经验表迁移完成！")
 
+def backfill_experience_tags():
+    """把经验表 tags 字段中的 JSON 标签回填到 tags / experience_tags 表"""
+    from app.models.tag import experience_tags
+    from app.services.tag_service import tag_service
+    
+    with Session(engine) as db:
+        if db.execute(experience_tags.select().limit(1)).first():
+            print("✅ 标签关联表已有数据，跳过回填")
+            return
+        
+        rows = db.execute(text(
+            "SELECT id, tags FROM experiences WHERE tags IS NOT NULL AND tags <> ''"
+        )).fetchall()
+        print(f"回填标签数据，共{len(rows)}条经验...")
+        for experience_id, raw_tags in rows:
+            try:
+                names = json.loads(raw_tags)
+            except ValueError:
+                print(f"⚠️ 经验{experience_id}的标签不是合法JSON，已跳过")
+                continue
+            if isinstance(names, list):
+                tag_service.set_experience_tags(db, experience_id, [str(name) for name in names])
+        db.commit()
+        print("✅ 标签数据回填成功")
+
+def backfill_experience_counts():
+    """按 (公司, 职位) 汇总经验数，写入 experience_counts 计数表"""
+    with engine.connect() as conn:
+        if conn.execute(text("SELECT 1 FROM experience_counts LIMIT 1")).fetchone():
+            print("✅ 经验计数表已有数据，跳过回填")
+            return
+        
+        print("回填经验计数...")
+        conn.execute(text("""
+            INSERT INTO experience_counts (company, position, experience_count)
+            SELECT company, position, COUNT(*) FROM experiences GROUP BY company, position
+        """))
+        conn.commit()
+        print("✅ 经验计数回填成功")
+
+def backfill_experience_changes():
+    """为已有经验写入初始变更记录，客户端从头增量同步时可以拿到全部经验"""
+    with engine.connect() as conn:
+        if conn.execute(text("SELECT 1 FROM experience_changes LIMIT 1")).fetchone():
+            print("✅ 变更日志已有数据，跳过回填")
+            return
+        
+        print("回填变更日志...")
+        conn.execute(text("""
+            INSERT INTO experience_changes (experience_id, deleted, changed_at)
+            SELECT id, FALSE, COALESCE(updated_at, created_at) FROM experiences ORDER BY id
+        """))
+        conn.commit()
+        print("✅ 变更日志回填成功")
+
 if __name__ == "__main__":
     migrate_experiences_table() 
\ No newline at end of file
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+重建搜索倒排索引的脚本
+切换到 SEARCH_BACKEND=ngram 或修改分词规则后运行
+"""
+import sys
+import os
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal, engine
+from app.models import Base, ExperienceSearchToken
+from app.services.search_service import NgramSearchBackend
+
+
+def rebuild_search_index(batch_size: int = 500):
+    """重建全部经验的搜索索引"""
+    print("正在重建搜索索引...")
+    
+    # 确保索引表存在
+    Base.metadata.create_all(bind=engine, tables=[ExperienceSearchToken.__table__])
+    
+    start = time.time()
+    db = SessionLocal()
+    try:
+        total = NgramSearchBackend().rebuild(db, batch_size=batch_size)
+    finally:
+        db.close()
+    
+    print(f"✅ 搜索索引重建完成，共 {total} 条经验，耗时 {time.time() - start:.1f} 秒")
+
+
+if __name__ == "__main__":
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rebuild_search_index(batch_size)
@@ -1,30 +1,13 @@
 #!/usr/bin/env python3
 """
 启动脚本 - 包含配置检查、数据库迁移和服务器启动
+python run.py         开发模式，单进程 uvicorn --reload
+python run.py --prod  生产模式，gunicorn 多 worker（配置见 gunicorn.conf.py）
+python run.py --force-bootstrap  忽略 schema 指纹，重新执行建表和迁移
 """
-import os
 import sys
 import subprocess
-import time
-
-def run_command(command, description):
-    """运行命令并显示结果"""
-    print(f"\n🔧 {description}...")
-    try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True)
-        if result.returncode == 0:
-            print(f"✅ {description}成功")
-            if result.stdout:
-                print(result.stdout)
-        else:
-            print(f"❌ {description}失败")
-            if result.stderr:
-                print(result.stderr)
-            return False
-    except Exception as e:
-        print(f"❌ {description}异常: {e}")
-        return False
-    return True
+from bootstrap import bootstrap
 
 def main():
     """主函数"""
@@ -32,43 +15,32 @@ def main():
     print("🚀 面经快车后端启动脚本")
     print("=" * 60)
     
-    # 1. 检查配置
-    if not run_command("python check_config.py", "检查配置"):
-        print("\n❌ 配置检查失败，请检查.env文件")
-        return
-    
-    # 2. 创建数据库表
-    if not run_command("python create_tables.py", "创建数据库表"):
-        print("\n❌ 数据库表创建失败")
+    # 1. 配置检查和数据库初始化（同一进程内完成；schema 未变化时跳过建表和迁移）
+    if not bootstrap(force="--force-bootstrap" in sys.argv):
+        print("\n❌ 配置检查或数据库初始化失败")
         return
     
-    # 3. 运行用户表迁移（如果存在）
-    if os.path.exists("migrate_users_table.py"):
-        if not run_command("python migrate_users_table.py", "运行用户表迁移"):
-            print("\n❌ 用户表迁移失败")
-            return
-    
-    # 4. 运行经验表迁移（如果存在）
-    if os.path.exists("migrate_experiences_table.py"):
-        if not run_command("python migrate_experiences_table.py", "运行经验表迁移"):
-            print("\n❌ 经验表迁移失败")
-            return
-    
-    # 5. 启动服务器
-    print("\n🚀 启动FastAPI服务器...")
+    # 2. 启动服务器
+    production = "--prod" in sys.argv
+    print(f"\n🚀 启动FastAPI服务器（{'生产模式' if production else '开发模式'}）...")
     print("📝 API文档地址: http://localhost:8000/docs")
     print("📝 服务器地址: http://localhost:8000")
     print("⏹️  按 Ctrl+C 停止服务器")
     print("-" * 60)
     
-    try:
-        # 启动uvicorn服务器
-        subprocess.run([
+    if production:
+        # 多 worker，worker 数、预加载、定期重启等由 Settings 中的 SERVER_* 配置
+        command = ["gunicorn", "-c", "gunicorn.conf.py", "app.main:app"]
+    else:
+        command = [
             "uvicorn", "app.main:app", 
             "--host", "0.0.0.0", 
             "--port", "8000", 
             "--reload"
-        ])
+        ]
+    
+    try:
+        subprocess.run(command)
     except KeyboardInterrupt:
         print("\n\n👋 服务器已停止")
     except Exception as e:
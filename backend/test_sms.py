@@ -135,29 +135,36 @@ def test_sms_service_direct():
     print("\n🔧 直接测试短信服务...")
     
     try:
+        import asyncio
+        from app.core.redis import get_async_redis
         from app.services.sms_service import sms_service
         
-        # 测试发送验证码
-        result = sms_service.send_code(TEST_PHONE)
-        print(f"  发送结果: {result}")
-        
-        # 获取验证码
-        code = sms_service.get_code(TEST_PHONE)
-        print(f"  验证码: {code}")
-        
-        if code:
-            # 测试验证
-            is_valid = sms_service.verify_code(TEST_PHONE, code)
-            print(f"  验证结果: {is_valid}")
+        async def run():
+            client = get_async_redis()
             
-            # 测试发送状态
-            status = sms_service.get_send_status(TEST_PHONE)
-            print(f"  发送状态: {status}")
+            # 测试发送验证码
+            result = await sms_service.send_code(client, TEST_PHONE)
+            print(f"  发送结果: {result}")
             
-            return True
-        else:
-            print("❌ 没有获取到验证码")
-            return False
+            # 获取验证码
+            code = await sms_service.get_code(client, TEST_PHONE)
+            print(f"  验证码: {code}")
+            
+            if code:
+                # 测试验证
+                is_valid = await sms_service.verify_code(client, TEST_PHONE, code)
+                print(f"  验证结果: {is_valid}")
+                
+                # 测试发送状态
+                status = await sms_service.get_send_status(client, TEST_PHONE)
+                print(f"  发送状态: {status}")
+                
+                return True
+            else:
+                print("❌ 没有获取到验证码")
+                return False
+        
+        return asyncio.run(run())
             
     except Exception as e:
         print(f"❌ 直接测试异常: {e}")
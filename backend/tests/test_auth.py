@@ -1,10 +1,11 @@
+import os
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.database import Base, get_db
+from app.core.redis import get_async_redis
 from app.main import app
-from app.services.sms_service import sms_service
 
 # 测试数据库
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -28,23 +29,38 @@ def setup_database():
     yield
     Base.metadata.drop_all(bind=engine)
 
-def test_send_sms_code(setup_database):
-    """测试发送短信验证码"""
+class StubRedis:
+    """只实现限流脚本调用的 Redis 替身，记录传入的键"""
+
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = []
+
+    def register_script(self, script):
+        async def run(keys, args):
+            self.calls.append(keys)
+            if self.error:
+                raise self.error
+            return self.result
+        return run
+
+
+def test_send_sms_code(setup_database, monkeypatch):
+    """测试发送短信验证码：通过限流后投递发送任务，立即返回 task_id"""
+    from types import SimpleNamespace
+    from app.tasks import sms_tasks
+
+    monkeypatch.setitem(app.dependency_overrides, get_async_redis, lambda: StubRedis(result=[0, 0]))
+    monkeypatch.setattr(sms_tasks.send_sms_code_task, "delay", lambda phone: SimpleNamespace(id="task-1"))
     response = client.post("/api/v1/auth/send-code", params={"phone": "13800138000"})
-    assert response.status_code == 200
-    assert response.json()["message"] == "SMS code sent successfully"
+    assert response.status_code == 202
+    assert response.json()["task_id"] == "task-1"
 
-def test_login_with_valid_code(setup_database):
+def test_login_with_valid_code(setup_database, monkeypatch):
     """测试使用有效验证码登录"""
-    # 先发送验证码
-    client.post("/api/v1/auth/send-code", params={"phone": "13800138000"})
-    
-    # 获取验证码（测试环境）
-    code_response = client.get("/api/v1/auth/test-code/13800138000")
-    code = code_response.json()["code"]
-    
-    # 登录
-    login_data = {"phone": "13800138000", "code": code}
+    monkeypatch.setitem(app.dependency_overrides, get_async_redis, lambda: StubRedis(result=1))
+    login_data = {"phone": "13800138000", "username": "tester", "code": "123456"}
     response = client.post("/api/v1/auth/login", json=login_data)
     
     assert response.status_code == 200
@@ -53,10 +69,146 @@ def test_login_with_valid_code(setup_database):
     assert data["token_type"] == "bearer"
     assert data["user"]["phone"] == "13800138000"
 
-def test_login_with_invalid_code(setup_database):
+def test_login_with_invalid_code(setup_database, monkeypatch):
     """测试使用无效验证码登录"""
-    login_data = {"phone": "13800138000", "code": "123456"}
+    monkeypatch.setitem(app.dependency_overrides, get_async_redis, lambda: StubRedis(result=0))
+    login_data = {"phone": "13800138000", "username": "tester", "code": "123456"}
     response = client.post("/api/v1/auth/login", json=login_data)
     
     assert response.status_code == 400
-    assert "Invalid verification code" in response.json()["detail"] 
\ No newline at end of file
+    assert response.json()["detail"] == "验证码错误或已过期"
+
+
+def test_send_code_rate_limited_and_fails_closed(monkeypatch):
+    """超限返回 429 和 Retry-After，Redis 不可用时拒绝发送"""
+    import redis
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "SMS_IP_DAILY_LIMIT", 0)
+
+    stub = StubRedis(result=[1, 1500])
+    monkeypatch.setitem(app.dependency_overrides, get_async_redis, lambda: stub)
+    response = client.post("/api/v1/auth/send-code", params={"phone": "13800138000"})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2"
+    # 一次脚本调用覆盖手机号、IP、全局三个维度，关闭的每日上限不生成键
+    keys = stub.calls[0]
+    assert len(stub.calls) == 1
+    assert keys[0] == "sms_limit:phone:13800138000"
+    assert any(key.startswith("sms_limit:phone:13800138000:") for key in keys)
+    assert "sms_limit:ip:testclient" in keys
+    assert not any(key.startswith("sms_limit:ip:testclient:") for key in keys)
+    assert "sms_limit:global" in keys
+
+    monkeypatch.setitem(app.dependency_overrides, get_async_redis, lambda: StubRedis(error=redis.ConnectionError("down")))
+    response = client.post("/api/v1/auth/send-code", params={"phone": "13800138000"})
+    assert response.status_code == 503
+
+
+def test_send_code_returns_quota_when_enqueue_fails(monkeypatch):
+    """消息队列不可用时返回 503，并归还本次记录的发送额度"""
+    from kombu.exceptions import OperationalError
+    from app.tasks import sms_tasks
+
+    def broker_down(phone):
+        raise OperationalError("broker down")
+
+    stub = StubRedis(result=[0, 0])
+    monkeypatch.setitem(app.dependency_overrides, get_async_redis, lambda: stub)
+    monkeypatch.setattr(sms_tasks.send_sms_code_task, "delay", broker_down)
+    response = client.post("/api/v1/auth/send-code", params={"phone": "13800138000"})
+    assert response.status_code == 503
+    # 第二次脚本调用用相同的键归还额度
+    assert len(stub.calls) == 2 and stub.calls[1] == stub.calls[0]
+
+
+# 导入 app.main 的时间上限（秒），留有余量，只用于发现明显的退化
+IMPORT_BUDGET_SECONDS = 5.0
+
+
+def test_import_app_does_not_load_sms_stack():
+    """导入应用不加载阿里云 SDK、不创建短信服务，并且在时间预算内完成"""
+    import subprocess
+    import sys
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import app.main\n"
+        "elapsed = time.perf_counter() - start\n"
+        "from app.services import sms_service\n"
+        "loaded = [m for m in sys.modules if m.startswith(('alibabacloud', 'Tea', 'app.services.aliyun'))]\n"
+        "print(elapsed, len(loaded), sms_service._sms_service.created)\n"
+    )
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=backend, capture_output=True, text=True, check=True
+    ).stdout.split()
+    assert output[1:] == ["0", "False"]
+    assert float(output[0]) < IMPORT_BUDGET_SECONDS
+
+
+def test_send_code_enqueues_task_and_reports_status(monkeypatch):
+    """发送接口只投递任务并返回 task_id，状态接口返回任务结果"""
+    from types import SimpleNamespace
+    from app.tasks import sms_tasks
+
+    monkeypatch.setitem(app.dependency_overrides, get_async_redis, lambda: StubRedis(result=[0, 0]))
+    sent = []
+    monkeypatch.setattr(sms_tasks.send_sms_code_task, "delay", lambda phone: sent.append(phone) or SimpleNamespace(id="task-1"))
+    response = client.post("/api/v1/auth/send-code", params={"phone": "13800138000"})
+    assert response.status_code == 202
+    assert response.json()["task_id"] == "task-1"
+    assert sent == ["13800138000"]
+
+    results = {
+        "task-1": SimpleNamespace(state="SUCCESS", result={"status": "delivered", "code": "OK", "message": "OK"}),
+        "task-2": SimpleNamespace(state="RETRY", result=None),
+    }
+    monkeypatch.setattr(sms_tasks, "AsyncResult", lambda task_id, app: results.get(task_id, SimpleNamespace(state="PENDING")))
+    assert client.get("/api/v1/auth/send-code/task-1").json() == {
+        "task_id": "task-1", "status": "delivered", "code": "OK", "message": "OK"
+    }
+    assert client.get("/api/v1/auth/send-code/task-2").json()["status"] == "retrying"
+    assert client.get("/api/v1/auth/send-code/unknown").json()["status"] == "pending"
+
+
+def test_send_code_task_retries_on_provider_code(monkeypatch):
+    """只在可重试的服务商结果码上重试，重试时沿用同一个验证码"""
+    from app.services.sms_service import SMSService
+    from app.tasks.sms_tasks import send_sms_code_task
+
+    calls = []
+
+    def provider(*codes):
+        responses = iter(codes)
+
+        async def send_code(self, client, phone, reuse_code=False):
+            calls.append(reuse_code)
+            code = next(responses)
+            return {"success": code == "OK", "code": code, "message": code}
+        return send_code
+
+    monkeypatch.setattr(SMSService, "send_code", provider("isp.SYSTEM_ERROR", "OK"))
+    result = send_sms_code_task.apply(args=["13800138000"]).get()
+    assert result["status"] == "delivered"
+    assert calls == [False, True]
+
+    calls.clear()
+    monkeypatch.setattr(SMSService, "send_code", provider("isv.MOBILE_NUMBER_ILLEGAL"))
+    result = send_sms_code_task.apply(args=["13800138000"]).get()
+    assert result == {"status": "failed", "code": "isv.MOBILE_NUMBER_ILLEGAL", "message": "isv.MOBILE_NUMBER_ILLEGAL"}
+    assert calls == [False]
+
+
+def test_login_verifies_code_in_one_redis_call(setup_database, monkeypatch):
+    """验证码校验（含失败计数）只调用一次脚本"""
+    stub = StubRedis(result=0)
+    monkeypatch.setitem(app.dependency_overrides, get_async_redis, lambda: stub)
+    login_data = {"phone": "13800138000", "username": "tester", "code": "123456"}
+    response = client.post("/api/v1/auth/login", json=login_data)
+    assert response.status_code == 400
+    assert stub.calls == [["sms_code:13800138000", "sms_attempts:13800138000"]]
+
+    stub.result = 1
+    response = client.post("/api/v1/auth/login", json=login_data)
+    assert response.status_code == 200
+    assert len(stub.calls) == 2
@@ -0,0 +1,99 @@
+import gzip
+import zlib
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from app.core.compression import CompressionMiddleware, choose_encoding
+from app.core.http_cache import conditional
+from app.core.serialization import JSONBytesResponse
+
+LONG_BODY = "<p>" + "面试官问了很多系统设计的问题。" * 200 + "</p>"
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+
+@app.get("/long")
+async def long_body():
+    return PlainTextResponse(LONG_BODY)
+
+
+@app.get("/short")
+async def short_body():
+    return PlainTextResponse("ok")
+
+
+@app.get("/stream")
+async def stream_body():
+    async def chunks():
+        for _ in range(5):
+            yield LONG_BODY.encode()
+    return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+
+@app.get("/etag")
+async def etag_body(request: Request):
+    return conditional(request, JSONBytesResponse(f'"{LONG_BODY}"'.encode()))
+
+
+client = TestClient(app)
+
+
+def raw_get(url, accept_encoding):
+    """返回未解压的响应体"""
+    with client.stream("GET", url, headers={"Accept-Encoding": accept_encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def test_choose_encoding_respects_q_values():
+    assert choose_encoding("gzip") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding("") is None
+    assert choose_encoding("deflate") is None
+
+
+def test_large_response_is_gzipped_and_cached():
+    response, body = raw_get("/long", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert int(response.headers["content-length"]) == len(body)
+    assert gzip.decompress(body).decode() == LONG_BODY
+    assert len(body) < len(LONG_BODY.encode()) / 5
+
+    middleware = app.middleware_stack
+    while not isinstance(middleware, CompressionMiddleware):
+        middleware = middleware.app
+    hits = middleware.cache.hits
+    assert raw_get("/long", "gzip")[1] == body
+    assert middleware.cache.hits == hits + 1
+
+
+def test_small_or_unaccepted_responses_are_not_compressed():
+    response, body = raw_get("/short", "gzip")
+    assert "content-encoding" not in response.headers
+    assert body == b"ok"
+
+    response, body = raw_get("/long", "identity")
+    assert "content-encoding" not in response.headers
+    assert body.decode() == LONG_BODY
+
+
+def test_streaming_response_is_compressed_chunk_by_chunk():
+    response, body = raw_get("/stream", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert zlib.decompress(body, 16 + zlib.MAX_WBITS).decode() == LONG_BODY * 5
+
+
+def test_encoded_response_gets_its_own_etag():
+    """压缩后的表示使用带编码后缀的 ETag，条件请求时去掉后缀再比较"""
+    identity, _ = raw_get("/etag", "identity")
+    encoded, _ = raw_get("/etag", "gzip")
+    etag = identity.headers["etag"]
+    assert encoded.headers["content-encoding"] == "gzip"
+    assert encoded.headers["etag"] == etag[:-1] + '-gzip"'
+
+    response = client.get("/etag", headers={"Accept-Encoding": "gzip", "If-None-Match": encoded.headers["etag"]})
+    assert (response.status_code, response.headers["etag"]) == (304, encoded.headers["etag"])
+    response = client.get("/etag", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert (response.status_code, response.headers["etag"]) == (304, etag)
@@ -0,0 +1,767 @@
+import asyncio
+import csv
+import io
+import json
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+from app.core.cache import response_cache
+from app.core.config import settings
+from app.core.database import Base, get_db
+from app.core.events import Subscription, feed_broadcaster
+from app.main import app
+from app.models import User, Experience, ExperienceSearchToken
+from app.services.count_service import count_service
+from app.services.experience_service import experience_service
+from app.services.export_service import EXPORT_FIELDS
+from app.services.import_service import import_service
+from app.services.search_service import NgramSearchBackend
+from app.services.tag_service import tag_service
+from app.services.user_service import current_user_cache
+
+# 测试数据库
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+client = TestClient(app)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def setup_database(monkeypatch):
+    # 每个用例重建数据库，关闭响应缓存避免读到上一个用例的数据
+    monkeypatch.setattr(response_cache, "enabled", False)
+    monkeypatch.setattr(feed_broadcaster, "use_redis", False)
+    current_user_cache.clear()
+    count_service.cache.clear()
+    Base.metadata.create_all(bind=engine)
+    # 用例结束后恢复原来的覆盖（test_auth 在模块级设置了 get_db），不依赖用例执行顺序
+    monkeypatch.setitem(app.dependency_overrides, get_db, override_get_db)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def experiences(setup_database):
+    """创建 30 条经验，每条来自不同的作者，每 3 条共享同一个创建时间"""
+    db = TestingSessionLocal()
+    base_time = datetime(2025, 1, 1, 12, 0, 0)
+    for i in range(30):
+        user = User(phone=f"138{i:08d}", username=f"user{i}")
+        db.add(user)
+        db.flush()
+        experience = Experience(
+            company=f"公司{i}",
+            position="后端开发",
+            summary="总结",
+            content="内容",
+            user_id=user.id,
+            created_at=base_time + timedelta(minutes=i // 3)
+        )
+        db.add(experience)
+        db.flush()
+        tag_service.set_experience_tags(db, experience.id, ["算法", "奇数" if i % 2 else "偶数"])
+        count_service.adjust(db, Experience.id == experience.id, 1)
+    db.commit()
+    db.close()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self)
+
+
+def count_queries(url):
+    with QueryCounter() as counter:
+        response = client.get(url)
+    assert response.status_code == 200
+    return counter.count, response.json()
+
+
+def test_list_query_count_independent_of_page_size(experiences):
+    """列表接口的查询次数不随分页大小增长"""
+    small_count, small_page = count_queries("/api/v1/experiences/?limit=5")
+    large_count, large_page = count_queries("/api/v1/experiences/?limit=30")
+
+    assert len(small_page) == 5
+    assert len(large_page) == 30
+    assert all(item["user"] is not None for item in large_page)
+    assert small_count == large_count
+
+
+def test_search_query_count_independent_of_page_size(experiences):
+    """搜索接口的查询次数不随分页大小增长"""
+    small_count, small_page = count_queries("/api/v1/experiences/search/?q=公司&limit=5")
+    large_count, large_page = count_queries("/api/v1/experiences/search/?q=公司&limit=30")
+
+    assert len(small_page) == 5
+    assert len(large_page) == 30
+    assert small_count == large_count
+
+
+def test_cursor_pagination_walks_every_row_once(experiences):
+    """游标分页逐页遍历，不重复也不遗漏"""
+    seen = []
+    cursor = ""
+    for _ in range(10):
+        response = client.get("/api/v1/experiences/", params={"limit": 7, "cursor": cursor})
+        assert response.status_code == 200
+        page = response.json()
+        seen.extend(item["id"] for item in page["experiences"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert cursor is None
+    assert len(seen) == 30
+    assert len(set(seen)) == 30
+
+
+def test_invalid_cursor_is_rejected(experiences):
+    response = client.get("/api/v1/experiences/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def ngram_search(setup_database, monkeypatch):
+    monkeypatch.setattr(experience_service, "search_backend", NgramSearchBackend())
+
+
+def auth_headers(phone="13900000000"):
+    response = client.post("/api/v1/auth/direct-login", json={"phone": phone})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_ngram_search_ranks_and_tracks_writes(ngram_search):
+    """倒排索引搜索：公司命中排在正文命中之前，索引随增删改同步更新"""
+    headers = auth_headers()
+    in_content = client.post("/api/v1/experiences/", headers=headers, json={
+        "company": "某创业公司", "position": "前端", "summary": "一面",
+        "content": "<p>面试官之前在字节跳动工作</p>", "tags": ["React"]
+    }).json()
+    in_company = client.post("/api/v1/experiences/", headers=headers, json={
+        "company": "字节跳动", "position": "后端开发", "summary": "三轮技术面",
+        "content": "<p>算法题</p>", "tags": ["Golang"]
+    }).json()
+
+    results = client.get("/api/v1/experiences/search/", params={"q": "字节"}).json()
+    assert [item["id"] for item in results] == [in_company["id"], in_content["id"]]
+
+    # 英文按前缀匹配
+    results = client.get("/api/v1/experiences/search/", params={"q": "gol"}).json()
+    assert [item["id"] for item in results] == [in_company["id"]]
+
+    client.put(f"/api/v1/experiences/{in_company['id']}", headers=headers, json={"company": "阿里巴巴"})
+    results = client.get("/api/v1/experiences/search/", params={"q": "阿里"}).json()
+    assert [item["id"] for item in results] == [in_company["id"]]
+
+    client.delete(f"/api/v1/experiences/{in_content['id']}", headers=headers)
+    results = client.get("/api/v1/experiences/search/", params={"q": "字节"}).json()
+    assert results == []
+
+
+def test_ngram_rebuild_replaces_tokens_batch_by_batch(ngram_search, monkeypatch):
+    """重建索引逐批替换词元：处理前一批时后面的经验仍可搜索，已删除经验的词元被清理"""
+    headers = auth_headers()
+    ids = [
+        client.post("/api/v1/experiences/", headers=headers, json={
+            "company": f"字节跳动{i}", "position": "后端", "summary": "一面", "content": "<p>算法</p>", "tags": []
+        }).json()["id"]
+        for i in range(3)
+    ]
+    db = TestingSessionLocal()
+    db.add_all([
+        ExperienceSearchToken(token="stale", experience_id=ids[0], weight=1),
+        ExperienceSearchToken(token="stale", experience_id=ids[-1] + 100, weight=1),
+    ])
+    db.commit()
+
+    backend = experience_service.search_backend
+    visible = []
+    index_batch = backend.index_new_experiences
+
+    def record(session, batch):
+        index_batch(session, batch)
+        other = TestingSessionLocal()
+        visible.append(other.scalar(select(ExperienceSearchToken.experience_id).where(
+            ExperienceSearchToken.experience_id == ids[-1]
+        ).limit(1)))
+        other.close()
+
+    monkeypatch.setattr(backend, "index_new_experiences", record)
+    assert backend.rebuild(db, batch_size=1) == 3
+    db.close()
+
+    assert visible == [ids[-1]] * 3
+    results = client.get("/api/v1/experiences/search/", params={"q": "字节"}).json()
+    assert sorted(item["id"] for item in results) == ids
+    db = TestingSessionLocal()
+    assert db.scalar(select(ExperienceSearchToken.experience_id).where(ExperienceSearchToken.token == "stale")) is None
+    db.close()
+
+
+def test_tag_filter_and_counts(experiences):
+    """标签筛选支持全部匹配/任一匹配，标签计数随写入维护"""
+    response = client.get("/api/v1/experiences/", params={"tags": ["算法", "奇数"], "limit": 100})
+    assert len(response.json()) == 15
+    assert all(item["tags"] == ["算法", "奇数"] for item in response.json())
+
+    response = client.get("/api/v1/experiences/", params={"tags": ["奇数", "偶数"], "tag_mode": "any", "limit": 100})
+    assert len(response.json()) == 30
+
+    response = client.get("/api/v1/experiences/", params={"tags": ["奇数", "偶数"], "limit": 100})
+    assert response.json() == []
+
+    counts = {item["name"]: item["experience_count"] for item in client.get("/api/v1/experiences/tags/").json()}
+    assert counts == {"算法": 30, "奇数": 15, "偶数": 15}
+
+    headers = auth_headers()
+    created = client.post("/api/v1/experiences/", headers=headers, json={
+        "company": "公司", "position": "后端开发", "summary": "总结", "content": "内容",
+        "tags": ["算法", "新标签"]
+    }).json()
+    assert created["tags"] == ["算法", "新标签"]
+
+    updated = client.put(f"/api/v1/experiences/{created['id']}", headers=headers, json={"tags": ["偶数"]}).json()
+    assert updated["tags"] == ["偶数"]
+    counts = {item["name"]: item["experience_count"] for item in client.get("/api/v1/experiences/tags/").json()}
+    assert counts == {"算法": 30, "奇数": 15, "偶数": 16}
+
+    client.delete(f"/api/v1/experiences/{created['id']}", headers=headers)
+    counts = {item["name"]: item["experience_count"] for item in client.get("/api/v1/experiences/tags/").json()}
+    assert counts["偶数"] == 15
+
+
+def test_authenticated_write_skips_user_lookup(experiences):
+    """登录用户命中进程内缓存后，写接口不再查询用户表"""
+    headers = auth_headers("13800000029")
+    assert client.put("/api/v1/experiences/30", headers=headers, json={"summary": "预热"}).status_code == 200
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.put("/api/v1/experiences/30", headers=headers, json={"summary": "新总结"})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert response.status_code == 200
+    assert response.json()["summary"] == "新总结"
+    assert not any("FROM users" in statement and "WHERE users.phone" in statement for statement in statements)
+
+    # 其他用户不能修改或删除，标签计数不受影响
+    other = auth_headers("13800000001")
+    assert client.put("/api/v1/experiences/30", headers=other, json={"summary": "x"}).status_code == 404
+    assert client.delete("/api/v1/experiences/30", headers=other).status_code == 404
+    counts = {item["name"]: item["experience_count"] for item in client.get("/api/v1/experiences/tags/").json()}
+    assert counts["算法"] == 30
+
+
+def test_profile_update_evicts_cached_user_in_every_worker(experiences, monkeypatch):
+    """资料更新通过 Redis 频道通知各 worker 删除登录缓存，Redis 不可用时只删除本进程的缓存"""
+    from redis.exceptions import TimeoutError
+    from app.core.events import USER_CHANNEL
+    from app.schemas.user import UserUpdate
+    from app.services.user_service import async_user_service
+
+    published = []
+
+    class Publisher:
+        async def publish(self, channel, data):
+            published.append((channel, data))
+
+    monkeypatch.setattr(feed_broadcaster, "use_redis", True)
+    monkeypatch.setattr(feed_broadcaster, "_publisher", Publisher())
+    monkeypatch.setattr(feed_broadcaster, "_retry_at", 0.0)
+
+    def update(username):
+        db = TestingSessionLocal()
+        try:
+            asyncio.run(async_user_service.update_user(db, "13800000029", UserUpdate(username=username)))
+        finally:
+            db.close()
+
+    update("新昵称")
+    assert published == [(USER_CHANNEL, b"13800000029")]
+
+    # 其他 worker 的订阅连接收到通知后删除缓存
+    current_user_cache.set("13800000029", object())
+    feed_broadcaster._handlers[USER_CHANNEL](b"13800000029")
+    assert current_user_cache.get("13800000029") is None
+
+    class StalledRedis:
+        async def publish(self, channel, data):
+            raise TimeoutError("Timeout reading from socket")
+
+    monkeypatch.setattr(feed_broadcaster, "_publisher", StalledRedis())
+    current_user_cache.set("13800000029", object())
+    update("再次更新")
+    assert current_user_cache.get("13800000029") is None
+    assert feed_broadcaster.stats["errors"] >= 1
+
+
+def test_owner_scoped_writes_use_single_statement(experiences):
+    """更新/删除由带作者条件的单条 UPDATE/DELETE 完成，不先查询经验"""
+    headers = auth_headers("13800000029")
+    client.put("/api/v1/experiences/30", headers=headers, json={"summary": "预热"})
+
+    with QueryCounter() as counter:
+        response = client.put("/api/v1/experiences/30", headers=headers, json={"difficulty": 3.0})
+    assert response.status_code == 200
+    assert response.json()["difficulty"] == 3.0
+    # UPDATE + 变更日志 INSERT + 返回结果的查询（经验含作者、标签）
+    assert counter.count == 4
+
+    assert client.delete("/api/v1/experiences/30", headers=headers).status_code == 200
+    assert client.get("/api/v1/experiences/30").status_code == 404
+    counts = {item["name"]: item["experience_count"] for item in client.get("/api/v1/experiences/tags/").json()}
+    assert counts == {"算法": 29, "奇数": 14, "偶数": 15}
+
+
+def test_list_and_search_totals(experiences):
+    """带总数的分页结构，总数来自计数表/标签计数/缓存的 COUNT"""
+    def total(url, **params):
+        response = client.get(url, params={"with_total": True, **params})
+        assert response.status_code == 200
+        return response.json()["total"]
+
+    page = client.get("/api/v1/experiences/", params={"with_total": True, "skip": 10, "limit": 5}).json()
+    assert (page["total"], page["page"], page["size"], len(page["experiences"])) == (30, 3, 5, 5)
+    # 页码无法表示未对齐的 skip，拒绝而不是返回错误的页码
+    for url, params in (("/api/v1/experiences/", {}), ("/api/v1/experiences/search/", {"q": "公司"})):
+        response = client.get(url, params={"with_total": True, "skip": 7, "limit": 5, **params})
+        assert response.status_code == 400
+    assert client.get("/api/v1/experiences/", params={"skip": 7, "limit": 5}).status_code == 200
+    assert client.get("/api/v1/experiences/search/", params={"q": "   "}).status_code == 400
+
+    assert total("/api/v1/experiences/", company="公司1") == 11
+    assert total("/api/v1/experiences/", company="公司1", position="后端") == 11
+    assert total("/api/v1/experiences/", tags=["奇数"]) == 15
+    assert total("/api/v1/experiences/", tags=["算法", "奇数"], company="公司1") == 6
+    assert total("/api/v1/experiences/search/", q="公司2") == 11
+    assert client.get("/api/v1/experiences/", params={"with_total": True, "cursor": ""}).json()["total"] == 30
+
+    headers = auth_headers("13800000029")
+    client.put("/api/v1/experiences/30", headers=headers, json={"company": "字节跳动"})
+    client.post("/api/v1/experiences/", headers=headers, json={
+        "company": "字节跳动", "position": "前端", "summary": "总结", "content": "内容"
+    })
+    assert total("/api/v1/experiences/") == 31
+    assert total("/api/v1/experiences/", company="字节") == 2
+    assert total("/api/v1/experiences/", company="公司2") == 10
+    assert total("/api/v1/experiences/", position="前端") == 1
+
+
+def test_summary_view_never_selects_content(experiences):
+    """view=summary 的列表和搜索不读取 content 列"""
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        page = client.get("/api/v1/experiences/", params={"view": "summary", "cursor": "", "limit": 5}).json()
+        results = client.get("/api/v1/experiences/search/", params={"q": "公司1", "view": "summary"}).json()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert len(page["experiences"]) == 5
+    assert page["next_cursor"] is not None
+    assert all("content" not in item and item["user"] and item["tags"] for item in page["experiences"])
+    assert all("content" not in item for item in results)
+    assert not any("experiences.content AS" in statement for statement in statements)
+
+    full = client.get("/api/v1/experiences/", params={"limit": 1}).json()
+    assert full[0]["content"] == "内容"
+
+
+def test_conditional_get_returns_304_until_changed(experiences):
+    """详情和列表支持 ETag / Last-Modified，未变化时返回 304"""
+    detail = client.get("/api/v1/experiences/30")
+    etag, last_modified = detail.headers["etag"], detail.headers["last-modified"]
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.get("/api/v1/experiences/30", headers={"If-None-Match": etag})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert response.status_code == 304
+    assert response.content == b""
+    # 只查询版本号，不读取正文
+    assert len(statements) == 1
+    assert "experiences.content" not in statements[0]
+    assert client.get("/api/v1/experiences/30", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    page = client.get("/api/v1/experiences/", params={"limit": 5})
+    assert client.get("/api/v1/experiences/", params={"limit": 5},
+                      headers={"If-None-Match": page.headers["etag"]}).status_code == 304
+
+    headers = auth_headers("13800000029")
+    client.put("/api/v1/experiences/30", headers=headers, json={"tags": ["新标签"]})
+    response = client.get("/api/v1/experiences/30", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["tags"] == ["新标签"]
+    assert client.get("/api/v1/experiences/", params={"limit": 5},
+                      headers={"If-None-Match": page.headers["etag"]}).status_code == 200
+
+
+def test_batch_fetch_preserves_order_and_reports_missing(experiences):
+    """批量获取：查询次数固定，顺序与请求一致，报告不存在的 id"""
+    with QueryCounter() as counter:
+        response = client.get("/api/v1/experiences/batch", params={"ids": "7,3,999,5,3"})
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["id"] for item in body["experiences"]] == [7, 3, 5]
+    assert all(item["user"] is not None for item in body["experiences"])
+    assert body["missing_ids"] == [999]
+
+    large_count, page = count_queries("/api/v1/experiences/batch?" + "&".join(f"ids={i}" for i in range(1, 31)))
+    assert len(page["experiences"]) == 30
+    assert counter.count == large_count
+
+    assert client.get("/api/v1/experiences/batch", params={"ids": "1,x"}).status_code == 400
+    assert client.get("/api/v1/experiences/batch", params={"ids": ",".join(map(str, range(101)))}).status_code == 400
+
+
+def test_bulk_import_reports_invalid_rows(experiences, monkeypatch):
+    """批量导入：无效行按行号报告，有效行多行插入，标签、计数和索引同步更新"""
+    monkeypatch.setattr(import_service, "search_backend", NgramSearchBackend())
+    monkeypatch.setattr(experience_service, "search_backend", import_service.search_backend)
+    rows = [
+        {"company": "字节跳动", "position": "后端", "summary": "一面", "content": "内容", "tags": ["算法", "Go"]},
+        {"company": "字节跳动", "position": "后端", "summary": "二面"},
+        {"company": "字节跳动", "position": "后端", "summary": "终面", "content": "内容", "difficulty": 9},
+        {"company": "字节跳动", "position": "后端", "summary": "三面", "content": "内容", "tags": ["go"]},
+    ]
+    headers = auth_headers()
+    response = client.post("/api/v1/experiences/bulk", headers=headers, json=rows)
+    assert response.status_code == 200
+    report = response.json()
+    assert report["created"] == 2
+    assert [error["index"] for error in report["errors"]] == [1, 2]
+    assert report["errors"][0]["errors"] == ["content: Field required"]
+    first, second = report["ids"]
+    assert first < second
+
+    # 查询次数与行数无关
+    with QueryCounter() as counter:
+        client.post("/api/v1/experiences/bulk", headers=headers, json=[rows[0]] * 2)
+    small_count = counter.count
+    with QueryCounter() as counter:
+        client.post("/api/v1/experiences/bulk", headers=headers, json=[rows[0]] * 18)
+    assert counter.count == small_count
+
+    assert client.get(f"/api/v1/experiences/{second}").json()["tags"] == ["Go"]
+    tags = {tag["name"]: tag["experience_count"] for tag in client.get("/api/v1/experiences/tags/").json()}
+    assert (tags["算法"], tags["Go"]) == (30 + 21, 22)
+    total = client.get("/api/v1/experiences/", params={"with_total": True, "company": "字节"}).json()["total"]
+    assert total == 22
+    results = client.get("/api/v1/experiences/search/", params={"q": "三面"}).json()
+    assert [item["id"] for item in results] == [second]
+
+    # 离线导入按手机号解析作者，保留创建时间
+    db = TestingSessionLocal()
+    report = import_service.import_rows(db, [
+        {**rows[0], "author_phone": "13800000000", "created_at": "2020-01-01T08:00:00"},
+        {**rows[0], "author_phone": "13700000000"},
+        {**rows[0]},
+    ], batch_size=2)
+    db.close()
+    assert report["created"] == 2
+    assert report["errors"] == [{"index": 2, "errors": ["author_phone: Field required"]}]
+    imported = client.get(f"/api/v1/experiences/{report['ids'][0]}").json()
+    assert (imported["user"]["phone"], imported["created_at"]) == ("13800000000", "2020-01-01T08:00:00")
+    assert client.get(f"/api/v1/experiences/{report['ids'][1]}").json()["user"]["phone"] == "13700000000"
+
+    assert client.post("/api/v1/experiences/bulk", headers=headers, json=[]).status_code == 400
+
+
+def test_bulk_import_id_allocation(experiences, monkeypatch):
+    """自增步长不为 1 时按步长推算 id；id 可能交错时按行标记查回"""
+    # auto_increment_increment = 2：MySQL 的 lastrowid 是第一行，SQLite 是最后一行
+    assert import_service.consecutive_ids(101, 3, 2, "mysql") == [101, 103, 105]
+    assert import_service.consecutive_ids(105, 3, 2, "sqlite") == [101, 103, 105]
+
+    monkeypatch.setattr(import_service, "_allocation", ("tagged", 1))
+    rows = [
+        {"company": "美团", "position": "前端", "summary": f"第{n}轮", "content": "内容", "tags": [f"标签{n}"]}
+        for n in range(3)
+    ]
+    report = client.post("/api/v1/experiences/bulk", headers=auth_headers(), json=rows).json()
+    assert report["created"] == 3
+    for n, experience_id in enumerate(report["ids"]):
+        detail = client.get(f"/api/v1/experiences/{experience_id}").json()
+        assert (detail["summary"], detail["tags"]) == (f"第{n}轮", [f"标签{n}"])
+    db = TestingSessionLocal()
+    assert db.execute(select(Experience.id).where(Experience.import_key.isnot(None))).first() is None
+    db.close()
+
+
+def test_export_streams_ndjson_and_csv(experiences, monkeypatch):
+    """导出按块流式输出，按 id 升序，支持筛选，查询次数只与块数有关；仅限数据分析账号"""
+    assert client.get("/api/v1/experiences/export").status_code == 403
+    assert client.get("/api/v1/experiences/export", headers=auth_headers()).status_code == 403
+    monkeypatch.setattr(settings, "EXPERIENCE_EXPORT_ALLOWED_PHONES", ["13900000000"])
+    headers = auth_headers()
+    client.get("/api/v1/experiences/export", headers=headers, params={"company": "不存在"})
+
+    monkeypatch.setattr(settings, "EXPERIENCE_EXPORT_CHUNK_SIZE", 7)
+    with QueryCounter() as counter, client.stream("GET", "/api/v1/experiences/export", headers=headers) as response:
+        assert response.headers["content-type"] == "application/x-ndjson"
+        chunks = list(response.iter_bytes())
+    # 一条游标查询 + 每块（7 行）一条标签查询
+    assert counter.count == 1 + 5
+    rows = [json.loads(line) for line in b"".join(chunks).splitlines()]
+    assert [row["id"] for row in rows] == list(range(1, 31))
+    assert rows[1]["tags"] == ["算法", "奇数"]
+    assert rows[1]["author"] == "user1"
+
+    rows = client.get("/api/v1/experiences/export", headers=headers, params={
+        "company": "公司1", "created_after": "2025-01-01T12:05:00"
+    }).text.splitlines()
+    assert [json.loads(row)["company"] for row in rows] == [f"公司{i}" for i in range(15, 20)]
+
+    response = client.get("/api/v1/experiences/export", headers=headers, params={"format": "csv", "position": "后端"})
+    assert response.headers["content-disposition"] == 'attachment; filename="experiences.csv"'
+    records = list(csv.DictReader(io.StringIO(response.content.decode("utf-8-sig"))))
+    assert len(records) == 30
+    assert (records[0]["company"], records[0]["tags"]) == ("公司0", "算法,偶数")
+    empty = client.get("/api/v1/experiences/export", headers=headers, params={"format": "csv", "company": "不存在"})
+    assert empty.content.decode("utf-8-sig").strip() == ",".join(EXPORT_FIELDS)
+
+
+def test_changes_sync_upserts_and_tombstones(experiences, monkeypatch):
+    """增量同步：按 seq 分页返回新增/修改的经验和删除的墓碑，无变化时 304"""
+    monkeypatch.setattr(settings, "EXPERIENCE_CHANGES_SETTLE_SECONDS", 0)
+    start = client.get("/api/v1/experiences/changes").json()
+    assert (start["experiences"], start["deleted_ids"], start["has_more"]) == ([], [], False)
+
+    headers = auth_headers("13800000003")
+    created = client.post("/api/v1/experiences/", headers=headers, json={
+        "company": "字节跳动", "position": "后端", "summary": "一面", "content": "内容"
+    }).json()
+    client.put("/api/v1/experiences/4", headers=headers, json={"summary": "修改"})
+    client.put(f"/api/v1/experiences/{created['id']}", headers=headers, json={"summary": "二面"})
+    client.delete("/api/v1/experiences/5", headers=auth_headers("13800000004"))
+
+    page = client.get("/api/v1/experiences/changes", params={"since": start["next_token"], "limit": 2}).json()
+    assert [item["id"] for item in page["experiences"]] == [created["id"], 4]
+    assert page["experiences"][1]["summary"] == "修改"
+    assert page["has_more"] is True
+
+    page = client.get("/api/v1/experiences/changes", params={
+        "since": page["next_token"], "limit": 2, "view": "summary"
+    }).json()
+    assert [(item["id"], item["summary"]) for item in page["experiences"]] == [(created["id"], "二面")]
+    assert "content" not in page["experiences"][0]
+    assert (page["deleted_ids"], page["has_more"]) == ([5], False)
+
+    response = client.get("/api/v1/experiences/changes", params={"since": page["next_token"]})
+    assert response.json()["next_token"] == page["next_token"]
+    assert response.json()["experiences"] == []
+    response = client.get(
+        "/api/v1/experiences/changes", params={"since": page["next_token"]},
+        headers={"If-None-Match": response.headers["etag"]}
+    )
+    assert response.status_code == 304
+
+    # 尚未超过等待时间的变更暂不返回
+    monkeypatch.setattr(settings, "EXPERIENCE_CHANGES_SETTLE_SECONDS", 60)
+    assert client.get("/api/v1/experiences/changes").json()["experiences"] == []
+    assert client.get("/api/v1/experiences/changes", params={"since": "bad"}).status_code == 400
+
+
+def test_feed_stream_events_and_backpressure(setup_database, monkeypatch):
+    """新建经验发布精简事件；慢连接只保留最新的事件并标记丢弃数"""
+    published = []
+    original_publish = feed_broadcaster.publish
+
+    async def record(event):
+        published.append(event)
+
+    monkeypatch.setattr(feed_broadcaster, "publish", record)
+    created = client.post("/api/v1/experiences/", headers=auth_headers(), json={
+        "company": "字节跳动", "position": "后端", "summary": "一面", "content": "内容", "tags": ["Go"]
+    }).json()
+    assert published == [{
+        "id": created["id"], "company": "字节跳动", "position": "后端", "tags": ["Go"],
+        "created_at": datetime.fromisoformat(created["created_at"])
+    }]
+    monkeypatch.setattr(feed_broadcaster, "publish", original_publish)
+    monkeypatch.setattr(settings, "FEED_STREAM_QUEUE_SIZE", 3)
+
+    async def slow_client():
+        subscription = feed_broadcaster.subscribe()
+        for i in range(5):
+            await feed_broadcaster.publish({"id": i})
+        feed_broadcaster.unsubscribe(subscription)
+        return subscription.dropped, [json.loads(await subscription.get()) for _ in range(3)]
+
+    assert asyncio.run(slow_client()) == (2, [{"id": 2}, {"id": 3}, {"id": 4}])
+    assert feed_broadcaster.connections == 0
+
+    monkeypatch.setattr(settings, "FEED_STREAM_MAX_CONNECTIONS", 0)
+    assert client.get("/api/v1/experiences/stream").status_code == 503
+
+
+def test_feed_publish_uses_short_timeout_and_falls_back_locally():
+    """发布使用带 socket_timeout 的客户端，超时后只推送本进程连接"""
+    from redis.exceptions import TimeoutError
+    from app.core.events import FeedBroadcaster
+
+    broadcaster = FeedBroadcaster(use_redis=True)
+    assert broadcaster.publisher.connection_pool.connection_kwargs["socket_timeout"] == settings.CACHE_SOCKET_TIMEOUT
+    assert broadcaster.client.connection_pool.connection_kwargs.get("socket_timeout") is None
+
+    class StalledRedis:
+        async def publish(self, channel, data):
+            raise TimeoutError("Timeout reading from socket")
+
+    async def publish():
+        broadcaster._publisher = StalledRedis()
+        subscription = Subscription(10)
+        broadcaster._subscribers.add(subscription)
+        await broadcaster.publish({"id": 1})
+        return json.loads(await subscription.get())
+
+    assert asyncio.run(publish()) == {"id": 1}
+    assert broadcaster.stats["errors"] == 1 and not broadcaster.available
+
+
+class FakeRedis:
+    """只实现响应缓存用到的命令"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+
+    def pipeline(self, transaction=True):
+        return self
+
+    async def execute(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+@pytest.fixture
+def cache(experiences, monkeypatch):
+    monkeypatch.setattr(response_cache, "enabled", True)
+    monkeypatch.setattr(response_cache, "_client", FakeRedis())
+    monkeypatch.setattr(response_cache, "_retry_at", 0.0)
+
+
+def test_response_cache_hits_and_invalidates_on_write(cache):
+    """读接口命中缓存时不访问数据库，写入后缓存失效"""
+    first_count, first_page = count_queries("/api/v1/experiences/?limit=5")
+    with QueryCounter() as counter:
+        response = client.get("/api/v1/experiences/?limit=5")
+    assert response.headers["X-Cache"] == "HIT"
+    assert response.json() == first_page
+    assert counter.count == 0
+
+    experience_id = first_page[0]["id"]
+    detail = client.get(f"/api/v1/experiences/{experience_id}")
+    assert detail.headers["X-Cache"] == "MISS"
+    assert client.get(f"/api/v1/experiences/{experience_id}").headers["X-Cache"] == "HIT"
+
+    headers = auth_headers("13800000029")
+    client.put(f"/api/v1/experiences/{experience_id}", headers=headers, json={"company": "新公司"})
+
+    response = client.get("/api/v1/experiences/?limit=5")
+    assert response.headers["X-Cache"] == "MISS"
+    assert response.json()[0]["company"] == "新公司"
+    assert client.get(f"/api/v1/experiences/{experience_id}").json()["company"] == "新公司"
+
+
+def test_cache_invalidation_survives_redis_errors(cache, monkeypatch):
+    """重试等待期间的写入仍递增版本号，递增失败的范围在 Redis 恢复后补上"""
+    from redis.exceptions import TimeoutError
+    fake = response_cache.client
+    headers = auth_headers("13800000029")
+    client.get("/api/v1/experiences/30")
+    client.get("/api/v1/experiences/?limit=5")
+
+    # 读取超时进入重试等待，之后的写入照常递增版本号
+    monkeypatch.setattr(response_cache, "_retry_at", float("inf"))
+    client.put("/api/v1/experiences/30", headers=headers, json={"company": "等待期间"})
+    assert response_cache.available
+
+    class DownRedis(FakeRedis):
+        async def execute(self):
+            raise TimeoutError("Timeout reading from socket")
+
+    monkeypatch.setattr(response_cache, "_client", DownRedis())
+    client.put("/api/v1/experiences/30", headers=headers, json={"company": "递增失败"})
+    assert not response_cache.available
+
+    monkeypatch.setattr(response_cache, "_client", fake)
+    monkeypatch.setattr(response_cache, "_retry_at", 0.0)
+    response = client.get("/api/v1/experiences/30")
+    assert (response.headers["X-Cache"], response.json()["company"]) == ("MISS", "递增失败")
+    assert client.get("/api/v1/experiences/?limit=5").json()[0]["company"] == "递增失败"
+    assert not response_cache._pending
+
+
+def test_detail_cache_stores_validators_with_body(cache):
+    """详情的 ETag 与响应体一起缓存：命中时不访问数据库，作者资料更新后失效"""
+    detail = client.get("/api/v1/experiences/30")
+    etag, last_modified = detail.headers["etag"], detail.headers["last-modified"]
+    with QueryCounter() as counter:
+        hit = client.get("/api/v1/experiences/30")
+        not_modified = client.get("/api/v1/experiences/30", headers={"If-None-Match": etag})
+    assert counter.count == 0
+    assert (hit.headers["X-Cache"], hit.headers["etag"], hit.headers["last-modified"]) == ("HIT", etag, last_modified)
+    assert not_modified.status_code == 304
+
+    # 作者资料更新失效详情和列表缓存，响应体和 ETag 同时更新
+    from app.schemas.user import UserUpdate
+    from app.services.user_service import async_user_service
+    client.get("/api/v1/experiences/?limit=5")
+    db = TestingSessionLocal()
+    asyncio.run(async_user_service.update_user(db, "13800000029", UserUpdate(username="新昵称")))
+    # ETag 中的作者时间戳精确到秒，固定为较晚的时间，避免与创建时间落在同一秒
+    user = db.query(User).filter(User.phone == "13800000029").one()
+    user.updated_at = datetime(2030, 1, 1)
+    db.commit()
+    db.close()
+    response = client.get("/api/v1/experiences/30", headers={"If-None-Match": etag})
+    assert (response.status_code, response.headers["X-Cache"]) == (200, "MISS")
+    assert response.headers["etag"] != etag
+    assert response.json()["user"]["username"] == "新昵称"
+    feed = client.get("/api/v1/experiences/?limit=5")
+    assert feed.headers["X-Cache"] == "MISS"
+    assert feed.json()[0]["user"]["username"] == "新昵称"